@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Iterator, Optional
+
+from .logs_config import get_logger
+
+
+logger = get_logger()
+
+
+_FILE_PREFIX = "transactions-"
+_FILE_SUFFIX = ".sqlite3"
+_WRITE_BATCH_SIZE = 500
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS transactions ("
+    "signature TEXT PRIMARY KEY, wallet TEXT NOT NULL, slot INTEGER, "
+    "block_time INTEGER, archived_at REAL NOT NULL, data BLOB NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS transactions_wallet ON transactions (wallet, slot)",
+)
+
+# (signature, wallet, slot, block_time, transaction)
+_Record = tuple[str, str, Optional[int], Optional[int], dict[str, Any]]
+
+
+def _archive_files(directory: str) -> list[str]:
+    """Archive files in ``directory``, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(
+        name
+        for name in os.listdir(directory)
+        if name.startswith(_FILE_PREFIX) and name.endswith(_FILE_SUFFIX)
+    )
+    return [os.path.join(directory, name) for name in names]
+
+
+def iter_archived(
+    directory: str, wallet: Optional[str] = None
+) -> Iterator[tuple[str, str, dict[str, Any]]]:
+    """Yields archived ``(signature, wallet, transaction)``, oldest file first."""
+    query = "SELECT signature, wallet, data FROM transactions"
+    params: tuple[str, ...] = ()
+    if wallet is not None:
+        query += " WHERE wallet = ?"
+        params = (wallet,)
+    for file in _archive_files(directory):
+        db = sqlite3.connect(f"file:{file}?mode=ro", uri=True)
+        try:
+            for signature, owner, data in db.execute(query + " ORDER BY slot", params):
+                yield signature, owner, json.loads(zlib.decompress(data))
+        finally:
+            db.close()
+
+
+def get_archived(directory: str, signature: str) -> Optional[dict[str, Any]]:
+    for file in reversed(_archive_files(directory)):
+        db = sqlite3.connect(f"file:{file}?mode=ro", uri=True)
+        try:
+            row = db.execute(
+                "SELECT data FROM transactions WHERE signature = ?", (signature,)
+            ).fetchone()
+        finally:
+            db.close()
+        if row is not None:
+            return dict(json.loads(zlib.decompress(row[0])))
+    return None
+
+
+class TransactionArchive:
+    """
+    Append-only store of fetched transactions for offline replay.
+
+    ``record`` never blocks: transactions are buffered in a bounded queue
+    and dropped when it is full. ``run`` writes them in batches from a
+    worker thread as zlib-compressed JSON rows in SQLite files indexed by
+    signature and wallet. A file is rotated once it outgrows
+    ``max_file_bytes`` and only the newest ``max_files`` are kept.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_file_bytes: int = 256 * 1024 * 1024,
+        max_files: int = 8,
+        buffer_size: int = 10_000,
+        compression_level: int = 6,
+    ) -> None:
+        self._directory = directory
+        self._max_file_bytes = max_file_bytes
+        self._max_files = max(1, max_files)
+        self._compression_level = compression_level
+        self._queue: asyncio.Queue[_Record] = asyncio.Queue(buffer_size)
+        self._db: Optional[sqlite3.Connection] = None
+        self._file: Optional[str] = None
+        # Guards the connection, which batches use from a worker thread
+        # while close runs on the loop
+        self._write_lock = threading.Lock()
+        self.archived = 0
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "buffered": self._queue.qsize(),
+            "archived": self.archived,
+            "dropped": self.dropped,
+        }
+
+    def record(self, signature: str, wallet: str, transaction: dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(
+                (
+                    signature,
+                    wallet,
+                    transaction.get("slot"),
+                    transaction.get("blockTime"),
+                    transaction,
+                )
+            )
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def run(self) -> None:
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                while len(batch) < _WRITE_BATCH_SIZE and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                await asyncio.to_thread(self._write, batch)
+                self.archived += len(batch)
+        finally:
+            # Flush what's still buffered before the writer goes away
+            rest = []
+            while not self._queue.empty():
+                rest.append(self._queue.get_nowait())
+            if rest:
+                self._write(rest)
+            self.close()
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _write(self, batch: list[_Record]) -> None:
+        rows = [
+            (
+                signature,
+                wallet,
+                slot,
+                block_time,
+                time.time(),
+                zlib.compress(
+                    json.dumps(transaction, separators=(",", ":")).encode(),
+                    self._compression_level,
+                ),
+            )
+            for signature, wallet, slot, block_time, transaction in batch
+        ]
+        with self._write_lock:
+            db = self._current_db()
+            with db:
+                db.executemany(
+                    "INSERT OR IGNORE INTO transactions "
+                    "(signature, wallet, slot, block_time, archived_at, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+    def _current_db(self) -> sqlite3.Connection:
+        if (
+            self._db is not None
+            and self._file is not None
+            and os.path.getsize(self._file) >= self._max_file_bytes
+        ):
+            self._close()
+        if self._db is None:
+            self._rotate()
+        assert self._db is not None
+        return self._db
+
+    def _rotate(self) -> None:
+        files = _archive_files(self._directory)
+        # Keep appending to the newest file across restarts while it has room
+        if files and os.path.getsize(files[-1]) < self._max_file_bytes:
+            self._file = files[-1]
+        else:
+            stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9:09d}"
+            self._file = os.path.join(
+                self._directory, f"{_FILE_PREFIX}{stamp}{_FILE_SUFFIX}"
+            )
+            files.append(self._file)
+        for old in files[: -self._max_files]:
+            os.remove(old)
+            logger.info(f"Removed old transaction archive {old}")
+
+        self._db = sqlite3.connect(self._file, check_same_thread=False)
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
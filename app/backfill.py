@@ -0,0 +1,252 @@
+import asyncio
+import json
+import os
+from typing import Any, Callable, Container, Optional, Sequence
+
+from .logs_config import get_logger
+from .ratelimit import TokenBucket
+from .snapshots import SnapshotFile
+from .rpc import TransactionFetcher
+
+
+logger = get_logger()
+
+
+# getSignaturesForAddress returns at most this many signatures per page
+_PAGE_LIMIT = 1000
+
+
+class Checkpoints:
+    """
+    Last processed (signature, slot) of every wallet, persisted as JSON.
+
+    Signatures complete out of order, so a wallet's checkpoint only moves
+    to the newest processed signature older than every one still queued,
+    in flight or failed. A backfill from the checkpoint therefore covers
+    all of them. Failed signatures hold it back until a backfill queued
+    them again, or until ``max_held`` processed ones wait behind them,
+    more than that backfill could page through.
+
+    ``seed_files`` are other checkpoint files read at startup, such as those
+    of other shards, so a wallet moving here still resumes where it was.
+    """
+
+    def __init__(
+        self, file: str, seed_files: Sequence[str] = (), max_held: int = 1000
+    ) -> None:
+        self._file = SnapshotFile(file)
+        self._checkpoints: dict[str, tuple[str, int]] = {}
+        self._dirty = False
+        self._max_held = max_held
+        # wallet -> signature -> [slot, begun and not yet ended]
+        self._pending: dict[str, dict[str, list[int]]] = {}
+        self._failed: dict[str, set[str]] = {}
+        # Processed (slot, signature) not older than every pending signature
+        self._held: dict[str, list[tuple[int, str]]] = {}
+        self._on_failed: dict[str, Callable[[], None]] = {}
+        self._retrying: set[str] = set()
+        for seed_file in seed_files:
+            self._load(seed_file)
+        self._load(file)
+
+    def get(self, wallet: str) -> Optional[tuple[str, int]]:
+        return self._checkpoints.get(wallet)
+
+    def update(self, wallet: str, signature: str, slot: int) -> None:
+        """Records a processed signature."""
+        if not self._pending.get(wallet) and wallet not in self._held:
+            return self._advance(wallet, signature, slot)
+        self._held.setdefault(wallet, []).append((slot, signature))
+        self._settle(wallet)
+
+    def begin(self, wallet: str, signature: str, slot: Optional[int]) -> None:
+        """Holds the checkpoint before ``signature`` until it finishes or fails."""
+        if slot is None:
+            return
+        entry = self._pending.setdefault(wallet, {}).setdefault(signature, [slot, 0])
+        entry[1] += 1
+
+    def finish(self, wallet: str, signature: str, slot: Optional[int]) -> None:
+        """Ends one ``begin`` of ``signature``, which was processed."""
+        failed = self._failed.get(wallet)
+        if failed:
+            failed.discard(signature)
+        self._end(wallet, signature)
+        if slot is not None:
+            self.update(wallet, signature, slot)
+        else:
+            self._settle(wallet)
+
+    def fail(self, wallet: str, signature: str) -> None:
+        """
+        Ends one ``begin`` of ``signature``, which was not processed. The
+        checkpoint stays before it and the wallet's ``on_failed`` callback
+        is told once, until ``release_failed``.
+        """
+        if signature not in self._pending.get(wallet, {}):
+            return
+        self._failed.setdefault(wallet, set()).add(signature)
+        self._end(wallet, signature)
+        callback = self._on_failed.get(wallet)
+        if callback is not None and wallet not in self._retrying:
+            self._retrying.add(wallet)
+            callback()
+
+    def failed(self, wallet: str) -> bool:
+        return bool(self._failed.get(wallet))
+
+    def on_failed(self, wallet: str, callback: Optional[Callable[[], None]]) -> None:
+        """Sets or, given None, removes what a failure of ``wallet`` calls."""
+        if callback is None:
+            self._on_failed.pop(wallet, None)
+        else:
+            self._on_failed[wallet] = callback
+
+    def release_failed(self, wallet: str, keep: Container[str] = ()) -> None:
+        """
+        Stops holding the checkpoint for failed signatures of ``wallet``,
+        but for those in ``keep``, which a backfill is queueing again.
+        """
+        self._retrying.discard(wallet)
+        failed = self._failed.pop(wallet, set())
+        pending = self._pending.get(wallet, {})
+        kept = {signature for signature in failed if signature in keep}
+        for signature in failed - kept:
+            if pending.get(signature, (0, 0))[1] == 0:
+                pending.pop(signature, None)
+        if kept:
+            self._failed[wallet] = kept
+        if not pending:
+            self._pending.pop(wallet, None)
+        self._settle(wallet)
+
+    def _end(self, wallet: str, signature: str) -> None:
+        pending = self._pending.get(wallet)
+        entry = pending.get(signature) if pending else None
+        if pending is None or entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0 and signature not in self._failed.get(wallet, ()):
+            del pending[signature]
+            if not pending:
+                del self._pending[wallet]
+
+    def _settle(self, wallet: str) -> None:
+        """Moves the checkpoint past the held signatures older than every pending."""
+        held = self._held.get(wallet)
+        if not held:
+            return
+        pending = self._pending.get(wallet)
+        floor = min(slot for slot, _ in pending.values()) if pending else None
+        ready = [entry for entry in held if floor is None or entry[0] < floor]
+        if ready:
+            slot, signature = max(ready)
+            self._advance(wallet, signature, slot)
+            held = [entry for entry in held if floor is not None and entry[0] >= floor]
+
+        if not held:
+            del self._held[wallet]
+            return
+        self._held[wallet] = held
+        if len(held) > self._max_held and self._failed.get(wallet):
+            logger.warning(
+                f"Giving up on {len(self._failed[wallet])} failed sigs of {wallet!r},"
+                " a backfill would no longer reach them."
+            )
+            self.release_failed(wallet)
+
+    def _advance(self, wallet: str, signature: str, slot: int) -> None:
+        current = self._checkpoints.get(wallet)
+        if current is not None and current[1] > slot:
+            return
+        self._checkpoints[wallet] = (signature, slot)
+        self._dirty = True
+
+    async def run(self, interval: float = 10) -> None:
+        """Periodically flushes changed checkpoints, and once more on shutdown."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if self._dirty:
+                    self._dirty = False
+                    await asyncio.to_thread(self._write, dict(self._checkpoints))
+
+        finally:
+            self._write(self._checkpoints)
+
+    def _write(self, checkpoints: dict[str, tuple[str, int]]) -> None:
+        self._file.write_bytes(json.dumps(checkpoints).encode())
+
+    def _load(self, file: str) -> None:
+        if not os.path.exists(file):
+            return
+        with open(file, encoding="UTF-8") as f:
+            text = f.read().strip()
+        if text:
+            for wallet, (signature, slot) in json.loads(text).items():
+                self._advance(wallet, signature, slot)
+            self._dirty = False
+        logger.info(f"Loaded checkpoints of {len(self._checkpoints)} wallets.")
+
+
+class Backfiller:
+    """
+    Recovers the signatures a wallet missed while its subscription was down,
+    using paginated ``getSignaturesForAddress(until=checkpoint)`` calls.
+
+    Backfills of all wallets run concurrently but share one request budget.
+    """
+
+    def __init__(
+        self,
+        fetcher: TransactionFetcher,
+        checkpoints: Checkpoints,
+        rate_limiter: TokenBucket,
+        max_concurrent: int = 8,
+        max_signatures: int = 1000,
+    ) -> None:
+        self._fetcher = fetcher
+        self._checkpoints = checkpoints
+        self._rate_limiter = rate_limiter
+        self._slots = asyncio.Semaphore(max(1, max_concurrent))
+        self._max_signatures = max_signatures
+
+    async def missed_signatures(self, wallet: str) -> list[tuple[str, int]]:
+        """(signature, slot) of successful txs after the checkpoint, oldest first."""
+        checkpoint = self._checkpoints.get(wallet)
+        if checkpoint is None:
+            # Nothing processed yet, so there is no gap to fill
+            return []
+
+        until, _ = checkpoint
+        found: list[dict[str, Any]] = []
+        before: Optional[str] = None
+        async with self._slots:
+            while len(found) < self._max_signatures:
+                options: dict[str, Any] = {
+                    "until": until,
+                    "limit": min(_PAGE_LIMIT, self._max_signatures - len(found)),
+                    "commitment": "finalized",
+                }
+                if before:
+                    options["before"] = before
+
+                await self._rate_limiter.acquire()
+                page = await self._fetcher.call(
+                    "getSignaturesForAddress", [wallet, options]
+                )
+                if not page:
+                    break
+                found.extend(page)
+                if len(page) < options["limit"]:
+                    break
+                before = page[-1]["signature"]
+
+        if len(found) >= self._max_signatures:
+            logger.warning(
+                f"Backfill of {wallet!r} capped at {self._max_signatures} signatures."
+            )
+
+        # Pages come newest first; feed the pipeline in slot order
+        found.sort(key=lambda s: s["slot"])
+        return [(s["signature"], s["slot"]) for s in found if s.get("err") is None]
@@ -0,0 +1,257 @@
+import json
+from typing import Any, Callable, Optional, TypedDict, Union
+
+from .logs_config import get_logger
+
+try:
+    import msgspec
+except ImportError:  # optional, falls back to the stdlib
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib
+    orjson = None
+
+
+logger = get_logger()
+
+
+# Schemas of the hot-path messages, limited to the fields the bot reads.
+# msgspec decodes straight into plain dicts of these and skips the rest.
+
+
+class _UiTokenAmount(TypedDict, total=False):
+    amount: str
+    decimals: int
+
+
+class _TokenBalance(TypedDict, total=False):
+    accountIndex: int
+    mint: str
+    owner: str
+    programId: str
+    uiTokenAmount: _UiTokenAmount
+
+
+class _TransactionMeta(TypedDict, total=False):
+    err: Any
+    fee: int
+    preBalances: list[int]
+    postBalances: list[int]
+    preTokenBalances: list[_TokenBalance]
+    postTokenBalances: list[_TokenBalance]
+
+
+class _AccountKey(TypedDict, total=False):
+    pubkey: str
+    signer: bool
+    writable: bool
+
+
+class _Message(TypedDict, total=False):
+    # jsonParsed gives {"pubkey": ...} objects, json gives bare strings
+    accountKeys: list[Union[_AccountKey, str]]
+
+
+class _TransactionBody(TypedDict, total=False):
+    signatures: list[str]
+    message: _Message
+
+
+class _Transaction(TypedDict, total=False):
+    slot: int
+    blockTime: Optional[int]
+    meta: Optional[_TransactionMeta]
+    transaction: _TransactionBody
+
+
+class _TransactionResponse(TypedDict, total=False):
+    id: Any
+    result: Optional[_Transaction]
+    error: Any
+
+
+class _RpcErrorResponse(TypedDict, total=False):
+    id: Any
+    error: Any
+
+
+class _PushedMeta(_TransactionMeta, total=False):
+    # Pushed transactions are pre-filtered on their logs
+    logMessages: Optional[list[str]]
+
+
+class _PushedTransaction(TypedDict, total=False):
+    transaction: _TransactionBody
+    meta: Optional[_PushedMeta]
+
+
+class _Block(TypedDict, total=False):
+    blockTime: Optional[int]
+    transactions: list[_PushedTransaction]
+
+
+class _NotificationValue(TypedDict, total=False):
+    # logsNotification
+    signature: str
+    err: Any
+    logs: Optional[list[str]]
+    # blockNotification
+    slot: int
+    block: Optional[_Block]
+
+
+class _Context(TypedDict, total=False):
+    slot: int
+
+
+class _NotificationResult(TypedDict, total=False):
+    context: _Context
+    value: _NotificationValue
+    # transactionNotification
+    signature: str
+    slot: int
+    transaction: _PushedTransaction
+
+
+class _NotificationParams(TypedDict, total=False):
+    subscription: int
+    result: _NotificationResult
+
+
+class _WsMessage(TypedDict, total=False):
+    # Subscription confirmations
+    id: Any
+    result: Any
+    error: Any
+    # Notifications
+    method: str
+    params: _NotificationParams
+
+
+class _StdlibBackend:
+    """Decodes every message in full."""
+
+    name = "json"
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def decode_ws_message(self, data: Union[bytes, str]) -> Any:
+        return self.loads(data)
+
+    def decode_transactions(self, data: Union[bytes, str]) -> Any:
+        return self.loads(data)
+
+
+class _OrjsonBackend(_StdlibBackend):
+    name = "orjson"
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return bytes(orjson.dumps(obj))
+
+
+class _MsgspecBackend(_StdlibBackend):
+    """
+    Decodes the hot-path messages against their schemas, so only the
+    fields the bot reads are ever built. A message not matching its
+    schema, such as another notification type, is decoded in full.
+    """
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+        self._ws_decoder = msgspec.json.Decoder(_WsMessage)
+        self._transactions_decoder = msgspec.json.Decoder(
+            Union[list[_TransactionResponse], _RpcErrorResponse]
+        )
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._decoder.decode(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj)
+
+    def decode_ws_message(self, data: Union[bytes, str]) -> Any:
+        try:
+            return self._ws_decoder.decode(data)
+        except msgspec.ValidationError:
+            return self._decoder.decode(data)
+
+    def decode_transactions(self, data: Union[bytes, str]) -> Any:
+        try:
+            return self._transactions_decoder.decode(data)
+        except msgspec.ValidationError:
+            return self._decoder.decode(data)
+
+
+_BACKENDS: dict[str, tuple[Any, type[_StdlibBackend]]] = {
+    "msgspec": (msgspec, _MsgspecBackend),
+    "orjson": (orjson, _OrjsonBackend),
+    "json": (json, _StdlibBackend),
+}
+
+
+def available() -> list[str]:
+    """Installed backends, fastest first."""
+    return [name for name, (module, _) in _BACKENDS.items() if module is not None]
+
+
+def known() -> list[str]:
+    """Every backend, installed or not."""
+    return list(_BACKENDS)
+
+
+Decode = Callable[[Union[bytes, str]], Any]
+
+
+class JsonCodec:
+    """
+    JSON encoding and decoding for the hot paths: websocket frames and
+    RPC responses. ``use`` picks the backend; its methods are bound
+    directly, so calls cost nothing extra.
+    """
+
+    name: str
+    loads: Decode
+    dumps: Callable[[Any], bytes]
+    # A subscription notification or response
+    decode_ws_message: Decode
+    # A batch of getTransaction responses, or the error replacing it
+    decode_transactions: Decode
+
+    def __init__(self, name: str = "auto") -> None:
+        self.use(name)
+
+    def use(self, name: str) -> None:
+        """
+        Switches to the ``name`` backend, or with ``auto`` the fastest one
+        installed. A backend that isn't installed falls back to the stdlib.
+        """
+        if name == "auto":
+            name = available()[0]
+        if name not in _BACKENDS:
+            raise ValueError(f"Unknown JSON codec {name!r}, expected one of {known()}")
+        module, backend_class = _BACKENDS[name]
+        if module is None:
+            logger.warning(f"JSON codec {name!r} isn't installed, using the stdlib.")
+            backend_class = _StdlibBackend
+        backend = backend_class()
+        self.name = backend.name
+        self.loads = backend.loads
+        self.dumps = backend.dumps
+        self.decode_ws_message = backend.decode_ws_message
+        self.decode_transactions = backend.decode_transactions
+
+
+# Process-wide instance, switched from main with [RPC] JSON_CODEC
+codec = JsonCodec()
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import toml
 
@@ -15,21 +15,217 @@ class TWITTER:
 @dataclass
 class HELIUS:
     API_KEY: str = ''
+    META_CACHE_SIZE: int = 10000
+    META_CACHE_TTL_SECONDS: int = 86400
+
+@dataclass
+class RPC:
+    ENDPOINTS: list = field(default_factory=lambda: [{'URL': 'https://api.mainnet-beta.solana.com', 'WEIGHT': 1.0, 'REQUESTS_PER_SECOND': 10}])
+    WS_URLS: list = field(default_factory=lambda: ['wss://api.mainnet-beta.solana.com/'])
+    HEDGE_QUANTILE: float = 0.95
+    ENDPOINT_COOLDOWN_SECONDS: float = 5.0
+    WS_CONNECTIONS: int = 4
+    RESUBSCRIBE_BATCH_SIZE: int = 100
+    FETCH_WORKERS: int = 16
+    MAX_IN_FLIGHT: int = 8
+    MAX_RETRIES: int = 5
+    BATCH_SIZE: int = 50
+    BATCH_WINDOW_MS: int = 20
+    JSON_CODEC: str = 'auto'
+
+@dataclass
+class INGEST:
+    MODE: str = 'logs'
+    COMMITMENT: str = 'confirmed'
+    RETRACT_UNFINALIZED: bool = False
+    FINALITY_TIMEOUT_SECONDS: int = 60
+    FINALITY_POLL_SECONDS: int = 5
+
+@dataclass
+class PREFILTER:
+    ENABLED: bool = True
+    REQUIRE_PROGRAMS: list = field(default_factory=lambda: ['TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA', 'TokenzQdBNbLqP7VEh5qv2gSD4fKh1L7kRjF2PaqB6u'])
+    DEX_PROGRAMS: list = field(default_factory=lambda: [])
+    DROP_INSTRUCTIONS: list = field(default_factory=lambda: ['Sell'])
+
+@dataclass
+class DEDUP:
+    WINDOW_SECONDS: int = 86400
+    MAX_ENTRIES: int = 5000000
+    SNAPSHOT_INTERVAL_SECONDS: int = 60
+
+@dataclass
+class BACKFILL:
+    REQUESTS_PER_SECOND: int = 5
+    MAX_CONCURRENT: int = 8
+    MAX_SIGNATURES: int = 1000
+
+@dataclass
+class PIPELINE:
+    NOTIFY_QUEUE_SIZE: int = 10000
+    DETECT_QUEUE_SIZE: int = 1000
+    VALUE_QUEUE_SIZE: int = 1000
+    OUTPUT_QUEUE_SIZE: int = 1000
+    FETCH_CONCURRENCY: int = 128
+    DETECT_WORKERS: int = 4
+    IGNORE_UNPAID_BUYS: bool = False
+
+@dataclass
+class LEDGER:
+    ENABLED: bool = False
+    SEED_BATCH_SIZE: int = 50
+    SNAPSHOT_INTERVAL_SECONDS: int = 60
+    RESEED_INTERVAL_SECONDS: int = 21600
+    MIN_POSITION_CHANGE_PCT: float = 0.0
+
+@dataclass
+class CONVERGENCE:
+    ENABLED: bool = False
+    WINDOW_SECONDS: int = 600
+    BUCKETS: int = 60
+    MIN_WALLETS: int = 3
+    MIN_AMOUNT: float = 0.0
+    MIN_USD: float = 0.0
+    CLUSTERS_ONLY: bool = False
+
+@dataclass
+class SUPERVISOR:
+    RESTART_INITIAL_DELAY: float = 1.0
+    RESTART_MAX_DELAY: float = 60.0
+    MAX_RESTARTS: int = 10
+    MAX_RESTARTS_PERIOD: float = 300.0
+    STATUS_INTERVAL_SECONDS: int = 60
+
+@dataclass
+class PUBLISHER:
+    TWEETS_PER_WINDOW: int = 100
+    WINDOW_SECONDS: int = 86400
+    MAX_RETRIES: int = 5
+    COALESCE_WINDOW_SECONDS: int = 0
+
+@dataclass
+class SINKS:
+    QUEUE_SIZE: int = 1000
+    MAX_RETRIES: int = 3
+    TWITTER_CONCURRENCY: int = 1
+    TELEGRAM_BOT_TOKEN: str = ''
+    TELEGRAM_CHAT_ID: str = ''
+    TELEGRAM_CONCURRENCY: int = 2
+    DISCORD_WEBHOOK_URL: str = ''
+    DISCORD_CONCURRENCY: int = 2
+    JSONL_FILE: str = ''
+    SOCKET_PATH: str = ''
+
+@dataclass
+class TEMPLATES:
+    AMOUNT_FORMAT: str = ''
+    USD_FORMAT: str = ''
+    WATCH_INTERVAL_SECONDS: int = 2
+    RULES: list = field(default_factory=lambda: [])
+
+@dataclass
+class PRICES:
+    URL: str = 'https://lite-api.jup.ag/price/v3'
+    FIXTURE_FILE: str = ''
+    QUOTE_MINTS: list = field(default_factory=lambda: [])
+    TTL_SECONDS: int = 30
+    BATCH_SIZE: int = 50
+    BATCH_WINDOW_MS: int = 20
+    HOT_WINDOW_SECONDS: int = 300
+    REFRESH_INTERVAL_SECONDS: int = 15
+
+@dataclass
+class LOGGING:
+    LEVEL: str = 'INFO'
+    JSON_LINES: bool = False
+    DEBUG_SAMPLE_EVERY: int = 1
+
+@dataclass
+class METRICS:
+    ENABLED: bool = False
+    HOST: str = '127.0.0.1'
+    PORT: int = 9108
+
+@dataclass
+class ARCHIVE:
+    ENABLED: bool = False
+    MAX_FILE_MB: int = 256
+    MAX_FILES: int = 8
+    BUFFER_SIZE: int = 10000
+
+@dataclass
+class WALLETS:
+    WATCH_INTERVAL_SECONDS: int = 5
+    SUBSCRIBE_CONCURRENCY: int = 256
+    ADMIN_API_ENABLED: bool = False
+    ADMIN_API_HOST: str = '127.0.0.1'
+    ADMIN_API_PORT: int = 9109
+
+@dataclass
+class SHARDING:
+    WORKERS: int = 0
+    RESTART_DELAY_SECONDS: int = 5
+
+
+def _load_section(section, name):
+    values = _CONFIG_DATA.get(name, {})
+    fields = section.__dataclass_fields__
+    return section(**{key: values[key] for key in fields if key in values})
+
+
+def missing_keys():
+    """Settings config.toml lacks, as "[SECTION] KEY", which use the default."""
+    missing = []
+    for name in Config.__annotations__:
+        values = _CONFIG_DATA.get(name, {})
+        fields = globals()[name].__dataclass_fields__
+        missing.extend(f"[{name}] {key}" for key in fields if key not in values)
+    return missing
+
 
 class Config:
     TWITTER: 'TWITTER'
     HELIUS: 'HELIUS'
+    RPC: 'RPC'
+    INGEST: 'INGEST'
+    PREFILTER: 'PREFILTER'
+    DEDUP: 'DEDUP'
+    BACKFILL: 'BACKFILL'
+    PIPELINE: 'PIPELINE'
+    LEDGER: 'LEDGER'
+    CONVERGENCE: 'CONVERGENCE'
+    SUPERVISOR: 'SUPERVISOR'
+    PUBLISHER: 'PUBLISHER'
+    SINKS: 'SINKS'
+    TEMPLATES: 'TEMPLATES'
+    PRICES: 'PRICES'
+    LOGGING: 'LOGGING'
+    METRICS: 'METRICS'
+    ARCHIVE: 'ARCHIVE'
+    WALLETS: 'WALLETS'
+    SHARDING: 'SHARDING'
 
     @classmethod
     def load(cls) -> None:
-        cls.TWITTER = TWITTER(
-            API_KEY=_CONFIG_DATA['TWITTER']['API_KEY'],
-            API_KEY_SECRET=_CONFIG_DATA['TWITTER']['API_KEY_SECRET'],
-            API_ACCESS_TOKEN=_CONFIG_DATA['TWITTER']['API_ACCESS_TOKEN'],
-            API_ACCESS_TOKEN_SECRET=_CONFIG_DATA['TWITTER']['API_ACCESS_TOKEN_SECRET']
-        )
-        cls.HELIUS = HELIUS(
-            API_KEY=_CONFIG_DATA['HELIUS']['API_KEY']
-        )
+        cls.TWITTER = _load_section(TWITTER, 'TWITTER')
+        cls.HELIUS = _load_section(HELIUS, 'HELIUS')
+        cls.RPC = _load_section(RPC, 'RPC')
+        cls.INGEST = _load_section(INGEST, 'INGEST')
+        cls.PREFILTER = _load_section(PREFILTER, 'PREFILTER')
+        cls.DEDUP = _load_section(DEDUP, 'DEDUP')
+        cls.BACKFILL = _load_section(BACKFILL, 'BACKFILL')
+        cls.PIPELINE = _load_section(PIPELINE, 'PIPELINE')
+        cls.LEDGER = _load_section(LEDGER, 'LEDGER')
+        cls.CONVERGENCE = _load_section(CONVERGENCE, 'CONVERGENCE')
+        cls.SUPERVISOR = _load_section(SUPERVISOR, 'SUPERVISOR')
+        cls.PUBLISHER = _load_section(PUBLISHER, 'PUBLISHER')
+        cls.SINKS = _load_section(SINKS, 'SINKS')
+        cls.TEMPLATES = _load_section(TEMPLATES, 'TEMPLATES')
+        cls.PRICES = _load_section(PRICES, 'PRICES')
+        cls.LOGGING = _load_section(LOGGING, 'LOGGING')
+        cls.METRICS = _load_section(METRICS, 'METRICS')
+        cls.ARCHIVE = _load_section(ARCHIVE, 'ARCHIVE')
+        cls.WALLETS = _load_section(WALLETS, 'WALLETS')
+        cls.SHARDING = _load_section(SHARDING, 'SHARDING')
 
 Config.load()
@@ -5,3 +5,4 @@ COIN_SYMBOL_PLACEHOLDER = "__COIN_SYMBOL__"
 TOTLA_USD_PAID_PLACEHOLDER = "__TOTAL_USD_PAID__"
 BUYER_WALLET_ADDRESS_PLACEHOLDER = "__BUYER_WALLET_ADDRESS__"
 BUYER_NAME_PLACEHOLDER = "__BUYER_NAME___"
+WALLET_COUNT_PLACEHOLDER = "__WALLET_COUNT__"
@@ -0,0 +1,185 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from .logs_config import get_logger
+from .pipeline import SplTokenBuy
+from .publisher import coalesce_buys
+
+
+logger = get_logger()
+
+
+CLUSTER_BUY_TYPE = "cluster-buy"
+
+
+class _MintWindow:
+    """
+    The buys of one mint over the last ``len(buckets)`` buckets.
+
+    Bucket ``i`` lives in ``buckets[i % len(buckets)]``, and buckets are
+    cleared as the window moves past them, so every buy is added and
+    expired exactly once.
+    """
+
+    __slots__ = ("buckets", "first", "wallets", "amount", "usd", "emitted")
+
+    def __init__(self, size: int, bucket: int) -> None:
+        self.buckets: list[list[SplTokenBuy]] = [[] for _ in range(size)]
+        # Oldest bucket still in the window
+        self.first = bucket - size + 1
+        # wallet -> buys in the window
+        self.wallets: dict[str, int] = {}
+        self.amount = 0.0
+        self.usd = 0.0
+        self.emitted = False
+
+    def __len__(self) -> int:
+        return len(self.wallets)
+
+    def add(self, buy: SplTokenBuy, bucket: int) -> None:
+        self.buckets[bucket % len(self.buckets)].append(buy)
+        self.wallets[buy["buyer"]] = self.wallets.get(buy["buyer"], 0) + 1
+        self.amount += buy["amount_received"]
+        self.usd += buy.get("usd_paid") or 0.0
+
+    def expire(self, bucket: int) -> None:
+        """Moves the window to end at ``bucket``."""
+        first = bucket - len(self.buckets) + 1
+        # Past a whole window every bucket goes, however long the gap
+        self.first = max(self.first, first - len(self.buckets))
+        while self.first < first:
+            expired = self.buckets[self.first % len(self.buckets)]
+            for buy in expired:
+                count = self.wallets[buy["buyer"]] - 1
+                if count:
+                    self.wallets[buy["buyer"]] = count
+                else:
+                    del self.wallets[buy["buyer"]]
+                self.amount -= buy["amount_received"]
+                self.usd -= buy.get("usd_paid") or 0.0
+            expired.clear()
+            self.first += 1
+        if not self.wallets:
+            # A fresh cluster can form once the last one left the window
+            self.amount = self.usd = 0.0
+            self.emitted = False
+
+    def buys(self) -> list[SplTokenBuy]:
+        return sorted(
+            (buy for bucket in self.buckets for buy in bucket),
+            key=lambda buy: buy.get("block_time") or 0,
+        )
+
+
+class ConvergenceDetector:
+    """
+    Spots several tracked wallets buying the same mint within ``window``.
+
+    Buys pass through from ``input_queue`` to ``output_queue`` (unless
+    ``clusters_only``) and are counted in a sliding window per mint, made
+    of ``buckets`` time buckets by block time. Once ``min_wallets``
+    distinct wallets are in a mint's window, or at least two that bought
+    ``min_amount`` tokens or paid ``min_usd`` in total, one merged
+    ``cluster-buy`` is handed to ``publish``. The mint can cluster again
+    once its window emptied.
+    """
+
+    def __init__(
+        self,
+        input_queue: asyncio.Queue[SplTokenBuy],
+        output_queue: asyncio.Queue[SplTokenBuy],
+        publish: Callable[[SplTokenBuy], Awaitable[None]],
+        window: float = 600,
+        buckets: int = 60,
+        min_wallets: int = 3,
+        min_amount: float = 0,
+        min_usd: float = 0,
+        clusters_only: bool = False,
+    ) -> None:
+        self._input_queue = input_queue
+        self._output_queue = output_queue
+        self._publish = publish
+        self._buckets = max(1, buckets)
+        self._span = window / self._buckets
+        self._min_wallets = min_wallets
+        self._min_amount = min_amount
+        self._min_usd = min_usd
+        self._clusters_only = clusters_only
+        self._windows: dict[str, _MintWindow] = {}
+        self.clusters = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"mints": len(self._windows), "clusters": self.clusters}
+
+    async def run(self) -> None:
+        async with asyncio.TaskGroup() as gp:
+            gp.create_task(self._intake())
+            gp.create_task(self._sweeper())
+
+    async def add(self, buy: SplTokenBuy) -> Optional[SplTokenBuy]:
+        """Counts ``buy``, publishing and returning the cluster it completes."""
+        now = self._bucket(time.time())
+        # Buys from the future are clock skew, older ones land in their bucket
+        bucket = min(now, self._bucket(buy.get("block_time") or time.time()))
+        if bucket <= now - self._buckets:
+            return None
+
+        window = self._windows.get(buy["mint"])
+        if window is None:
+            window = self._windows[buy["mint"]] = _MintWindow(self._buckets, now)
+        else:
+            window.expire(now)
+        window.add(buy, bucket)
+        if window.emitted or not self._crossed(window):
+            return None
+
+        window.emitted = True
+        cluster = coalesce_buys(window.buys())
+        cluster["type"] = CLUSTER_BUY_TYPE
+        # The buy completing the cluster stands for it, e.g. for finality
+        cluster["signature"] = buy["signature"]
+        self.clusters += 1
+        logger.info(
+            f"Cluster buy of {buy['mint']}: {len(window)} wallets, "
+            f"{window.amount:,.2f} tokens, ${window.usd:,.2f}"
+        )
+        await self._publish(cluster)
+        return cluster
+
+    def sweep(self) -> None:
+        """Drops the windows of mints nobody bought lately."""
+        now = self._bucket(time.time())
+        for mint, window in list(self._windows.items()):
+            window.expire(now)
+            if not window:
+                del self._windows[mint]
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self._span)
+
+    def _crossed(self, window: _MintWindow) -> bool:
+        if len(window) >= self._min_wallets:
+            return True
+        return len(window) > 1 and (
+            (self._min_amount > 0 and window.amount >= self._min_amount)
+            or (self._min_usd > 0 and window.usd >= self._min_usd)
+        )
+
+    async def _intake(self) -> None:
+        while True:
+            buy = await self._input_queue.get()
+            try:
+                await self.add(buy)
+
+            except Exception as e:
+                logger.error(f"Convergence check of {buy['signature']} failed. {e}")
+
+            if not self._clusters_only:
+                await self._output_queue.put(buy)
+
+    async def _sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self._span * self._buckets)
+            self.sweep()
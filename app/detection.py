@@ -0,0 +1,88 @@
+from typing import Any, Container, Iterable, NamedTuple, Optional
+
+
+TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+TOKEN_2022_PROGRAM_ID = "TokenzQdBNbLqP7VEh5qv2gSD4fKh1L7kRjF2PaqB6u"
+
+
+class TokenBuy(NamedTuple):
+    """A tracked owner's balance of ``mint`` grew inside one transaction."""
+
+    signature: str
+    owner: str
+    mint: str
+    # Raw integer amounts in the mint's base units
+    previous_amount: int
+    final_amount: int
+    decimals: int
+    program_id: Optional[str]
+
+    @property
+    def amount_received(self) -> int:
+        return self.final_amount - self.previous_amount
+
+    def ui(self, amount: int) -> float:
+        return amount / 10**self.decimals
+
+
+def owner_balances(
+    balances: Optional[list[dict[str, Any]]], tracked: Container[str]
+) -> dict[tuple[str, str], tuple[int, int, Optional[str]]]:
+    """Sums the token balances of tracked owners by (owner, mint)."""
+    summed: dict[tuple[str, str], tuple[int, int, Optional[str]]] = {}
+    for balance in balances or ():
+        owner = balance.get("owner")
+        if owner not in tracked:
+            continue
+        key = (owner, balance["mint"])
+        token_amount = balance["uiTokenAmount"]
+        # ``amount`` is the exact integer string; ``uiAmount`` is a lossy
+        # float and is None for empty accounts.
+        amount = int(token_amount["amount"])
+        previous = summed.get(key)
+        if previous is not None:
+            amount += previous[0]
+        summed[key] = (amount, token_amount["decimals"], balance.get("programId"))
+    return summed
+
+
+def detect_buys(
+    transactions: Iterable[tuple[str, Optional[dict[str, Any]]]],
+    tracked: Container[str],
+) -> list[TokenBuy]:
+    """
+    Finds every token buy by a tracked owner in a batch of
+    ``(signature, meta)`` pairs.
+
+    All tracked owners are evaluated in one pass over each transaction's
+    balances, so a transaction touching several tracked wallets (or several
+    mints, or several token accounts of the same owner) yields all of them.
+    Token and Token-2022 balances are handled alike.
+    """
+    buys: list[TokenBuy] = []
+    for signature, meta in transactions:
+        # Failed transactions never change token balances
+        if not meta or meta.get("err") is not None:
+            continue
+
+        post = owner_balances(meta.get("postTokenBalances"), tracked)
+        if not post:
+            continue
+        pre = owner_balances(meta.get("preTokenBalances"), tracked)
+
+        for (owner, mint), (final_amount, decimals, program_id) in post.items():
+            previous = pre.get((owner, mint))
+            previous_amount = previous[0] if previous is not None else 0
+            if final_amount > previous_amount:
+                buys.append(
+                    TokenBuy(
+                        signature=signature,
+                        owner=owner,
+                        mint=mint,
+                        previous_amount=previous_amount,
+                        final_amount=final_amount,
+                        decimals=decimals,
+                        program_id=program_id,
+                    )
+                )
+    return buys
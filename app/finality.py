@@ -0,0 +1,138 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from .logs_config import get_logger
+from .metrics import metrics
+
+
+logger = get_logger()
+
+
+# getSignatureStatuses takes at most this many signatures per call
+_STATUS_BATCH_SIZE = 256
+
+
+class _Alert(NamedTuple):
+    deadline: float
+    signatures: set[str]
+
+
+class FinalityTracker:
+    """
+    Retracts alerts whose transactions never finalize.
+
+    Transactions pushed below ``finalized`` commitment can still be dropped
+    with their fork, along with the buys found in them. Every published
+    alert is tracked with its signatures, which are polled through
+    ``getSignatureStatuses`` until all of them are finalized. An alert with
+    a failed transaction, or with one the node still doesn't know after
+    ``timeout``, is retracted through ``retract``.
+    """
+
+    def __init__(
+        self,
+        call: Callable[[str, list[Any]], Awaitable[Any]],
+        retract: Callable[[Any], Awaitable[Any]],
+        timeout: float = 60.0,
+        poll_interval: float = 5.0,
+    ) -> None:
+        self._call = call
+        self._retract = retract
+        self._timeout = timeout
+        self._poll_interval = poll_interval
+        # alert id (the tweet id) -> signatures not finalized yet
+        self._alerts: dict[Any, _Alert] = {}
+        self.finalized = 0
+        self.retracted = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._alerts),
+            "finalized": self.finalized,
+            "retracted": self.retracted,
+        }
+
+    def track(self, alert_id: Any, signatures: list[str]) -> None:
+        if signatures:
+            deadline = time.monotonic() + self._timeout
+            self._alerts[alert_id] = _Alert(deadline, set(signatures))
+
+    async def run(self) -> None:
+        logger.info(f"Retracting alerts not finalized within {self._timeout:.0f}s")
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            if not self._alerts:
+                continue
+            try:
+                await self.check()
+
+            except Exception as e:
+                logger.error(f"Finality check failed. {e}", exc_info=True)
+
+    async def check(self) -> None:
+        """Polls the pending signatures once and settles the alerts it can."""
+        pending = {sig for alert in self._alerts.values() for sig in alert.signatures}
+        statuses = await self._statuses(pending, search_history=False)
+        now = time.monotonic()
+        expired = [
+            alert_id
+            for alert_id, alert in self._alerts.items()
+            if alert.deadline <= now and alert.signatures.difference(statuses)
+        ]
+        if expired:
+            # Old enough to have left the node's recent status cache
+            late = set().union(*(self._alerts[a].signatures for a in expired))
+            statuses.update(await self._statuses(late, search_history=True))
+
+        for alert_id, alert in list(self._alerts.items()):
+            failed = missing = False
+            for sig in list(alert.signatures):
+                status = statuses.get(sig)
+                if status is None:
+                    missing = True
+                    continue
+                if status.get("err") is not None:
+                    failed = True
+                elif status.get("confirmationStatus") == "finalized":
+                    alert.signatures.discard(sig)
+
+            if not alert.signatures:
+                del self._alerts[alert_id]
+                self.finalized += 1
+            elif failed or (missing and alert.deadline <= now):
+                del self._alerts[alert_id]
+                await self._retract_alert(alert_id, alert.signatures, failed)
+
+    async def _statuses(
+        self, signatures: set[str], search_history: bool
+    ) -> dict[str, dict[str, Any]]:
+        ordered = list(signatures)
+        statuses: dict[str, dict[str, Any]] = {}
+        for start in range(0, len(ordered), _STATUS_BATCH_SIZE):
+            batch = ordered[start : start + _STATUS_BATCH_SIZE]
+            result = await self._call(
+                "getSignatureStatuses",
+                [batch, {"searchTransactionHistory": search_history}],
+            )
+            for sig, status in zip(batch, (result or {}).get("value") or ()):
+                if status is not None:
+                    statuses[sig] = status
+        return statuses
+
+    async def _retract_alert(
+        self, alert_id: Any, signatures: set[str], failed: bool
+    ) -> None:
+        reason = "failed" if failed else "was dropped"
+        logger.warning(
+            f"Retracting alert {alert_id}, transaction {reason}: {sorted(signatures)}"
+        )
+        try:
+            await self._retract(alert_id)
+
+        except Exception as e:
+            return logger.error(f"Failed to retract alert {alert_id}. {e}")
+
+        self.retracted += 1
+        metrics.inc("alerts_retracted_total")
@@ -2,21 +2,32 @@ import os
 
 INPUT_DIR = "input"
 OUTPUT_DIR = "output"
+ARCHIVE_DIR = f"{OUTPUT_DIR}/archive"
 
 
 # input files
 WALLETS_FILE = f"{INPUT_DIR}/wallets.txt"
 TWEET_CONTENT_FILE = f"{INPUT_DIR}/tweet-content.txt"
+CLUSTER_TWEET_CONTENT_FILE = f"{INPUT_DIR}/cluster-tweet-content.txt"
+
+# output files
+TOKEN_META_DB_FILE = f"{OUTPUT_DIR}/token-meta.sqlite3"
+SEEN_SIGNATURES_FILE = f"{OUTPUT_DIR}/seen-signatures.bin"
+CHECKPOINTS_FILE = f"{OUTPUT_DIR}/checkpoints.json"
+LEDGER_SNAPSHOT_FILE = f"{OUTPUT_DIR}/ledger.json"
+OUTBOX_DB_FILE = f"{OUTPUT_DIR}/tweet-outbox.sqlite3"
 
 
 LOGS_FILENAME = "logs.log"
 
-current_locals = locals().copy()
-for varname, value in current_locals.items():
-    if varname.isupper() and varname.endswith("DIR"):
-        os.makedirs(value, exist_ok=True)
 
-    if varname.isupper() and varname.endswith("FILE"):
-        if not os.path.exists(value):
-            with open(value, "w", encoding="UTF-8") as _:
-                pass
+def ensure_files() -> None:
+    """Creates the folders and the missing files above, at startup."""
+    for varname, value in globals().copy().items():
+        if varname.isupper() and varname.endswith("DIR"):
+            os.makedirs(value, exist_ok=True)
+
+        if varname.isupper() and varname.endswith("FILE"):
+            if not os.path.exists(value):
+                with open(value, "w", encoding="UTF-8") as _:
+                    pass
@@ -1,4 +1,4 @@
-from typing import List, Generator, Optional
+from typing import Dict, List, Generator, Optional
 import itertools
 import os
 import random
@@ -79,6 +79,15 @@ def read_txt_lines(filename: str) -> List[str]:
     return [r.strip() for r in raw if r.strip() != ""]
 
 
+def read_wallets(filename: str) -> Dict[str, str]:
+    """Reads ``<address> [name]`` lines into an address -> name mapping."""
+    wallets: Dict[str, str] = {}
+    for line in read_txt_lines(filename):
+        address, _, name = line.replace(",", " ", 1).partition(" ")
+        wallets[address] = name.strip()
+    return wallets
+
+
 class TextLineReader:
     def __init__(self, text_file: str, shuffle_lines: bool = False):
         self._text_file = text_file
@@ -0,0 +1,244 @@
+import asyncio
+import itertools
+import math
+import os
+import sys
+from typing import Any, Collection, Optional
+
+from .codec import codec
+from .detection import TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID, owner_balances
+from .logs_config import get_logger
+from .rpc import TransactionFetcher
+from .snapshots import SnapshotFile
+
+
+logger = get_logger()
+
+
+_TOKEN_PROGRAMS = (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID)
+
+
+class TokenLedger:
+    """
+    Token positions of the tracked wallets, as raw integer amounts by owner
+    and mint, with the number of tracked holders of every mint.
+
+    ``run`` seeds every tracked wallet not seen yet with batched
+    ``getTokenAccountsByOwner`` calls, forgets the wallets no longer
+    tracked, and snapshots the ledger to ``snapshot_file`` so a restart
+    only seeds new wallets. ``apply`` sets the positions a processed
+    transaction touched to their balances after it; transactions older
+    than a wallet's seed are already part of it and skipped.
+
+    The pipeline never sees the sells and transfers its prefilter drops,
+    so positions they changed are only right again once a transaction of
+    the mint passes. ``run`` therefore also re-seeds every wallet once per
+    ``reseed_interval`` seconds, the longest seeded first.
+    """
+
+    def __init__(
+        self,
+        fetcher: TransactionFetcher,
+        tracked_wallets: Collection[str],
+        snapshot_file: Optional[str] = None,
+        seed_batch_size: int = 50,
+        reseed_interval: float = 6 * 3600,
+    ) -> None:
+        self._fetcher = fetcher
+        self._tracked_wallets = tracked_wallets
+        self._snapshot_file = snapshot_file
+        self._seed_batch_size = max(1, seed_batch_size)
+        self._reseed_interval = reseed_interval
+        # owner -> mint -> amount, only non-zero positions
+        self._positions: dict[str, dict[str, int]] = {}
+        self._holders: dict[str, int] = {}
+        # owner -> slot its seed was read at, longest seeded first
+        self._seeded: dict[str, int] = {}
+        self._dirty = False
+        self._snapshot = SnapshotFile(snapshot_file) if snapshot_file else None
+        if snapshot_file:
+            self._load()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "positions": sum(len(mints) for mints in self._positions.values()),
+            "mints": len(self._holders),
+            "seeded": len(self._seeded),
+        }
+
+    def balance(self, owner: str, mint: str) -> int:
+        mints = self._positions.get(owner)
+        return mints.get(mint, 0) if mints is not None else 0
+
+    def holders(self, mint: str) -> int:
+        """Tracked wallets holding ``mint``."""
+        return self._holders.get(mint, 0)
+
+    def apply(self, meta: Optional[dict[str, Any]], slot: Optional[int]) -> None:
+        """Sets the positions a processed transaction touched to its balances."""
+        if not meta or meta.get("err") is not None:
+            return
+        tracked = self._tracked_wallets
+        post = owner_balances(meta.get("postTokenBalances"), tracked)
+        pre = owner_balances(meta.get("preTokenBalances"), tracked)
+        for owner, mint in post.keys() | pre.keys():
+            seeded_at = self._seeded.get(owner)
+            if seeded_at is not None and slot is not None and slot <= seeded_at:
+                continue
+            # Absolute, unlike pre/post deltas, so missed transactions don't add up
+            final = post[owner, mint][0] if (owner, mint) in post else 0
+            if final != self.balance(owner, mint):
+                self._set(owner, mint, final)
+
+    async def run(self, interval: float = 60) -> None:
+        """Seeds new wallets, forgets removed ones and snapshots, periodically."""
+        try:
+            while True:
+                tracked = set(self._tracked_wallets)
+                for owner in (self._positions.keys() | self._seeded.keys()) - tracked:
+                    self._forget(owner)
+                pending = [wallet for wallet in tracked if wallet not in self._seeded]
+                pending += self._due_reseeds(interval)
+                for start in range(0, len(pending), self._seed_batch_size):
+                    await self.seed(pending[start : start + self._seed_batch_size])
+                if self._dirty and self._snapshot_file:
+                    self._dirty = False
+                    await asyncio.to_thread(self._write, self._frozen())
+                await asyncio.sleep(interval)
+
+        finally:
+            if self._snapshot_file:
+                self._write(self._frozen())
+
+    def _due_reseeds(self, interval: float) -> list[str]:
+        """The longest seeded wallets, enough to re-seed all once per interval."""
+        if self._reseed_interval <= 0 or not self._seeded:
+            return []
+        count = math.ceil(len(self._seeded) * interval / self._reseed_interval)
+        return list(itertools.islice(self._seeded, count))
+
+    async def seed(self, owners: list[str]) -> None:
+        """Replaces the positions of ``owners`` with their token accounts."""
+        requests = [
+            {
+                "jsonrpc": "2.0",
+                "id": i,
+                "method": "getTokenAccountsByOwner",
+                "params": [
+                    owner,
+                    {"programId": program_id},
+                    {"encoding": "jsonParsed", "commitment": "confirmed"},
+                ],
+            }
+            for i, (owner, program_id) in enumerate(
+                (owner, program_id)
+                for owner in owners
+                for program_id in _TOKEN_PROGRAMS
+            )
+        ]
+        try:
+            responses = await self._fetcher.call_with_retries(
+                requests, label=f"getTokenAccountsByOwner batch of {len(owners)}"
+            )
+
+        except Exception as e:
+            return logger.error(f"Ledger seed failed. {e}", exc_info=True)
+
+        accounts: dict[str, list[dict[str, Any]]] = {owner: [] for owner in owners}
+        answered: dict[str, list[int]] = {owner: [] for owner in owners}
+        for response in responses:
+            owner = owners[response["id"] // len(_TOKEN_PROGRAMS)]
+            result = response.get("result")
+            if result is not None:
+                accounts[owner].extend(result.get("value") or ())
+                answered[owner].append(result.get("context", {}).get("slot", 0))
+
+        failed = 0
+        for owner in owners:
+            # Both programs have to answer, the others are retried next run
+            if len(answered[owner]) < len(_TOKEN_PROGRAMS):
+                failed += 1
+                continue
+            summed: dict[str, int] = {}
+            for account in accounts[owner]:
+                info = account["account"]["data"]["parsed"]["info"]
+                amount = int(info["tokenAmount"]["amount"])
+                summed[info["mint"]] = summed.get(info["mint"], 0) + amount
+            self._forget(owner)
+            for mint, amount in summed.items():
+                self._set(owner, mint, amount)
+            # Re-inserted last, so the next re-seed comes after every other
+            self._seeded[owner] = max(answered[owner])
+        if failed:
+            logger.warning(f"Ledger seed of {failed} wallets failed, retrying.")
+
+    def _set(self, owner: str, mint: str, amount: int) -> None:
+        mints = self._positions.get(owner)
+        held = mints is not None and mint in mints
+        if amount > 0:
+            if mints is None:
+                mints = self._positions[owner] = {}
+            if not held:
+                mint = sys.intern(mint)
+                self._holders[mint] = self._holders.get(mint, 0) + 1
+            mints[mint] = amount
+        elif held:
+            assert mints is not None
+            del mints[mint]
+            if not mints:
+                del self._positions[owner]
+            if self._holders[mint] > 1:
+                self._holders[mint] -= 1
+            else:
+                del self._holders[mint]
+        self._dirty = True
+
+    def _forget(self, owner: str) -> None:
+        for mint in list(self._positions.get(owner, ())):
+            self._set(owner, mint, 0)
+        self._seeded.pop(owner, None)
+        self._dirty = True
+
+    def _frozen(self) -> dict[str, Any]:
+        return {
+            "seeded": dict(self._seeded),
+            "positions": {
+                owner: dict(mints) for owner, mints in self._positions.items()
+            },
+        }
+
+    def _write(self, snapshot: dict[str, Any]) -> None:
+        assert self._snapshot is not None
+        self._snapshot.write_bytes(codec.dumps(snapshot))
+
+    def _load(self) -> None:
+        assert self._snapshot_file
+        if not os.path.exists(self._snapshot_file):
+            return
+        with open(self._snapshot_file, "rb") as f:
+            data = f.read().strip()
+        if not data:
+            return
+        try:
+            snapshot = codec.loads(data)
+            for owner, mints in snapshot["positions"].items():
+                owner = sys.intern(owner)
+                for mint, amount in mints.items():
+                    self._set(owner, mint, amount)
+            self._seeded = {
+                sys.intern(owner): slot for owner, slot in snapshot["seeded"].items()
+            }
+
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Ignoring corrupt ledger snapshot. {e}")
+            self._positions.clear()
+            self._holders.clear()
+            self._seeded.clear()
+            return
+
+        self._dirty = False
+        logger.info(
+            f"Loaded the token positions of {len(self._seeded)} wallets "
+            f"from {self._snapshot_file}"
+        )
@@ -1,20 +1,18 @@
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import json
 import logging
+import os
+import queue
+import threading
 import colorama
 from typing import Any, Optional, Dict
-import copy
-
-colorama.init()
 
 LOGS_FILENAME = "logs.log"
+LOGGER_NAME = "app"
 
-
-class NoExceptionStreamHandler(logging.StreamHandler[Any]):
-    def emit(self, record: logging.LogRecord) -> Any:
-        record = copy.copy(record)
-        # Clear exc_info to disable exception output for this handler only
-        record.exc_info = None
-        super().emit(record)
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
 
 
 class LevelBasedFormatter(logging.Formatter):
@@ -24,10 +22,10 @@ class LevelBasedFormatter(logging.Formatter):
         datefmt: Optional[str] = None,
         style: str = "%",
         level_formats: Optional[Dict[int, str]] = None,
+        show_exceptions: bool = True,
     ) -> None:
         super().__init__(fmt, datefmt, style)  # type: ignore
-        # If no level_formats are provided, initialize with an empty dict
-        self.level_formats: Dict[int, str] = level_formats or {}
+        self.show_exceptions = show_exceptions
         self.colors = {
             logging.DEBUG: colorama.Fore.LIGHTWHITE_EX,
             logging.INFO: colorama.Fore.GREEN + colorama.Style.BRIGHT,
@@ -38,61 +36,192 @@ class LevelBasedFormatter(logging.Formatter):
             + colorama.Back.RED,
         }
         self.color_reset = colorama.Style.RESET_ALL
+        # One formatter per level, built once instead of once per record
+        self.default_formatter = logging.Formatter(
+            fmt, datefmt, style  # type: ignore
+        )
+        self.level_formatters: Dict[int, logging.Formatter] = {
+            level: logging.Formatter(level_fmt, datefmt)
+            for level, level_fmt in (level_formats or {}).items()
+        }
 
     def format(self, record: logging.LogRecord) -> str:
-        # Check if there's a format for this level; use it if it exists
-        log_fmt = self.level_formats.get(record.levelno, self._fmt)
-        formatter = logging.Formatter(log_fmt)
+        formatter = self.level_formatters.get(record.levelno, self.default_formatter)
+        if self.show_exceptions:
+            formatted_message = formatter.format(record)
+        else:
+            # Message only, without the traceback the file handler still gets
+            record.message = record.getMessage()
+            formatted_message = formatter.formatMessage(record)
 
         # Apply color to the message based on log level
-        formatted_message = formatter.format(record)
         color_code = self.colors.get(record.levelno, "")
         return f"{color_code}{formatted_message}{self.color_reset}"
 
 
-def get_logger() -> logging.Logger:
-    max_filesize_in_mbs = 2_000
-    file_encoding = "UTF-8"
-
-    logger = logging.Logger(__name__)
-
-    level_formats: Dict[int, str] = {
-        logging.DEBUG: "[.] %(message)s",
-        logging.INFO: "[+] %(message)s",
-        logging.WARNING: "[*] %(message)s",
-        logging.ERROR: "[-] %(message)s",
-        logging.CRITICAL: "[!] %(message)s",
-    }
-
-    level_based_fmt = LevelBasedFormatter(
-        "[+] %(message)s", level_formats=level_formats
-    )
-    console_handler = NoExceptionStreamHandler()
-    console_handler.setFormatter(level_based_fmt)
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, including any ``extra`` fields."""
 
-    file_handler = RotatingFileHandler(
-        LOGS_FILENAME,
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": record.created,
+            "level": record.levelname,
+            "file": record.filename,
+            "line": record.lineno,
+            "msg": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS
+        )
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Keeps one in ``every`` DEBUG records per call site, so high-volume debug
+    lines stay visible without costing a write each. Other levels pass.
+    """
+
+    def __init__(self, every: int = 1) -> None:
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[tuple[str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        count = self._counts.get(site, 0)
+        self._counts[site] = count + 1
+        return count % self.every == 0
+
+
+class _SetupOnFirstRecord(logging.Handler):
+    """Stands in for the real handlers until something is logged."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        _get_setup().queue_handler.handle(record)
+
+
+class _LocalQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener lives in this process, so the record doesn't need the
+        # copy and pickling-safe flattening the stock handler does. Only the
+        # message is rendered now, in case its arguments change later.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _file_handler(filename: str) -> RotatingFileHandler:
+    return RotatingFileHandler(
+        filename,
         mode="a",
-        maxBytes=max_filesize_in_mbs * 1024 * 1024,
+        maxBytes=2_000 * 1024 * 1024,
         backupCount=2,
-        encoding=file_encoding,
+        encoding="UTF-8",
         delay=False,
     )
-    file_logging_fmt = logging.Formatter(
-        "[%(asctime)s - %(levelname)-8s - %(filename)s - %(lineno)-4s - %(message)s"
-    )
-    file_logging_fmt = logging.Formatter(
-        "%(asctime)s - %(levelname)-8s - [%(filename)s:%(lineno)s] - %(message)s"
-    )
-    file_handler.setFormatter(file_logging_fmt)
 
-    # Log level of logger should always be DEBUG
-    logger.setLevel(logging.DEBUG)
-    file_handler.setLevel(logging.DEBUG)
-    console_handler.setLevel(logging.DEBUG)
 
-    # Add handlers to the logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+class _LoggingSetup:
+    def __init__(self) -> None:
+        colorama.init()
+        self.logger = get_logger()
+        self.sampler = _sampler
+
+        level_formats: Dict[int, str] = {
+            logging.DEBUG: "[.] %(message)s",
+            logging.INFO: "[+] %(message)s",
+            logging.WARNING: "[*] %(message)s",
+            logging.ERROR: "[-] %(message)s",
+            logging.CRITICAL: "[!] %(message)s",
+        }
+        self.console_handler = logging.StreamHandler()
+        self.console_handler.setFormatter(
+            LevelBasedFormatter(
+                "[+] %(message)s",
+                level_formats=level_formats,
+                show_exceptions=False,
+            )
+        )
+
+        self.file_handler = _file_handler(LOGS_FILENAME)
+        self.text_formatter = logging.Formatter(
+            "%(asctime)s - %(levelname)-8s - [%(filename)s:%(lineno)s] - %(message)s"
+        )
+        self.file_handler.setFormatter(self.text_formatter)
+
+        # Handlers run on the listener's thread, off the event loop
+        log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        self.queue_handler = _LocalQueueHandler(log_queue)
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self.queue_handler)
+        self.listener = QueueListener(
+            log_queue,
+            self.console_handler,
+            self.file_handler,
+            respect_handler_level=True,
+        )
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+
+_setup: Optional[_LoggingSetup] = None
+_setup_lock = threading.RLock()
+_sampler = DebugSampler()
+
+
+def _get_setup() -> _LoggingSetup:
+    global _setup
+    with _setup_lock:
+        if _setup is None:
+            _setup = _LoggingSetup()
+        return _setup
+
 
+def get_logger() -> logging.Logger:
+    """
+    Returns the bot's logger. Its handlers, thread and log file are only
+    set up once the first record is logged, or by ``configure_logging``,
+    so importing a module that logs costs nothing.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        with _setup_lock:
+            if not logger.handlers:
+                logger.setLevel(logging.DEBUG)
+                logger.propagate = False
+                logger.addFilter(_sampler)
+                logger.addHandler(_SetupOnFirstRecord())
     return logger
+
+
+def configure_logging(
+    level: str = "DEBUG",
+    json_lines: bool = False,
+    debug_sample_every: int = 1,
+    log_file: Optional[str] = None,
+) -> None:
+    """
+    Applies the logging settings from the config. Records below ``level``
+    are dropped before their message is ever formatted. ``log_file``
+    replaces logs.log, e.g. for shard processes which can't share it.
+    """
+    setup = _get_setup()
+    if log_file and os.path.abspath(log_file) != setup.file_handler.baseFilename:
+        setup.listener.stop()
+        setup.file_handler.close()
+        setup.file_handler = _file_handler(log_file)
+        setup.listener.handlers = (setup.console_handler, setup.file_handler)
+        setup.listener.start()
+    setup.logger.setLevel(level.upper())
+    setup.sampler.every = max(1, debug_sample_every)
+    setup.file_handler.setFormatter(
+        JsonLinesFormatter() if json_lines else setup.text_formatter
+    )
@@ -0,0 +1,220 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from .logs_config import get_logger
+
+
+logger = get_logger()
+
+
+# Seconds; covers sub-millisecond cache hits up to slow tweets
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_HELP = {
+    "ws_notifications_total": ("counter", "Subscription notifications received"),
+    "ws_reconnects_total": ("counter", "Websocket reconnects per hub connection"),
+    "tracked_wallets": ("gauge", "Wallets currently monitored"),
+    "prefilter_dropped_total": ("counter", "Notifications dropped by the pre-filter"),
+    "rpc_requests_total": ("counter", "HTTP requests sent per RPC endpoint"),
+    "rpc_errors_total": ("counter", "Failed HTTP requests per RPC endpoint"),
+    "rpc_latency_seconds": ("histogram", "HTTP request latency per RPC endpoint"),
+    "rpc_hedged_total": ("counter", "Slow requests duplicated to another endpoint"),
+    "buys_detected_total": ("counter", "Token buys detected"),
+    "tweets_published_total": ("counter", "Tweets published"),
+    "tweet_errors_total": ("counter", "Failed tweet attempts"),
+    "alerts_retracted_total": ("counter", "Tweets deleted as never finalized"),
+    "sink_delivered_total": ("counter", "Buys delivered per sink"),
+    "sink_dropped_total": ("counter", "Buys dropped at a full sink queue"),
+    "sink_errors_total": ("counter", "Buys a sink failed to take after retries"),
+    "sink_latency_seconds": ("histogram", "Time from fan-out to delivery per sink"),
+    "queue_depth": ("gauge", "Items waiting in each pipeline queue"),
+    "startup_seconds": ("gauge", "Time from start to the first and all subscriptions"),
+    "stage_seconds": ("histogram", "Time from the previous traced stage"),
+    "end_to_end_seconds": ("histogram", "Time from first trace mark to publish"),
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Counters, gauges, histograms and per-signature stage traces.
+
+    Every recording call returns immediately while disabled, so the
+    instrumentation left in the hot paths costs one attribute check.
+    Traces record when a signature passes each pipeline stage and turn
+    into ``stage_seconds`` observations once the signature is published.
+    """
+
+    def __init__(self, max_traces: int = 10_000) -> None:
+        self.enabled = False
+        self._max_traces = max_traces
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._gauges: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, _Histogram]] = {}
+        # signature -> [(stage, monotonic time)], oldest trace first
+        self._traces: OrderedDict[str, list[tuple[str, float]]] = OrderedDict()
+        self._collectors: list[Callable[[], None]] = []
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Registers a callback that refreshes gauges before they're read."""
+        self._collectors.append(collector)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        if not self.enabled:
+            return
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        self._gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        series = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        if key not in series:
+            series[key] = _Histogram()
+        series[key].observe(value)
+
+    def mark(self, signature: str, stage: str) -> None:
+        """Records that ``signature`` reached ``stage``."""
+        if not self.enabled:
+            return
+        trace = self._traces.get(signature)
+        if trace is None:
+            trace = self._traces[signature] = []
+            while len(self._traces) > self._max_traces:
+                self._traces.popitem(last=False)
+        trace.append((stage, time.monotonic()))
+
+    def finish(self, signature: str, stage: Optional[str] = None) -> None:
+        """Ends a trace, observing its stage timings when ``stage`` is given."""
+        if not self.enabled:
+            return
+        trace = self._traces.pop(signature, None)
+        if trace is None or stage is None:
+            return
+        trace.append((stage, time.monotonic()))
+        for (_, started), (name, ended) in zip(trace, trace[1:]):
+            self.observe("stage_seconds", ended - started, stage=name)
+        self.observe("end_to_end_seconds", trace[-1][1] - trace[0][1])
+
+    def summary(self) -> dict[str, object]:
+        """Mean stage latencies in ms plus the totals, for the status log line."""
+        self._collect()
+        stages = {
+            dict(key).get("stage", "end_to_end"): round(h.sum / h.count * 1000, 1)
+            for name in ("stage_seconds", "end_to_end_seconds")
+            for key, h in self._histograms.get(name, {}).items()
+            if h.count
+        }
+        totals = {
+            name: sum(series.values()) for name, series in self._counters.items()
+        }
+        return {"stage_ms": stages, "totals": totals, "traces": len(self._traces)}
+
+    def render(self) -> str:
+        """The Prometheus text exposition of every series."""
+        self._collect()
+        lines: list[str] = []
+        for name, series in sorted({**self._counters, **self._gauges}.items()):
+            self._header(lines, name)
+            for key, value in series.items():
+                lines.append(f"{name}{_labels(key)} {value}")
+        for name, histograms in sorted(self._histograms.items()):
+            self._header(lines, name)
+            for key, h in histograms.items():
+                cumulative = 0
+                for bound, count in zip(_BUCKETS, h.counts):
+                    cumulative += count
+                    le = _labels(key + (("le", str(bound)),))
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                le = _labels(key + (("le", "+Inf"),))
+                lines.append(f"{name}_bucket{le} {h.count}")
+                lines.append(f"{name}_sum{_labels(key)} {h.sum}")
+                lines.append(f"{name}_count{_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9108) -> None:
+        """Serves ``render()`` over HTTP for Prometheus to scrape."""
+        server = await asyncio.start_server(self._handle_scrape, host, port)
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_scrape(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request_line = await reader.readline()
+            # Headers are irrelevant, just drain them
+            while (await reader.readline()).strip():
+                pass
+            path = request_line.split(b" ")[1] if b" " in request_line else b""
+            if path == b"/metrics":
+                status, body = "200 OK", self.render().encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
+
+    def _collect(self) -> None:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed. {e}")
+
+    @staticmethod
+    def _header(lines: list[str], name: str) -> None:
+        kind, help_text = _HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+
+def _labels(key: Labels) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in key) + "}"
+
+
+# Process-wide instance, enabled from main when [METRICS] ENABLED is set
+metrics = Metrics()
@@ -0,0 +1,403 @@
+import asyncio
+from typing import Any, NamedTuple, Optional, TypedDict
+
+from .archive import TransactionArchive
+from .backfill import Checkpoints
+from .detection import TokenBuy, detect_buys
+from .ledger import TokenLedger
+from .logs_config import get_logger
+from .metrics import metrics
+from .rpc import TransactionFetcher
+from .seen import SeenSignatures
+from .supervisor import ComponentFactory
+from .token_meta import TokenMetaCache
+from .valuation import PriceOracle, quote_spent, usd_value
+
+
+logger = get_logger()
+
+
+_DETECT_BATCH_SIZE = 64
+# Stands in for the metadata of mints Helius can't describe
+_UNKNOWN_TOKEN = {"name": "Unknown", "symbol": "unknown"}
+
+
+class SplTokenBuy(TypedDict):
+    signature: str
+    buyer: str
+    # Every wallet behind the buy, several for merged buys and clusters
+    buyers: list[str]
+    mint: str
+    amount_received: float
+    final_balance: float
+    previous_balance: float
+    decimals: int
+    type: str
+    token_name: str
+    token_symbol: str
+    block_time: Optional[int]
+    # UI amounts spent per quote mint, and their value once priced
+    quote_paid: dict[str, float]
+    usd_paid: Optional[float]
+    # From the ledger, None without one: whether the buyer held none of the
+    # mint before, by how much the position grew otherwise, and how many
+    # tracked wallets hold the mint now
+    new_position: Optional[bool]
+    position_change_pct: Optional[float]
+    holders: Optional[int]
+
+
+def buyers_of(buy: Any) -> list[str]:
+    """The wallets behind ``buy``, also for buys queued before ``buyers``."""
+    return buy.get("buyers") or [buy["buyer"]]
+
+
+class SigNotification(NamedTuple):
+    signature: str
+    wallet: str
+    slot: Optional[int]
+
+
+class Pipeline:
+    """
+    The shared notify → fetch → detect → value → publish stages.
+
+    Stages are connected by bounded queues, so a slow stage makes the one
+    before it wait instead of letting a queue grow without limit. Once the
+    notify queue is full the subscription hub stops reading its sockets.
+
+    With a ``ledger``, every detected transaction updates the tracked
+    wallets' positions and buys report the position they add to. Top-ups
+    below ``min_position_change_pct`` are dropped as dust, and with
+    ``ignore_unpaid`` so are buys that paid nothing, such as airdrops.
+    """
+
+    def __init__(
+        self,
+        fetcher: TransactionFetcher,
+        token_meta: TokenMetaCache,
+        seen: SeenSignatures,
+        checkpoints: Checkpoints,
+        tracked_wallets: set[str],
+        output_queue: asyncio.Queue[SplTokenBuy],
+        price_oracle: PriceOracle,
+        quote_mints: Optional[set[str]] = None,
+        archive: Optional[TransactionArchive] = None,
+        ledger: Optional[TokenLedger] = None,
+        min_position_change_pct: float = 0,
+        ignore_unpaid: bool = False,
+        notify_queue_size: int = 10_000,
+        detect_queue_size: int = 1_000,
+        value_queue_size: int = 1_000,
+        fetch_concurrency: int = 128,
+        detect_workers: int = 4,
+    ) -> None:
+        self._fetcher = fetcher
+        self._token_meta = token_meta
+        self._seen = seen
+        self._checkpoints = checkpoints
+        self._tracked_wallets = tracked_wallets
+        self._output_queue = output_queue
+        self._price_oracle = price_oracle
+        self._quote_mints = quote_mints or set()
+        self._archive = archive
+        self._ledger = ledger
+        self._min_position_change_pct = min_position_change_pct
+        self._ignore_unpaid = ignore_unpaid
+        self._fetch_concurrency = max(1, fetch_concurrency)
+        self._detect_workers = max(1, detect_workers)
+
+        self._notify_queue: asyncio.Queue[SigNotification] = asyncio.Queue(
+            notify_queue_size
+        )
+        self._detect_queue: asyncio.Queue[tuple[str, dict[str, Any]]] = (
+            asyncio.Queue(detect_queue_size)
+        )
+        self._value_queue: asyncio.Queue[SplTokenBuy] = asyncio.Queue(value_queue_size)
+
+    def queue_depths(self) -> dict[str, int]:
+        return {
+            "notify": self._notify_queue.qsize(),
+            "detect": self._detect_queue.qsize(),
+            "value": self._value_queue.qsize(),
+            "output": self._output_queue.qsize(),
+        }
+
+    def stages(self) -> list[tuple[str, ComponentFactory]]:
+        return [
+            ("fetch_stage", self.run_fetch_stage),
+            ("detect_stage", self.run_detect_stage),
+            ("value_stage", self.run_value_stage),
+        ]
+
+    async def submit(
+        self, signature: str, wallet: str, slot: Optional[int] = None
+    ) -> None:
+        """Queues a signature for fetching. Waits while the pipeline is saturated."""
+        self._checkpoints.begin(wallet, signature, slot)
+        await self._notify_queue.put(SigNotification(signature, wallet, slot))
+
+    async def submit_transaction(
+        self, signature: str, wallet: str, trx: dict[str, Any]
+    ) -> None:
+        """Queues a transaction pushed by the node, skipping the fetch stage."""
+        self._checkpoints.begin(wallet, signature, trx.get("slot"))
+        if not self._first_seen(signature, wallet, trx.get("slot")):
+            return
+        self._record(signature, wallet, trx)
+        await self._detect_queue.put((signature, trx))
+
+    async def run_fetch_stage(self) -> None:
+        # Many concurrent fetches are needed to fill the fetcher's batches
+        async with asyncio.TaskGroup() as gp:
+            for _ in range(self._fetch_concurrency):
+                gp.create_task(self._fetch_worker())
+
+    async def run_detect_stage(self) -> None:
+        async with asyncio.TaskGroup() as gp:
+            for _ in range(self._detect_workers):
+                gp.create_task(self._detect_worker())
+
+    async def run_value_stage(self) -> None:
+        while True:
+            # One price lookup for every buy already waiting
+            batch = [await self._value_queue.get()]
+            while len(batch) < _DETECT_BATCH_SIZE and not self._value_queue.empty():
+                batch.append(self._value_queue.get_nowait())
+
+            await self.value_buys(batch)
+            for buy in batch:
+                await self._output_queue.put(buy)
+
+    async def _fetch_worker(self) -> None:
+        while True:
+            notification = await self._notify_queue.get()
+            signature, wallet, slot = notification
+            logger.info("New trx sig: %s", signature)
+            if not self._first_seen(signature, wallet, slot):
+                continue
+
+            try:
+                metrics.mark(signature, "fetch_start")
+                trx = await self.fetch_trx(signature, wallet)
+                metrics.mark(signature, "fetch_end")
+                self._record(signature, wallet, trx)
+                await self._detect_queue.put((signature, trx))
+
+            except ValueError as e:
+                # Not fetched, so a later notification or the backfill may retry it
+                self._not_fetched(signature, wallet)
+                logger.warning(str(e))
+
+            except asyncio.CancelledError:
+                # The stage restarts, the checkpoint must not pass the sig
+                self._not_fetched(signature, wallet)
+                raise
+
+            except Exception as e:
+                self._not_fetched(signature, wallet)
+                logger.error(f"Error in sig monitor. {e}", exc_info=True)
+
+    def _not_fetched(self, signature: str, wallet: str) -> None:
+        self._seen.discard(signature)
+        self._checkpoints.fail(wallet, signature)
+        metrics.finish(signature)
+
+    def _first_seen(self, signature: str, wallet: str, slot: Optional[int]) -> bool:
+        # Reconnects and overlapping subscriptions can re-deliver a signature.
+        # Detection covers every tracked wallet, so one pass per sig is enough.
+        if self._seen.add(signature):
+            return True
+        logger.debug("Skipping already processed sig: %s", signature)
+        # A first delivery still in flight keeps holding the checkpoint
+        self._checkpoints.finish(wallet, signature, slot)
+        return False
+
+    def _record(self, signature: str, wallet: str, trx: dict[str, Any]) -> None:
+        if self._archive is not None:
+            self._archive.record(signature, wallet, trx)
+        self._checkpoints.finish(wallet, signature, trx["slot"])
+
+    async def _detect_worker(self) -> None:
+        while True:
+            # Detect over everything already waiting in one batch
+            batch = [await self._detect_queue.get()]
+            while len(batch) < _DETECT_BATCH_SIZE and not self._detect_queue.empty():
+                batch.append(self._detect_queue.get_nowait())
+
+            buys = await self.detect_token_buys(batch)
+            if buys:
+                logger.info("Token buys: %s", buys)
+            for buy in buys:
+                await self._value_queue.put(buy)
+
+    async def fetch_trx(self, signature: str, wallet: str) -> dict[str, Any]:
+        logger.info("\n🔍 Fetching details for %s", signature)
+        result = await self._fetcher.fetch(signature)
+
+        if not result:
+            raise ValueError(
+                f"❌ Transaction {signature} not found or not yet confirmed."
+            )
+
+        return dict(result)
+
+    async def detect_token_buys(
+        self, transactions: list[tuple[str, dict[str, Any]]]
+    ) -> list[SplTokenBuy]:
+        """
+        Detects the new SPL tokens (likely buys) received by any tracked wallet
+        in a batch of (signature, transaction) pairs. Detection runs once for
+        the batch, after which a failing buy only costs that buy.
+        """
+        try:
+            transactions_by_sig = dict(transactions)
+            block_times = {sig: trx.get("blockTime") for sig, trx in transactions}
+            buys = detect_buys(
+                [(sig, trx["meta"]) for sig, trx in transactions],
+                self._tracked_wallets,
+            )
+            positions = self._update_ledger(transactions, buys)
+            buys = [
+                buy
+                for buy in buys
+                if self._keep(buy, transactions_by_sig[buy.signature], positions)
+            ]
+            if metrics.enabled:
+                bought = {buy.signature for buy in buys}
+                for sig in transactions_by_sig:
+                    if sig in bought:
+                        metrics.mark(sig, "detect")
+                    else:
+                        metrics.finish(sig)
+                metrics.inc("buys_detected_total", len(buys))
+
+        except Exception as e:
+            logger.error(f"[Token buy detection failed] {e}", exc_info=True)
+            return []
+
+        if not buys:
+            return []
+
+        mints = {buy.mint for buy in buys}
+        if len(mints) > 1:
+            try:
+                await self._token_meta.prefetch(mints)
+
+            except Exception as e:
+                # Every mint is still looked up on its own below
+                logger.warning(f"Token meta prefetch failed. {e}")
+
+        detected: list[SplTokenBuy] = []
+        for buy in buys:
+            try:
+                token_meta = await self.get_token_meta(buy.mint)
+
+            except Exception as e:
+                logger.warning(f"No token meta for {buy.mint}. {e}")
+                token_meta = _UNKNOWN_TOKEN
+            metrics.mark(buy.signature, "token_meta")
+            token_meta = {**_UNKNOWN_TOKEN, **token_meta}
+
+            try:
+                previous, holders = positions.get(
+                    (buy.signature, buy.owner, buy.mint), (None, None)
+                )
+                detected.append(
+                    {
+                        "signature": buy.signature,
+                        "buyer": buy.owner,
+                        "buyers": [buy.owner],
+                        "mint": buy.mint,
+                        "amount_received": buy.ui(buy.amount_received),
+                        "final_balance": buy.ui(buy.final_amount),
+                        "previous_balance": buy.ui(buy.previous_amount),
+                        "decimals": buy.decimals,
+                        "type": "spl-token-buy",
+                        "token_name": token_meta["name"],
+                        "token_symbol": token_meta["symbol"],
+                        "block_time": block_times[buy.signature],
+                        "quote_paid": quote_spent(
+                            transactions_by_sig[buy.signature],
+                            buy.owner,
+                            self._quote_mints,
+                        ),
+                        "usd_paid": None,
+                        "new_position": previous == 0 if previous is not None else None,
+                        "position_change_pct": (
+                            buy.amount_received / previous * 100 if previous else None
+                        ),
+                        "holders": holders,
+                    }
+                )
+
+            except Exception as e:
+                metrics.finish(buy.signature)
+                logger.error(
+                    f"[Token buy detection failed] {buy.signature}. {e}", exc_info=True
+                )
+        return detected
+
+    def _update_ledger(
+        self,
+        transactions: list[tuple[str, dict[str, Any]]],
+        buys: list[TokenBuy],
+    ) -> dict[tuple[str, str, str], tuple[int, int]]:
+        """
+        Applies the transactions to the ledger in slot order. Returns the
+        position before and the mint's holders after every buy, by
+        (signature, owner, mint). The position before is the buy's own
+        pre-balance, exact even where the ledger missed a transaction.
+        """
+        if self._ledger is None:
+            return {}
+        buys_by_sig: dict[str, list[TokenBuy]] = {}
+        for buy in buys:
+            buys_by_sig.setdefault(buy.signature, []).append(buy)
+
+        positions: dict[tuple[str, str, str], tuple[int, int]] = {}
+        for sig, trx in sorted(transactions, key=lambda t: t[1].get("slot") or 0):
+            self._ledger.apply(trx.get("meta"), trx.get("slot"))
+            for buy in buys_by_sig.get(sig, ()):
+                positions[(sig, buy.owner, buy.mint)] = (
+                    buy.previous_amount,
+                    self._ledger.holders(buy.mint),
+                )
+        return positions
+
+    def _keep(
+        self,
+        buy: TokenBuy,
+        trx: dict[str, Any],
+        positions: dict[tuple[str, str, str], tuple[int, int]],
+    ) -> bool:
+        if self._ignore_unpaid and not quote_spent(trx, buy.owner, self._quote_mints):
+            logger.debug("Ignoring unpaid buy (airdrop?): %s", buy.signature)
+            return False
+        position = positions.get((buy.signature, buy.owner, buy.mint))
+        if self._min_position_change_pct and position is not None and position[0]:
+            change_pct = buy.amount_received / position[0] * 100
+            if change_pct < self._min_position_change_pct:
+                logger.debug("Ignoring dust top-up: %s", buy.signature)
+                return False
+        return True
+
+    async def value_buys(self, buys: list[SplTokenBuy]) -> None:
+        """Fills in ``usd_paid`` with one batched price lookup for all buys."""
+        mints: set[str] = set()
+        for buy in buys:
+            mints.update(buy["quote_paid"] or (buy["mint"],))
+        try:
+            prices = await self._price_oracle.get_prices(mints)
+
+        except Exception as e:
+            return logger.error(f"[Buy valuation failed] {e}", exc_info=True)
+
+        for buy in buys:
+            buy["usd_paid"] = usd_value(
+                buy["quote_paid"], buy["mint"], buy["amount_received"], prices
+            )
+            metrics.mark(buy["signature"], "value")
+
+    async def get_token_meta(self, token_address: str) -> dict[str, Any]:
+        return await self._token_meta.get(token_address)
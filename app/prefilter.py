@@ -0,0 +1,110 @@
+from typing import Any, Callable, Iterable, Optional
+
+from .logs_config import get_logger
+
+
+logger = get_logger()
+
+
+_TRUNCATED_LOG_MARKER = "Log truncated"
+
+# A rule gets the ``value`` of a ``logsNotification`` and returns False to
+# drop the signature before it is fetched.
+PrefilterRule = Callable[[dict[str, Any]], bool]
+
+
+def _logs(value: dict[str, Any]) -> list[str]:
+    return value.get("logs") or []
+
+
+def _truncated(logs: list[str]) -> bool:
+    # Programs missing from truncated logs may still have run, so keep those
+    return any(_TRUNCATED_LOG_MARKER in line for line in logs)
+
+
+def reject_failed(value: dict[str, Any]) -> bool:
+    """Failed transactions never change token balances."""
+    return value.get("err") is None
+
+
+def require_any_program(
+    program_ids: Iterable[str], name: str = "require_any_program"
+) -> PrefilterRule:
+    """Keeps transactions that invoke at least one of ``program_ids``."""
+    invokes = tuple(f"Program {p} invoke" for p in program_ids)
+
+    def rule(value: dict[str, Any]) -> bool:
+        logs = _logs(value)
+        return _truncated(logs) or any(line.startswith(invokes) for line in logs)
+
+    rule.__name__ = name
+    return rule
+
+
+def reject_instructions(names: Iterable[str]) -> PrefilterRule:
+    """Drops transactions logging any of the instruction ``names`` (e.g. ``Sell``)."""
+    markers = {f"Program log: Instruction: {name}" for name in names}
+
+    def rule(value: dict[str, Any]) -> bool:
+        return not any(line in markers for line in _logs(value))
+
+    rule.__name__ = "reject_instructions"
+    return rule
+
+
+class LogPrefilter:
+    """
+    Cheap pre-filter run on ``logsNotification`` payloads so that signatures
+    which cannot be token buys are dropped before any RPC call is made.
+    """
+
+    def __init__(self, rules: Optional[list[PrefilterRule]] = None) -> None:
+        self.rules: list[PrefilterRule] = list(rules or [])
+        self.passed = 0
+        self.dropped = 0
+        self.dropped_by_rule: dict[str, int] = {}
+
+    @classmethod
+    def from_config(
+        cls,
+        require_programs: list[str],
+        dex_programs: list[str],
+        drop_instructions: list[str],
+    ) -> "LogPrefilter":
+        rules: list[PrefilterRule] = [reject_failed]
+        if require_programs:
+            rules.append(require_any_program(require_programs, "require_token_program"))
+        if dex_programs:
+            rules.append(require_any_program(dex_programs, "require_dex_program"))
+        if drop_instructions:
+            rules.append(reject_instructions(drop_instructions))
+        return cls(rules)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "passed": self.passed,
+            "fetches_avoided": self.dropped,
+            "by_rule": dict(self.dropped_by_rule),
+        }
+
+    def add_rule(self, rule: PrefilterRule) -> None:
+        self.rules.append(rule)
+
+    def accepts(self, value: dict[str, Any]) -> bool:
+        for rule in self.rules:
+            if not rule(value):
+                self.dropped += 1
+                name = getattr(rule, "__name__", repr(rule))
+                self.dropped_by_rule[name] = self.dropped_by_rule.get(name, 0) + 1
+                # The full stats are in the status line, not built per drop
+                logger.debug(
+                    "Pre-filter %s dropped %s (%d fetches avoided)",
+                    name,
+                    value.get("signature"),
+                    self.dropped,
+                )
+                return False
+
+        self.passed += 1
+        return True
@@ -0,0 +1,361 @@
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import sqlite3
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+from .logs_config import get_logger
+from .metrics import metrics
+from .pipeline import SplTokenBuy, buyers_of
+from .ratelimit import TokenBucket
+from .seen import SeenSignatures
+
+
+logger = get_logger()
+
+
+# HTTP statuses worth retrying besides rate limits
+_RETRYABLE_STATUSES = {500, 502, 503, 504}
+
+
+def tweet_key(buy: SplTokenBuy) -> str:
+    # Joined as the merged buyer used to be, so persisted keys stay valid
+    return f"tweet:{buy['signature']}:{', '.join(buyers_of(buy))}:{buy['mint']}"
+
+
+def coalesce_buys(buys: list[SplTokenBuy]) -> SplTokenBuy:
+    """Merges several buys of the same mint into one for a single tweet."""
+    merged = SplTokenBuy(**buys[0])
+    merged["amount_received"] = sum(b["amount_received"] for b in buys)
+    merged["buyers"] = list(
+        dict.fromkeys(wallet for buy in buys for wallet in buyers_of(buy))
+    )
+    merged["quote_paid"] = {}
+    for buy in buys:
+        for mint, amount in buy.get("quote_paid", {}).items():
+            merged["quote_paid"][mint] = merged["quote_paid"].get(mint, 0.0) + amount
+    usd_paid = [b.get("usd_paid") for b in buys]
+    merged["usd_paid"] = (
+        sum(u for u in usd_paid if u is not None) if None not in usd_paid else None
+    )
+    merged["type"] = "spl-token-buy-coalesced"
+    return merged
+
+
+def _http_status(error: Exception) -> Optional[int]:
+    response = getattr(error, "response", None)
+    # aiohttp (tweepy) responses expose ``status``, httpx ones ``status_code``
+    status = getattr(response, "status", None) or getattr(
+        response, "status_code", None
+    )
+    return int(status) if status else None
+
+
+def _rate_limit_reset(error: Exception) -> Optional[float]:
+    """Seconds until the API's rate-limit window resets, from the 429 headers."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    reset = headers.get("x-rate-limit-reset")
+    if reset is None:
+        return None
+    return max(0.0, float(reset) - time.time())
+
+
+class _Outbox:
+    """
+    SQLite-backed list of unpublished tweets, so restarts don't lose them.
+    Rows added with ``coalescing`` hold a buy still waiting to be merged.
+    """
+
+    def __init__(self, db_file: str) -> None:
+        self._db = sqlite3.connect(db_file, check_same_thread=False)
+        self._lock = asyncio.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, priority INTEGER NOT NULL, "
+            "buys TEXT NOT NULL, created_at REAL NOT NULL, "
+            "coalescing INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(outbox)")]
+        if "coalescing" not in columns:
+            # Outboxes of versions without coalescing
+            self._db.execute(
+                "ALTER TABLE outbox ADD COLUMN coalescing INTEGER NOT NULL DEFAULT 0"
+            )
+        self._db.commit()
+
+    def pending(self) -> list[tuple[int, int, bool, list[SplTokenBuy]]]:
+        rows = self._db.execute(
+            "SELECT id, priority, coalescing, buys FROM outbox ORDER BY id"
+        ).fetchall()
+        return [
+            (row_id, priority, bool(coalescing), json.loads(buys))
+            for row_id, priority, coalescing, buys in rows
+        ]
+
+    async def add(
+        self, priority: int, buys: list[SplTokenBuy], coalescing: bool = False
+    ) -> int:
+        async with self._lock:
+            return await asyncio.to_thread(
+                self._insert, priority, json.dumps(buys), coalescing
+            )
+
+    async def merge(
+        self, row_ids: list[int], priority: int, buys: list[SplTokenBuy]
+    ) -> int:
+        """Replaces ``row_ids`` with one row of ``buys``."""
+        async with self._lock:
+            return await asyncio.to_thread(self.merge_now, row_ids, priority, buys)
+
+    async def remove(self, row_id: int) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._delete, row_id)
+
+    def merge_now(
+        self, row_ids: list[int], priority: int, buys: list[SplTokenBuy]
+    ) -> int:
+        # One transaction, so a crash leaves either the rows or the merged one
+        with self._db:
+            self._db.executemany(
+                "DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in row_ids]
+            )
+            return self._insert_row(priority, json.dumps(buys), False)
+
+    def _insert(self, priority: int, buys: str, coalescing: bool) -> int:
+        with self._db:
+            return self._insert_row(priority, buys, coalescing)
+
+    def _insert_row(self, priority: int, buys: str, coalescing: bool) -> int:
+        cursor = self._db.execute(
+            "INSERT INTO outbox (priority, buys, created_at, coalescing) "
+            "VALUES (?, ?, ?, ?)",
+            (priority, buys, time.time(), int(coalescing)),
+        )
+        assert cursor.lastrowid is not None
+        return cursor.lastrowid
+
+    def _delete(self, row_id: int) -> None:
+        with self._db:
+            self._db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class TweetPublisher:
+    """
+    Publishes detected buys from ``queue``, or those passed to ``submit``.
+
+    Tweets go out through a token bucket that is paused whenever the API
+    answers 429 until its advertised reset. Transient failures are retried
+    with backoff, higher priority tweets go first, and every queued tweet is
+    kept in a durable outbox until it is published or permanently rejected.
+    With ``coalesce_window`` set, buys of the same mint inside the window are
+    merged into one tweet; each is in the outbox while it waits, and those
+    a restart interrupted are merged on startup. ``on_published`` is called
+    with the buys of every published tweet and what ``post`` returned for it.
+    """
+
+    def __init__(
+        self,
+        queue: Optional[asyncio.Queue[SplTokenBuy]],
+        post: Callable[[str], Awaitable[Any]],
+        render: Callable[[SplTokenBuy], str],
+        seen: SeenSignatures,
+        outbox_file: str,
+        rate_limiter: TokenBucket,
+        max_retries: int = 5,
+        coalesce_window: float = 0,
+        on_published: Optional[Callable[[list[SplTokenBuy], Any], None]] = None,
+    ) -> None:
+        self._queue = queue
+        self._post = post
+        self._render = render
+        self._seen = seen
+        self._outbox = _Outbox(outbox_file)
+        self._rate_limiter = rate_limiter
+        self._max_retries = max_retries
+        self._coalesce_window = coalesce_window
+        self._on_published = on_published
+
+        self._order = itertools.count()
+        # (-priority, order, outbox id, attempts, buys)
+        self._ready: list[tuple[int, int, int, int, list[SplTokenBuy]]] = []
+        # (not_before, order, priority, outbox id, attempts, buys)
+        self._delayed: list[tuple[float, int, int, int, int, list[SplTokenBuy]]] = []
+        self._wakeup = asyncio.Event()
+        # mint -> (outbox id, buy) of each buy waiting to be merged
+        self._coalescing: dict[str, list[tuple[int, SplTokenBuy]]] = {}
+        self._flush_tasks: set[asyncio.Task[None]] = set()
+        self._latencies: deque[float] = deque(maxlen=1000)
+
+        interrupted: dict[str, list[tuple[int, SplTokenBuy]]] = {}
+        for row_id, priority, coalescing, buys in self._outbox.pending():
+            if coalescing:
+                waiting = interrupted.setdefault(buys[0]["mint"], [])
+                waiting.append((row_id, buys[0]))
+            else:
+                self._push(priority, row_id, 0, buys)
+        for entries in interrupted.values():
+            row_ids = [row_id for row_id, _ in entries]
+            buys = [buy for _, buy in entries]
+            row_id = self._outbox.merge_now(row_ids, len(buys) - 1, buys)
+            self._push(len(buys) - 1, row_id, 0, buys)
+        if self._ready:
+            logger.info(f"Restored {len(self._ready)} unsent tweets from the outbox.")
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "ready": len(self._ready),
+            "retrying": len(self._delayed),
+            "coalescing": len(self._coalescing),
+            "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+            "max_latency": latencies[-1] if latencies else None,
+        }
+
+    async def run(self) -> None:
+        async with asyncio.TaskGroup() as gp:
+            if self._queue is not None:
+                gp.create_task(self._intake())
+            gp.create_task(self._sender())
+
+    async def submit(self, buy: SplTokenBuy, priority: Optional[int] = None) -> None:
+        """
+        Queues a tweet of ``buy`` unless it was tweeted already. With a
+        ``priority``, the buy is queued as is instead of being coalesced.
+        """
+        logger.info("New buy detected from a target wallet: %s", buy)
+        if tweet_key(buy) in self._seen:
+            logger.info("Buy already tweeted, skipping. %s", buy["signature"])
+            return
+
+        if priority is not None or self._coalesce_window <= 0:
+            await self.enqueue([buy], priority or 0)
+            return
+
+        mint = buy["mint"]
+        row_id = await self._outbox.add(0, [buy], coalescing=True)
+        if mint in self._coalescing:
+            self._coalescing[mint].append((row_id, buy))
+        else:
+            self._coalescing[mint] = [(row_id, buy)]
+            task = asyncio.create_task(self._flush_after_window(mint))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def enqueue(self, buys: list[SplTokenBuy], priority: int = 0) -> None:
+        row_id = await self._outbox.add(priority, buys)
+        self._push(priority, row_id, 0, buys)
+
+    def close(self) -> None:
+        self._outbox.close()
+
+    def _push(
+        self, priority: int, row_id: int, attempts: int, buys: list[SplTokenBuy]
+    ) -> None:
+        heapq.heappush(
+            self._ready, (-priority, next(self._order), row_id, attempts, buys)
+        )
+        self._wakeup.set()
+
+    async def _intake(self) -> None:
+        assert self._queue is not None
+        while True:
+            await self.submit(await self._queue.get())
+
+    async def _flush_after_window(self, mint: str) -> None:
+        await asyncio.sleep(self._coalesce_window)
+        entries = self._coalescing.pop(mint, [])
+        if entries:
+            # Merged tweets carry more signal, so they jump the queue
+            buys = [buy for _, buy in entries]
+            row_ids = [row_id for row_id, _ in entries]
+            row_id = await self._outbox.merge(row_ids, len(buys) - 1, buys)
+            self._push(len(buys) - 1, row_id, 0, buys)
+
+    def _promote_due(self) -> Optional[float]:
+        """Moves due retries to the ready heap; returns seconds to the next one."""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, priority, row_id, attempts, buys = heapq.heappop(self._delayed)
+            self._push(priority, row_id, attempts, buys)
+        return self._delayed[0][0] - now if self._delayed else None
+
+    async def _sender(self) -> None:
+        while True:
+            next_due = self._promote_due()
+            if not self._ready:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), next_due)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            neg_priority, _, row_id, attempts, buys = heapq.heappop(self._ready)
+            await self._rate_limiter.acquire()
+            await self._publish(-neg_priority, row_id, attempts, buys)
+
+    async def _publish(
+        self, priority: int, row_id: int, attempts: int, buys: list[SplTokenBuy]
+    ) -> None:
+        buy = buys[0] if len(buys) == 1 else coalesce_buys(buys)
+        try:
+            text = self._render(buy)
+            logger.info("Posting bought token address in tweet ...")
+            created = await self._post(text)
+
+        except Exception as e:
+            status = _http_status(e)
+            metrics.inc("tweet_errors_total", status=str(status))
+            if status == 429:
+                reset = _rate_limit_reset(e) or 60.0
+                logger.warning(f"Tweet rate limited. Pausing for {reset:.0f}s")
+                self._rate_limiter.block_for(reset)
+                self._push(priority, row_id, attempts, buys)
+                return
+
+            retryable = status is None or status in _RETRYABLE_STATUSES
+            if retryable and attempts < self._max_retries:
+                delay = random.uniform(0.5, 1.5) * min(300.0, 5.0 * 2**attempts)
+                logger.warning(
+                    f"Error posting tweet to twitter, retrying in {delay:.0f}s. {e}"
+                )
+                heapq.heappush(
+                    self._delayed,
+                    (
+                        time.monotonic() + delay,
+                        next(self._order),
+                        priority,
+                        row_id,
+                        attempts + 1,
+                        buys,
+                    ),
+                )
+                return
+
+            logger.error(f"Error posting tweet to twitter. {e}", exc_info=True)
+            await self._outbox.remove(row_id)
+            return
+
+        await self._outbox.remove(row_id)
+        metrics.inc("tweets_published_total")
+        now = time.time()
+        for published in buys:
+            self._seen.add(tweet_key(published))
+            metrics.finish(published["signature"], "publish")
+            if published.get("block_time"):
+                latency = now - published["block_time"]
+                self._latencies.append(latency)
+                logger.info(
+                    f"Published {published['signature']} {latency:.1f}s after its slot."
+                )
+        logger.info(f"Tweet posted successfully. {created}")
+        if self._on_published is not None:
+            self._on_published(buys, created)
@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket allowing ``rate`` acquisitions per second on average."""
+
+    def __init__(self, rate: float, burst: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        refill = (now - self._updated) * self.rate
+        self._tokens = min(self.capacity, self._tokens + refill)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        # The lock keeps waiters in FIFO order instead of racing for refills
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+    def block_for(self, seconds: float) -> None:
+        """Empties the bucket and stops refilling it for ``seconds``."""
+        self._tokens = 0.0
+        self._updated = max(self._updated, time.monotonic() + seconds)
@@ -0,0 +1,151 @@
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+from urllib.parse import urlsplit
+
+from .ratelimit import TokenBucket
+
+
+# Latency assumed for endpoints without samples yet, so they get tried
+_UNKNOWN_LATENCY = 0.2
+# Samples needed before an endpoint's p95 is trusted for hedging
+_MIN_HEDGE_SAMPLES = 20
+
+
+@dataclass
+class Endpoint:
+    url: str
+    weight: float = 1.0
+    # 0 means no budget of our own, only the node's limits apply
+    requests_per_second: float = 0
+
+    @classmethod
+    def from_config(cls, endpoint: dict[str, Any]) -> "Endpoint":
+        return cls(**{key.lower(): value for key, value in endpoint.items()})
+
+
+class EndpointHealth:
+    """Rolling latency and error samples of one endpoint."""
+
+    def __init__(self, endpoint: Endpoint, window: int) -> None:
+        self.endpoint = endpoint
+        self.url = endpoint.url
+        # Host only, RPC urls often carry an API key
+        self.name = urlsplit(endpoint.url).netloc
+        self.budget = (
+            TokenBucket(endpoint.requests_per_second)
+            if endpoint.requests_per_second > 0
+            else None
+        )
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._errors: deque[bool] = deque(maxlen=window)
+        self._consecutive_errors = 0
+
+    @property
+    def samples(self) -> int:
+        return len(self._latencies)
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self._errors) / len(self._errors) if self._errors else 0.0
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def score(self) -> float:
+        """Expected cost of the next request here; lower is healthier."""
+        latency = self.latency_quantile(0.5) or _UNKNOWN_LATENCY
+        # Errors cost a retry, queued requests wait behind the in-flight ones
+        penalty = (1 + 10 * self.error_rate) * (1 + 0.1 * self.in_flight)
+        return latency * penalty / max(self.endpoint.weight, 1e-6)
+
+    def record(self, latency: float, ok: bool, cooldown: float) -> None:
+        self._errors.append(not ok)
+        if ok:
+            self._latencies.append(latency)
+            self._consecutive_errors = 0
+            return
+        self._consecutive_errors += 1
+        if self._consecutive_errors >= 3:
+            # Back off exponentially from an endpoint that keeps failing
+            backoff = cooldown * 2 ** min(self._consecutive_errors - 3, 5)
+            self.cooldown_until = time.monotonic() + backoff
+
+    def as_dict(self) -> dict[str, Any]:
+        p50 = self.latency_quantile(0.5)
+        p95 = self.latency_quantile(0.95)
+        return {
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "in_flight": self.in_flight,
+            "cooling_down": self.cooldown_until > time.monotonic(),
+        }
+
+
+class RpcRouter:
+    """
+    Routes each request to the healthiest of several HTTP RPC endpoints.
+
+    Endpoints are scored by their rolling median latency, error rate and
+    current load, scaled by their configured weight. An endpoint failing
+    repeatedly is skipped for a growing cooldown. ``hedge_delay`` gives the
+    p95 latency after which a slow request is worth duplicating elsewhere.
+    """
+
+    def __init__(
+        self,
+        endpoints: Iterable[Endpoint],
+        window: int = 200,
+        hedge_quantile: float = 0.95,
+        min_hedge_delay: float = 0.05,
+        cooldown: float = 5.0,
+    ) -> None:
+        self._endpoints = [EndpointHealth(e, window) for e in endpoints]
+        if not self._endpoints:
+            raise ValueError("At least one RPC endpoint is required")
+        self._hedge_quantile = hedge_quantile
+        self._min_hedge_delay = min_hedge_delay
+        self._cooldown = cooldown
+
+    @property
+    def endpoints(self) -> list[EndpointHealth]:
+        return self._endpoints
+
+    def pick(self) -> EndpointHealth:
+        """The healthiest endpoint."""
+        return self._healthiest(self._endpoints)
+
+    def alternative(self, endpoint: EndpointHealth) -> Optional[EndpointHealth]:
+        """The healthiest endpoint other than ``endpoint``, if there is one."""
+        others = [e for e in self._endpoints if e is not endpoint]
+        return self._healthiest(others) if others else None
+
+    def _healthiest(self, candidates: list[EndpointHealth]) -> EndpointHealth:
+        now = time.monotonic()
+        available = [e for e in candidates if e.cooldown_until <= now]
+        # With everything cooling down, the one recovering first is the best bet
+        if not available:
+            return min(candidates, key=lambda e: e.cooldown_until)
+        # A little jitter spreads load across endpoints with similar scores
+        return min(available, key=lambda e: e.score() * random.uniform(0.9, 1.1))
+
+    def record(self, endpoint: EndpointHealth, latency: float, ok: bool) -> None:
+        endpoint.record(latency, ok, self._cooldown)
+
+    def hedge_delay(self, endpoint: EndpointHealth) -> Optional[float]:
+        """Seconds to wait on ``endpoint`` before hedging, None to not hedge."""
+        if len(self._endpoints) < 2 or endpoint.samples < _MIN_HEDGE_SAMPLES:
+            return None
+        p95 = endpoint.latency_quantile(self._hedge_quantile)
+        return max(self._min_hedge_delay, p95) if p95 is not None else None
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {e.name: e.as_dict() for e in self._endpoints}
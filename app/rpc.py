@@ -0,0 +1,382 @@
+import asyncio
+import random
+import time
+from typing import Any, Optional
+
+import httpx
+
+from .codec import Decode, codec
+from .logs_config import get_logger
+from .metrics import metrics
+from .router import EndpointHealth, RpcRouter
+
+
+logger = get_logger()
+
+
+# JSON-RPC error codes worth retrying: node behind / rate limited / unavailable
+_RETRYABLE_RPC_CODES = {-32005, -32007, -32014, -32016, 429}
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class RpcError(Exception):
+    """
+    ``endpoint_failure`` tells whether the endpoint is to blame, e.g. an
+    HTTP error, rather than the request, e.g. bad params. It defaults to
+    ``retryable``.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        retryable: bool = False,
+        endpoint_failure: Optional[bool] = None,
+    ) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+        self.endpoint_failure = (
+            retryable if endpoint_failure is None else endpoint_failure
+        )
+
+
+class TransactionFetcher:
+    """
+    Shared, non-blocking ``getTransaction`` stage.
+
+    Requests from every wallet go through one queue served by a bounded pool
+    of workers over a pooled HTTP client. Each worker coalesces the
+    signatures queued within a short window into a single JSON-RPC batch,
+    and identical signatures requested concurrently are fetched only once.
+    In-flight requests are capped per endpoint and failures are retried with
+    jittered exponential backoff.
+
+    Every request goes to the endpoint ``router`` currently rates healthiest,
+    and a ``getTransaction`` batch still pending after that endpoint's p95
+    latency is raced against a copy sent to the next best endpoint.
+    """
+
+    def __init__(
+        self,
+        router: RpcRouter,
+        workers: int = 16,
+        max_in_flight: int = 8,
+        max_retries: int = 5,
+        batch_size: int = 50,
+        batch_window_ms: float = 20,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+        timeout: float = 30.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        self._router = router
+        self._workers = max(1, workers)
+        self._max_in_flight = max(1, max_in_flight)
+        self._max_retries = max_retries
+        self._batch_size = max(1, batch_size)
+        self._batch_window = batch_window_ms / 1000
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._client = client or httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=self._max_in_flight * len(router.endpoints),
+                max_keepalive_connections=self._max_in_flight * len(router.endpoints),
+            ),
+        )
+        self._endpoint_slots: dict[str, asyncio.Semaphore] = {}
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        # signature -> future shared by every caller waiting on it
+        self._inflight: dict[str, asyncio.Future[Optional[dict[str, Any]]]] = {}
+        self._next_request_id = 1
+
+    async def fetch(self, signature: str) -> Optional[dict[str, Any]]:
+        """Returns the parsed transaction, or None if the node doesn't have it."""
+        future = self._inflight.get(signature)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[signature] = future
+            await self._queue.put(signature)
+        else:
+            logger.debug("Joining in-flight fetch of %s", signature)
+        # Shielded so one cancelled caller doesn't cancel the fetch for the others
+        return await asyncio.shield(future)
+
+    async def run(self) -> None:
+        logger.info(f"Starting transaction fetcher with {self._workers} workers ...")
+        async with asyncio.TaskGroup() as gp:
+            for _ in range(self._workers):
+                gp.create_task(self._worker())
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def _worker(self) -> None:
+        batch: list[str] = []
+        try:
+            while True:
+                batch = []
+                await self._next_batch(batch)
+                try:
+                    await self._fetch_batch(batch)
+
+                except Exception as e:
+                    for signature in batch:
+                        self._resolve(signature, error=e)
+
+        finally:
+            # Cancelled, e.g. by a restart: the shielded callers would wait forever
+            for signature in batch:
+                self._resolve(
+                    signature, error=RpcError("Fetcher stopped", retryable=True)
+                )
+
+    async def _next_batch(self, batch: list[str]) -> None:
+        """Fills ``batch``, which the worker fails if cancelled while it waits."""
+        loop = asyncio.get_running_loop()
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self._batch_window
+        while len(batch) < self._batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    def _resolve(
+        self,
+        signature: str,
+        result: Optional[dict[str, Any]] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        future = self._inflight.pop(signature, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _get_transaction_request(self, signature: str) -> dict[str, Any]:
+        return {
+            "jsonrpc": "2.0",
+            "id": self._request_id(),
+            "method": "getTransaction",
+            "params": [
+                signature,
+                {
+                    "encoding": "jsonParsed",
+                    "maxSupportedTransactionVersion": 0,
+                    "commitment": "finalized",
+                },
+            ],
+        }
+
+    async def _fetch_batch(self, signatures: list[str]) -> None:
+        pending = signatures
+        attempt = 0
+        while pending:
+            requests: dict[int, tuple[str, dict[str, Any]]] = {}
+            for signature in pending:
+                request = self._get_transaction_request(signature)
+                requests[request["id"]] = (signature, request)
+
+            retry: list[str] = []
+            try:
+                responses = await self._post_hedged(
+                    [request for _, request in requests.values()],
+                    label=f"getTransaction batch of {len(pending)}",
+                    decode=codec.decode_transactions,
+                )
+                if not isinstance(responses, list):
+                    raise RpcError(f"Unexpected batch response: {responses!r:.200}")
+
+            except RpcError as e:
+                if not e.retryable or attempt >= self._max_retries:
+                    raise
+                retry = pending
+                logger.warning(f"getTransaction batch failed ({e}).")
+
+            else:
+                for response in responses:
+                    signature, _ = requests.pop(response.get("id"), (None, None))
+                    if signature is None:
+                        continue
+                    error = response.get("error")
+                    if not error:
+                        self._resolve(signature, result=response.get("result"))
+                    elif error.get("code") in _RETRYABLE_RPC_CODES:
+                        retry.append(signature)
+                    else:
+                        self._resolve(signature, error=RpcError(f"RPC error {error}"))
+                # Requests the node silently dropped from the batch
+                retry.extend(signature for signature, _ in requests.values())
+
+            if not retry:
+                return
+            if attempt >= self._max_retries:
+                raise RpcError(f"Gave up after {attempt} retries")
+            delay = self._backoff(attempt)
+            logger.warning(
+                f"Retrying {len(retry)} getTransaction requests in {delay:.2f}s "
+                f"[{attempt + 1}/{self._max_retries}]"
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+            pending = retry
+
+    async def call(self, method: str, params: list[Any]) -> Any:
+        """Sends a single JSON-RPC request with retries and returns its result."""
+        payload = {
+            "jsonrpc": "2.0",
+            "id": self._request_id(),
+            "method": method,
+            "params": params,
+        }
+        data = await self.call_with_retries(payload, label=method)
+        return data.get("result")
+
+    async def call_with_retries(self, payload: Any, label: str) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return await self._post(payload, label)
+
+            except RpcError as e:
+                if not e.retryable or attempt >= self._max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"{label} failed ({e}). Retrying in {delay:.2f}s "
+                    f"[{attempt + 1}/{self._max_retries}]"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter so retrying workers don't hit the node in lockstep
+        return random.uniform(0, min(self._max_delay, self._base_delay * 2**attempt))
+
+    def _slots(self, url: str) -> asyncio.Semaphore:
+        if url not in self._endpoint_slots:
+            self._endpoint_slots[url] = asyncio.Semaphore(self._max_in_flight)
+        return self._endpoint_slots[url]
+
+    async def _post_hedged(
+        self, payload: Any, label: str, decode: Optional[Decode] = None
+    ) -> Any:
+        """Posts to the best endpoint, racing a second one if it's slow."""
+        primary = self._router.pick()
+        delay = self._router.hedge_delay(primary)
+        if delay is None:
+            return await self._post(payload, label, primary, decode)
+
+        first = asyncio.create_task(self._post(payload, label, primary, decode))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            secondary = self._router.alternative(primary)
+            if done or secondary is None:
+                return await first
+
+            metrics.inc("rpc_hedged_total", endpoint=secondary.name)
+            logger.debug("Hedging %s on %s", label, secondary.name)
+            tasks.add(
+                asyncio.create_task(self._post(payload, label, secondary, decode))
+            )
+            pending = set(tasks)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    # Both failed, report the original request's error
+                    return first.result()
+        finally:
+            # Also when the caller is cancelled, so no post outlives it
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _post(
+        self,
+        payload: Any,
+        label: str,
+        endpoint: Optional[EndpointHealth] = None,
+        decode: Optional[Decode] = None,
+    ) -> Any:
+        endpoint = endpoint or self._router.pick()
+        if endpoint.budget is not None:
+            await endpoint.budget.acquire()
+        metrics.inc("rpc_requests_total", endpoint=endpoint.name)
+        endpoint.in_flight += 1
+        try:
+            data = await self._send(endpoint, payload, label, decode or codec.loads)
+
+        except RpcError as e:
+            # Rejected requests say nothing about the endpoint's health
+            if e.endpoint_failure:
+                self._router.record(endpoint, 0.0, ok=False)
+            raise
+
+        finally:
+            endpoint.in_flight -= 1
+        return data
+
+    async def _send(
+        self, endpoint: EndpointHealth, payload: Any, label: str, decode: Decode
+    ) -> Any:
+        content = codec.dumps(payload)
+        async with self._slots(endpoint.url):
+            started = time.perf_counter()
+            try:
+                response = await self._client.post(
+                    endpoint.url, content=content, headers=_JSON_HEADERS
+                )
+
+            except httpx.TransportError as e:
+                metrics.inc(
+                    "rpc_errors_total", endpoint=endpoint.name, kind="transport"
+                )
+                raise RpcError(f"Transport error: {e!r}", retryable=True) from e
+
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.observe("rpc_latency_seconds", elapsed, endpoint=endpoint.name)
+                logger.debug(
+                    "%s on %s took %.1fms", label, endpoint.name, elapsed * 1000
+                )
+
+        if response.status_code != 200:
+            metrics.inc("rpc_errors_total", endpoint=endpoint.name, kind="http")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RpcError(f"HTTP {response.status_code}", retryable=True)
+        if response.status_code != 200:
+            # A bad API key or URL, which only another endpoint can get around
+            raise RpcError(
+                f"HTTP {response.status_code}: {response.text[:200]}",
+                retryable=len(self._router.endpoints) > 1,
+                endpoint_failure=True,
+            )
+
+        data = decode(response.content)
+        if isinstance(data, dict) and data.get("error"):
+            metrics.inc("rpc_errors_total", endpoint=endpoint.name, kind="rpc")
+            code = data["error"].get("code")
+            raise RpcError(
+                f"RPC error {data['error']}", retryable=code in _RETRYABLE_RPC_CODES
+            )
+        self._router.record(endpoint, elapsed, ok=True)
+        return data
+
+    def _request_id(self) -> int:
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        return request_id
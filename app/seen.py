@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import os
+import struct
+import time
+from array import array
+from collections import deque
+from typing import BinaryIO
+
+from .logs_config import get_logger
+from .snapshots import SnapshotFile
+
+
+logger = get_logger()
+
+
+_GENERATION_HEADER = struct.Struct("<dQ")
+
+
+def _fingerprint(key: str) -> int:
+    # Stable across restarts (unlike hash()) so snapshots stay valid, and a
+    # 64-bit int is far smaller than the base58 signature string it replaces.
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class SeenSignatures:
+    """
+    Memory-bounded set of recently processed keys with time-based expiry.
+
+    Keys live in a ring of ``generations`` hash sets. A new generation is
+    started every ``window / generations`` seconds (or sooner once it holds
+    its share of ``max_entries``) and the oldest one is dropped, so entries
+    expire after roughly ``window`` seconds.
+    """
+
+    def __init__(
+        self,
+        window: float = 24 * 3600,
+        max_entries: int = 5_000_000,
+        generations: int = 4,
+        snapshot_file: str | None = None,
+    ) -> None:
+        self._generations = max(2, generations)
+        self._span = window / self._generations
+        self._max_per_generation = max(1, max_entries // self._generations)
+        self._snapshot_file = snapshot_file
+        # (created_at, fingerprints), newest last
+        self._ring: deque[tuple[float, set[int]]] = deque()
+        self._snapshot = SnapshotFile(snapshot_file) if snapshot_file else None
+        self._new_generation(time.time())
+        if snapshot_file:
+            self._load()
+
+    def __len__(self) -> int:
+        return sum(len(keys) for _, keys in self._ring)
+
+    def __contains__(self, key: str) -> bool:
+        fingerprint = _fingerprint(key)
+        return any(fingerprint in keys for _, keys in self._ring)
+
+    def add(self, key: str) -> bool:
+        """Marks ``key`` as seen. Returns False if it was already seen."""
+        fingerprint = _fingerprint(key)
+        if any(fingerprint in keys for _, keys in self._ring):
+            return False
+
+        created_at, current = self._ring[-1]
+        now = time.time()
+        if now - created_at > self._span or len(current) >= self._max_per_generation:
+            current = self._new_generation(now)
+        current.add(fingerprint)
+        return True
+
+    def discard(self, key: str) -> None:
+        """Forgets ``key``, e.g. when processing it failed and it may come again."""
+        fingerprint = _fingerprint(key)
+        for _, keys in self._ring:
+            keys.discard(fingerprint)
+
+    def _new_generation(self, now: float) -> set[int]:
+        keys: set[int] = set()
+        self._ring.append((now, keys))
+        while len(self._ring) > self._generations:
+            self._ring.popleft()
+        return keys
+
+    async def run(self, interval: float = 60) -> None:
+        """Periodically snapshots the set to disk, and once more on shutdown."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.snapshot()
+
+        finally:
+            if self._snapshot_file:
+                self._write(self._frozen_ring())
+
+    async def snapshot(self) -> None:
+        if not self._snapshot_file:
+            return
+        # Copy on the loop so the writer thread sees a consistent view
+        await asyncio.to_thread(self._write, self._frozen_ring())
+
+    def _frozen_ring(self) -> list[tuple[float, "array[int]"]]:
+        return [(created_at, array("Q", keys)) for created_at, keys in self._ring]
+
+    def _write(self, ring: list[tuple[float, "array[int]"]]) -> None:
+        assert self._snapshot is not None
+
+        def dump(f: BinaryIO) -> None:
+            for created_at, keys in ring:
+                f.write(_GENERATION_HEADER.pack(created_at, len(keys)))
+                keys.tofile(f)
+
+        self._snapshot.write(dump)
+
+    def _load(self) -> None:
+        assert self._snapshot_file
+        if not os.path.exists(self._snapshot_file):
+            return
+
+        cutoff = time.time() - self._span * self._generations
+        ring: deque[tuple[float, set[int]]] = deque()
+        try:
+            with open(self._snapshot_file, "rb") as f:
+                while header := f.read(_GENERATION_HEADER.size):
+                    created_at, count = _GENERATION_HEADER.unpack(header)
+                    keys = array("Q")
+                    keys.fromfile(f, count)
+                    if created_at >= cutoff:
+                        ring.append((created_at, set(keys)))
+
+        except (EOFError, struct.error) as e:
+            logger.warning(f"Ignoring corrupt seen signatures snapshot. {e}")
+            return
+
+        if ring:
+            self._ring = ring
+            # Resume with a fresh generation rather than growing a restored one
+            self._new_generation(time.time())
+        logger.info(f"Loaded {len(self)} seen signatures from {self._snapshot_file}")
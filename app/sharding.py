@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+from multiprocessing.process import BaseProcess
+from typing import Any, Awaitable, Callable, Iterable
+
+from .logs_config import get_logger
+from .pipeline import SplTokenBuy
+
+
+logger = get_logger()
+
+
+# Target of a worker process: (shard, live shards, events, control)
+WorkerTarget = Callable[[int, tuple[int, ...], Any, Any], None]
+
+_BUY_FIELDS = tuple(SplTokenBuy.__annotations__)
+# Seconds a blocking queue read waits before checking for cancellation
+_POLL_INTERVAL = 0.5
+
+
+def shard_path(path: str, shard: int) -> str:
+    """``output/checkpoints.json`` -> ``output/checkpoints-<shard>.json``"""
+    root, ext = os.path.splitext(path)
+    return f"{root}-{shard}{ext}"
+
+
+def encode_buy(buy: SplTokenBuy) -> tuple[Any, ...]:
+    """A buy as a plain tuple, far smaller pickled than the dict."""
+    return tuple(buy[field] for field in _BUY_FIELDS)  # type: ignore[literal-required]
+
+
+def decode_buy(values: tuple[Any, ...]) -> SplTokenBuy:
+    return SplTokenBuy(**dict(zip(_BUY_FIELDS, values)))  # type: ignore[typeddict-item]
+
+
+class ShardRing:
+    """
+    Rendezvous hashing of wallets onto the live shards.
+
+    Every wallet goes to the shard with the highest hash of (shard, wallet),
+    so when a shard leaves or returns only that shard's wallets move.
+    """
+
+    def __init__(self, shards: Iterable[int]) -> None:
+        self.shards: tuple[int, ...] = ()
+        self.update(shards)
+
+    def update(self, shards: Iterable[int]) -> None:
+        self.shards = tuple(sorted(set(shards)))
+        if not self.shards:
+            raise ValueError("At least one shard is required")
+
+    def owner(self, wallet: str) -> int:
+        encoded = wallet.encode()
+        return max(
+            self.shards,
+            key=lambda shard: hashlib.blake2b(
+                encoded, digest_size=8, salt=shard.to_bytes(8, "little")
+            ).digest(),
+        )
+
+
+async def forward_events(
+    output_queue: asyncio.Queue[SplTokenBuy], events: Any
+) -> None:
+    """Worker side: sends the buys of this shard to the publisher process."""
+    while True:
+        buy = await output_queue.get()
+        try:
+            events.put_nowait(encode_buy(buy))
+        except queue.Full:
+            # The publisher is behind, wait for it off the event loop
+            await asyncio.to_thread(events.put, encode_buy(buy))
+
+
+async def follow_membership(
+    control: Any, ring: ShardRing, on_change: Callable[[], Awaitable[Any]]
+) -> None:
+    """Worker side: applies the live shard sets sent by the parent."""
+    while True:
+        try:
+            shards = await asyncio.to_thread(control.get, True, _POLL_INTERVAL)
+        except queue.Empty:
+            continue
+        if tuple(shards) != ring.shards:
+            logger.info(f"Live shards changed to {list(shards)}, rebalancing ...")
+            ring.update(shards)
+            await on_change()
+
+
+class ShardWorkers:
+    """
+    Runs ``shards`` worker processes and collects their buys.
+
+    Each worker monitors its rendezvous slice of the wallets with its own
+    subscriptions and pipeline, and sends the buys it detects back over a
+    shared queue as compact tuples. When a worker dies, the others are
+    told the new set of live shards and take over its wallets until it
+    has been restarted.
+    """
+
+    def __init__(
+        self,
+        shards: int,
+        target: WorkerTarget,
+        output_queue: asyncio.Queue[SplTokenBuy],
+        restart_delay: float = 5.0,
+        events_queue_size: int = 10_000,
+    ) -> None:
+        if shards < 2:
+            raise ValueError("Sharding needs at least two workers")
+        self._shards = shards
+        self._target = target
+        self._output_queue = output_queue
+        self._restart_delay = restart_delay
+        # Spawned rather than forked, the parent has threads running
+        self._context = multiprocessing.get_context("spawn")
+        self._events = self._context.Queue(events_queue_size)
+        self._controls = [self._context.Queue() for _ in range(shards)]
+        self._processes: dict[int, BaseProcess] = {}
+        self._died_at: dict[int, float] = {}
+        self.restarts = 0
+
+    @property
+    def live(self) -> tuple[int, ...]:
+        return tuple(
+            shard for shard, process in self._processes.items() if process.is_alive()
+        )
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "live": len(self.live),
+            "shards": self._shards,
+            "restarts": self.restarts,
+            "pending_events": self._events.qsize(),
+        }
+
+    async def run(self) -> None:
+        try:
+            for shard in range(self._shards):
+                self._start(shard, tuple(range(self._shards)))
+            async with asyncio.TaskGroup() as gp:
+                gp.create_task(self._collect())
+                gp.create_task(self._watch())
+
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            process.join(timeout=10)
+        self._processes.clear()
+
+    def _start(self, shard: int, live: tuple[int, ...]) -> None:
+        process = self._context.Process(
+            target=self._target,
+            args=(shard, live, self._events, self._controls[shard]),
+            name=f"shard-{shard}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[shard] = process
+        logger.info(f"Started shard worker #{shard} (pid {process.pid})")
+
+    def _broadcast(self) -> None:
+        live = self.live
+        for shard in live:
+            self._controls[shard].put(live)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(1)
+            changed = False
+            for shard, process in list(self._processes.items()):
+                if process.is_alive() or shard in self._died_at:
+                    continue
+                logger.error(
+                    f"Shard worker #{shard} died (exit code {process.exitcode}). "
+                    f"Moving its wallets to the other workers."
+                )
+                self._died_at[shard] = time.monotonic()
+                changed = True
+
+            for shard, died_at in list(self._died_at.items()):
+                if time.monotonic() - died_at < self._restart_delay:
+                    continue
+                del self._died_at[shard]
+                self._start(shard, self.live + (shard,))
+                self.restarts += 1
+                changed = True
+
+            if changed:
+                self._broadcast()
+
+    async def _collect(self) -> None:
+        while True:
+            try:
+                values = await asyncio.to_thread(
+                    self._events.get, True, _POLL_INTERVAL
+                )
+            except queue.Empty:
+                continue
+            await self._output_queue.put(decode_buy(values))
+            # Take whatever else arrived meanwhile without another thread hop
+            while True:
+                try:
+                    values = self._events.get_nowait()
+                except queue.Empty:
+                    break
+                await self._output_queue.put(decode_buy(values))
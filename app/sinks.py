@@ -0,0 +1,438 @@
+import asyncio
+import os
+import random
+import stat
+import time
+from collections import deque
+from typing import Any, BinaryIO, Callable, Optional, Protocol
+
+import httpx
+
+from .codec import codec
+from .logs_config import get_logger
+from .metrics import metrics
+from .pipeline import SplTokenBuy
+from .publisher import TweetPublisher
+
+
+logger = get_logger()
+
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+# Message length limits of the APIs
+_TELEGRAM_MAX_CHARS = 4096
+_DISCORD_MAX_CHARS = 2000
+
+
+class SinkError(Exception):
+    def __init__(
+        self,
+        message: str,
+        retryable: bool = True,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class Sink(Protocol):
+    """Anywhere detected buys are delivered to."""
+
+    name: str
+
+    async def open(self) -> None: ...
+
+    async def send(self, buy: SplTokenBuy, priority: Optional[int]) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class TweetSink:
+    """
+    Hands buys to the tweet publisher, which keeps its own rate limit,
+    retries and outbox, so a buy is delivered once it is in the outbox.
+    """
+
+    name = "twitter"
+
+    def __init__(self, publisher: TweetPublisher) -> None:
+        self._publisher = publisher
+
+    async def open(self) -> None:
+        pass
+
+    async def send(self, buy: SplTokenBuy, priority: Optional[int]) -> None:
+        await self._publisher.submit(buy, priority)
+
+    async def close(self) -> None:
+        self._publisher.close()
+
+
+class _HttpSink:
+    """Posts rendered buys as JSON over a pooled HTTP client."""
+
+    name = "http"
+
+    def __init__(
+        self,
+        render: Callable[[SplTokenBuy], str],
+        connections: int = 4,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        self._render = render
+        self._client = client or httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(
+                max_connections=connections,
+                max_keepalive_connections=connections,
+            ),
+        )
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def _post(self, url: str, payload: dict[str, Any]) -> None:
+        try:
+            response = await self._client.post(url, json=payload)
+
+        except httpx.TransportError as e:
+            raise SinkError(f"{self.name} unreachable. {e!r}") from e
+
+        status = response.status_code
+        if status == 429:
+            raise SinkError(
+                f"{self.name} rate limited", retry_after=_retry_after(response)
+            )
+        if status >= 400:
+            raise SinkError(
+                f"{self.name} answered {status}: {response.text[:200]}",
+                retryable=status >= 500,
+            )
+
+
+class TelegramSink(_HttpSink):
+    """Sends every buy to a Telegram chat through a bot."""
+
+    name = "telegram"
+
+    def __init__(
+        self,
+        bot_token: str,
+        chat_id: str,
+        render: Callable[[SplTokenBuy], str],
+        connections: int = 4,
+        url: str = TELEGRAM_API_URL,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        super().__init__(render, connections, client)
+        self._url = f"{url.rstrip('/')}/bot{bot_token}/sendMessage"
+        self._chat_id = chat_id
+
+    async def send(self, buy: SplTokenBuy, priority: Optional[int]) -> None:
+        await self._post(
+            self._url,
+            {
+                "chat_id": self._chat_id,
+                "text": self._render(buy)[:_TELEGRAM_MAX_CHARS],
+                "disable_web_page_preview": True,
+            },
+        )
+
+
+class DiscordWebhookSink(_HttpSink):
+    """Posts every buy to a Discord channel through a webhook."""
+
+    name = "discord"
+
+    def __init__(
+        self,
+        webhook_url: str,
+        render: Callable[[SplTokenBuy], str],
+        connections: int = 4,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        super().__init__(render, connections, client)
+        self._url = webhook_url
+
+    async def send(self, buy: SplTokenBuy, priority: Optional[int]) -> None:
+        await self._post(
+            self._url, {"content": self._render(buy)[:_DISCORD_MAX_CHARS]}
+        )
+
+
+class JsonLinesSink:
+    """
+    Appends every buy to ``path`` as one JSON object per line. Writes run
+    in a thread, one at a time so lines keep their order, and a slow disk
+    never blocks the loop.
+    """
+
+    name = "jsonl"
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._file: Optional[BinaryIO] = None
+        self._lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        async with self._lock:
+            if self._file is None:
+                # Unbuffered, so every line is a single append readers see at once
+                self._file = await asyncio.to_thread(open, self._path, "ab", 0)
+
+    async def send(self, buy: SplTokenBuy, priority: Optional[int]) -> None:
+        line = codec.dumps(buy) + b"\n"
+        async with self._lock:
+            assert self._file is not None
+            await asyncio.to_thread(self._file.write, line)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._file is not None:
+                await asyncio.to_thread(self._file.close)
+                self._file = None
+
+
+class UnixSocketSink:
+    """
+    Streams every buy as a JSON line to each client connected to a Unix
+    socket at ``path``, for downstream systems to react without polling.
+    A client falling more than ``max_buffer`` bytes behind is disconnected.
+    """
+
+    name = "socket"
+
+    def __init__(self, path: str, max_buffer: int = 1024 * 1024) -> None:
+        self._path = path
+        self._max_buffer = max_buffer
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: set[asyncio.StreamWriter] = set()
+
+    @property
+    def clients(self) -> int:
+        return len(self._clients)
+
+    async def open(self) -> None:
+        if self._server is not None:
+            return
+        # Left behind by an earlier run that didn't shut down cleanly
+        if os.path.exists(self._path) and stat.S_ISSOCK(os.stat(self._path).st_mode):
+            os.unlink(self._path)
+        self._server = await asyncio.start_unix_server(self._connected, self._path)
+        logger.info(f"Streaming buys to clients of {self._path}")
+
+    async def send(self, buy: SplTokenBuy, priority: Optional[int]) -> None:
+        if not self._clients:
+            return
+        line = codec.dumps(buy) + b"\n"
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > self._max_buffer:
+                logger.warning(f"Disconnecting a client of {self._path} lagging behind")
+                self._clients.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+
+    async def close(self) -> None:
+        if self._server is None:
+            return
+        for writer in self._clients:
+            writer.close()
+        self._clients.clear()
+        self._server.close()
+        self._server = None
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+    async def _connected(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._clients.add(writer)
+        try:
+            # Clients only listen, so this ends once they hang up
+            while await reader.read(4096):
+                pass
+
+        except ConnectionError:
+            pass
+
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait, from the header or Telegram's and Discord's bodies."""
+    header = response.headers.get("retry-after")
+    if header is not None:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    if not isinstance(body, dict):
+        return None
+    retry_after = body.get("retry_after") or body.get("parameters", {}).get(
+        "retry_after"
+    )
+    return float(retry_after) if retry_after is not None else None
+
+
+class _Lane:
+    __slots__ = (
+        "sink",
+        "queue",
+        "concurrency",
+        "latencies",
+        "delivered",
+        "dropped",
+        "failed",
+    )
+
+    def __init__(self, sink: Sink, concurrency: int, queue_size: int) -> None:
+        self.sink = sink
+        # (buy, priority, monotonic time it reached the fan-out)
+        self.queue: asyncio.Queue[tuple[SplTokenBuy, Optional[int], float]] = (
+            asyncio.Queue(queue_size)
+        )
+        self.concurrency = max(1, concurrency)
+        self.latencies: deque[float] = deque(maxlen=1000)
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+
+
+class SinkFanout:
+    """
+    Delivers every buy from ``queue`` to each of its sinks independently.
+
+    Every sink has its own bounded queue served by its own pool of
+    workers, so a slow or failing sink only backs up its own queue. A buy
+    arriving at a full queue is dropped for that sink alone. Failed sends
+    are retried with backoff, or after the delay a rate-limited API asks
+    for. Delivery latency, from the fan-out to the sink accepting the buy,
+    and drops are tracked per sink.
+    """
+
+    def __init__(
+        self,
+        queue: asyncio.Queue[SplTokenBuy],
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ) -> None:
+        self._queue = queue
+        self._max_retries = max_retries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._lanes: list[_Lane] = []
+
+    @property
+    def stats(self) -> dict[str, dict[str, Any]]:
+        stats = {}
+        for lane in self._lanes:
+            latencies = sorted(lane.latencies)
+            stats[lane.sink.name] = {
+                "queued": lane.queue.qsize(),
+                "delivered": lane.delivered,
+                "dropped": lane.dropped,
+                "failed": lane.failed,
+                "p50_latency": latencies[len(latencies) // 2] if latencies else None,
+                "max_latency": latencies[-1] if latencies else None,
+            }
+        return stats
+
+    def add(self, sink: Sink, concurrency: int = 1, queue_size: int = 1000) -> None:
+        self._lanes.append(_Lane(sink, concurrency, queue_size))
+
+    async def run(self) -> None:
+        for lane in self._lanes:
+            await lane.sink.open()
+        logger.info(
+            f"Delivering buys to {', '.join(lane.sink.name for lane in self._lanes)}"
+        )
+        async with asyncio.TaskGroup() as gp:
+            for lane in self._lanes:
+                for _ in range(lane.concurrency):
+                    gp.create_task(self._worker(lane))
+            gp.create_task(self._intake())
+
+    def publish(self, buy: SplTokenBuy, priority: Optional[int] = None) -> None:
+        """
+        Queues ``buy`` on every sink without waiting. ``priority`` is for
+        buys merged upstream, which the publisher queues as they are.
+        """
+        queued_at = time.monotonic()
+        for lane in self._lanes:
+            try:
+                lane.queue.put_nowait((buy, priority, queued_at))
+            except asyncio.QueueFull:
+                lane.dropped += 1
+                metrics.inc("sink_dropped_total", sink=lane.sink.name)
+                logger.warning(
+                    "Sink %s is full, dropping %s", lane.sink.name, buy["signature"]
+                )
+
+    async def close(self) -> None:
+        for lane in self._lanes:
+            try:
+                await lane.sink.close()
+
+            except Exception as e:
+                logger.error(f"Failed to close sink {lane.sink.name}. {e}")
+
+    async def _intake(self) -> None:
+        while True:
+            self.publish(await self._queue.get())
+
+    async def _worker(self, lane: _Lane) -> None:
+        while True:
+            buy, priority, queued_at = await lane.queue.get()
+            await self._deliver(lane, buy, priority, queued_at)
+
+    async def _deliver(
+        self,
+        lane: _Lane,
+        buy: SplTokenBuy,
+        priority: Optional[int],
+        queued_at: float,
+    ) -> None:
+        name = lane.sink.name
+        for attempt in range(self._max_retries + 1):
+            try:
+                await lane.sink.send(buy, priority)
+
+            except Exception as e:
+                retryable = not isinstance(e, SinkError) or e.retryable
+                if not retryable or attempt == self._max_retries:
+                    lane.failed += 1
+                    metrics.inc("sink_errors_total", sink=name)
+                    logger.error(
+                        f"Failed to deliver {buy['signature']} to {name}. {e}",
+                        exc_info=not isinstance(e, SinkError),
+                    )
+                    return
+                delay = e.retry_after if isinstance(e, SinkError) else None
+                if not delay:
+                    delay = random.uniform(0.5, 1.5) * min(
+                        self._max_delay, self._base_delay * 2**attempt
+                    )
+                logger.warning(
+                    f"Delivery to {name} failed, retrying in {delay:.1f}s. {e}"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            latency = time.monotonic() - queued_at
+            lane.latencies.append(latency)
+            lane.delivered += 1
+            metrics.inc("sink_delivered_total", sink=name)
+            metrics.observe("sink_latency_seconds", latency, sink=name)
+            return
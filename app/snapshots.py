@@ -0,0 +1,30 @@
+import os
+import threading
+from typing import BinaryIO, Callable
+
+
+class SnapshotFile:
+    """
+    A file that is only ever rewritten whole: written to ``<path>.tmp``
+    and renamed over ``path``, so a crash never leaves half a snapshot.
+
+    Owners write from a worker thread while running and once more on the
+    loop when cancelled, and the cancelled thread may still be writing by
+    then. Writes hold a lock, so the final one waits for it instead of
+    both writing the same .tmp file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, dump: Callable[[BinaryIO], object]) -> None:
+        """Replaces the file with what ``dump`` writes to the open file."""
+        tmp_file = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_file, "wb") as f:
+                dump(f)
+            os.replace(tmp_file, self.path)
+
+    def write_bytes(self, data: bytes) -> None:
+        self.write(lambda f: f.write(data))
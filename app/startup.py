@@ -0,0 +1,149 @@
+import asyncio
+import dataclasses
+import logging
+import time
+from typing import Any
+
+from .codec import known
+from .logs_config import get_logger
+from .metrics import metrics
+from .subscriptions import SUBSCRIPTION_KINDS, SubscriptionHub
+from .templates import TemplateRule
+
+
+logger = get_logger()
+
+
+# Settings that have to be above zero: (section, key)
+_POSITIVE = (
+    ("RPC", "WS_CONNECTIONS"),
+    ("RPC", "RESUBSCRIBE_BATCH_SIZE"),
+    ("RPC", "FETCH_WORKERS"),
+    ("RPC", "MAX_IN_FLIGHT"),
+    ("RPC", "BATCH_SIZE"),
+    ("BACKFILL", "REQUESTS_PER_SECOND"),
+    ("PIPELINE", "NOTIFY_QUEUE_SIZE"),
+    ("PIPELINE", "DETECT_QUEUE_SIZE"),
+    ("PIPELINE", "VALUE_QUEUE_SIZE"),
+    ("PIPELINE", "OUTPUT_QUEUE_SIZE"),
+    ("PIPELINE", "FETCH_CONCURRENCY"),
+    ("PIPELINE", "DETECT_WORKERS"),
+    ("PUBLISHER", "TWEETS_PER_WINDOW"),
+    ("PUBLISHER", "WINDOW_SECONDS"),
+    ("SINKS", "QUEUE_SIZE"),
+    ("WALLETS", "SUBSCRIBE_CONCURRENCY"),
+)
+# Seconds after which the bring-up of every subscription is no longer timed
+_ALL_SUBSCRIBED_TIMEOUT = 600.0
+
+
+def validate_config(config: Any) -> list[str]:
+    """
+    Checks the settings a typo in config.toml would otherwise only break
+    once running, e.g. at the first tweet. Returns every problem found.
+    """
+    errors = _type_errors(config)
+    twitter = config.TWITTER
+    if not all(
+        [
+            twitter.API_KEY,
+            twitter.API_KEY_SECRET,
+            twitter.API_ACCESS_TOKEN,
+            twitter.API_ACCESS_TOKEN_SECRET,
+        ]
+    ):
+        errors.append("Incomplete or missing Twitter API Keys in config.toml")
+
+    rpc = config.RPC
+    if not rpc.ENDPOINTS:
+        errors.append("[RPC] ENDPOINTS is empty")
+    for endpoint in rpc.ENDPOINTS:
+        if not str(endpoint.get("URL", "")).startswith(("http://", "https://")):
+            errors.append(f"[RPC] ENDPOINTS: {endpoint} needs an http(s) URL")
+    if not rpc.WS_URLS:
+        errors.append("[RPC] WS_URLS is empty")
+    for url in rpc.WS_URLS:
+        if not str(url).startswith(("ws://", "wss://")):
+            errors.append(f"[RPC] WS_URLS: {url!r} isn't a ws(s) URL")
+    if rpc.JSON_CODEC != "auto" and rpc.JSON_CODEC not in known():
+        errors.append(
+            f"[RPC] JSON_CODEC {rpc.JSON_CODEC!r} isn't one of {['auto', *known()]}"
+        )
+
+    ingest = config.INGEST
+    if ingest.MODE not in SUBSCRIPTION_KINDS:
+        errors.append(
+            f"[INGEST] MODE {ingest.MODE!r} isn't one of {list(SUBSCRIPTION_KINDS)}"
+        )
+    elif ingest.MODE != "logs":
+        commitments = SUBSCRIPTION_KINDS[ingest.MODE].commitments
+        if ingest.COMMITMENT not in commitments:
+            errors.append(
+                f"[INGEST] COMMITMENT {ingest.COMMITMENT!r} isn't one of "
+                f"{list(commitments)} in {ingest.MODE} mode"
+            )
+
+    for section, key in _POSITIVE:
+        value = getattr(getattr(config, section), key)
+        # Values of the wrong type are reported above already
+        if isinstance(value, (int, float)) and value <= 0:
+            errors.append(f"[{section}] {key} has to be above 0, not {value}")
+
+    for rule in config.TEMPLATES.RULES:
+        try:
+            TemplateRule.from_config(rule)
+        except TypeError as e:
+            errors.append(f"[TEMPLATES] RULES: {rule} is invalid. {e}")
+
+    if not isinstance(logging.getLevelName(config.LOGGING.LEVEL.upper()), int):
+        errors.append(f"[LOGGING] LEVEL {config.LOGGING.LEVEL!r} isn't a log level")
+    return errors
+
+
+def _type_errors(config: Any) -> list[str]:
+    """Settings whose type differs from the default's, e.g. a quoted number."""
+    errors = []
+    for name in config.__annotations__:
+        section = getattr(config, name)
+        for field in dataclasses.fields(section):
+            if field.default is dataclasses.MISSING:
+                expected: type = type(field.default_factory())  # type: ignore[misc]
+            else:
+                expected = type(field.default)
+            value = getattr(section, field.name)
+            if isinstance(value, bool) or expected is bool:
+                # bool is an int to isinstance, but never a number here
+                valid = type(value) is expected
+            elif expected in (int, float):
+                valid = isinstance(value, (int, float))
+            else:
+                valid = isinstance(value, expected)
+            if not valid:
+                errors.append(
+                    f"[{name}] {field.name} has to be {expected.__name__}, "
+                    f"not {value!r}"
+                )
+    return errors
+
+
+async def report_startup(hub: SubscriptionHub, started: float) -> None:
+    """
+    Logs, and records as ``startup_seconds``, how long after ``started``
+    (a ``time.monotonic`` timestamp) the first and then every wallet's
+    subscription was confirmed.
+    """
+    await hub.first_subscribed.wait()
+    elapsed = time.monotonic() - started
+    metrics.set("startup_seconds", elapsed, stage="first_subscription")
+    logger.info(f"First subscription confirmed {elapsed:.2f}s after start")
+
+    deadline = time.monotonic() + _ALL_SUBSCRIBED_TIMEOUT
+    while hub.subscribed < hub.total_wallets:
+        if time.monotonic() > deadline:
+            return
+        await asyncio.sleep(0.1)
+    elapsed = time.monotonic() - started
+    metrics.set("startup_seconds", elapsed, stage="all_subscribed")
+    logger.info(
+        f"All {hub.subscribed} subscriptions confirmed {elapsed:.2f}s after start"
+    )
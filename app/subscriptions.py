@@ -0,0 +1,457 @@
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+import websockets
+
+from .codec import codec
+from .logs_config import get_logger
+from .metrics import metrics
+
+
+logger = get_logger()
+
+
+NotificationHandler = Callable[[dict[str, Any]], Awaitable[None]]
+ResubscribeHandler = Callable[[], None]
+
+# Seconds to wait for subscribe confirmations before sending more anyway
+_CONFIRM_TIMEOUT = 10.0
+_MAX_RECONNECT_DELAY = 60.0
+
+# Pushed transactions come in the shape getTransaction returns them
+_PUSH_OPTIONS = {
+    "encoding": "jsonParsed",
+    "transactionDetails": "full",
+    "showRewards": False,
+    "maxSupportedTransactionVersion": 0,
+}
+
+
+class SubscriptionKind(NamedTuple):
+    subscribe: str
+    unsubscribe: str
+    notification: str
+    # (wallet, commitment) -> subscribe params
+    params: Callable[[str, str], list[Any]]
+    commitments: tuple[str, ...]
+
+
+SUBSCRIPTION_KINDS = {
+    # Signatures only, every one is fetched with getTransaction
+    "logs": SubscriptionKind(
+        "logsSubscribe",
+        "logsUnsubscribe",
+        "logsNotification",
+        lambda wallet, commitment: [
+            {"mentions": [wallet]},
+            {"commitment": commitment},
+        ],
+        ("processed", "confirmed", "finalized"),
+    ),
+    # Helius' enhanced websocket, pushes each transaction with its meta
+    "transaction": SubscriptionKind(
+        "transactionSubscribe",
+        "transactionUnsubscribe",
+        "transactionNotification",
+        lambda wallet, commitment: [
+            {"accountInclude": [wallet], "vote": False, "failed": False},
+            {"commitment": commitment, **_PUSH_OPTIONS},
+        ],
+        ("processed", "confirmed", "finalized"),
+    ),
+    # Pushes the wallet's transactions of every block, not at processed
+    "block": SubscriptionKind(
+        "blockSubscribe",
+        "blockUnsubscribe",
+        "blockNotification",
+        lambda wallet, commitment: [
+            {"mentionsAccountOrProgram": wallet},
+            {"commitment": commitment, **_PUSH_OPTIONS},
+        ],
+        ("confirmed", "finalized"),
+    ),
+}
+
+
+def pushed_transactions(data: dict[str, Any]) -> list[tuple[str, dict[str, Any]]]:
+    """
+    The (signature, transaction) pairs of a ``transactionNotification`` or
+    ``blockNotification``, each transaction shaped like a ``getTransaction``
+    result.
+    """
+    result = data.get("params", {}).get("result", {})
+    if data.get("method") == "transactionNotification":
+        pushed = result.get("transaction") or {}
+        entries = [pushed]
+        slot = result.get("slot")
+        block_time = None
+    else:
+        value = result.get("value", {})
+        block = value.get("block") or {}
+        entries = block.get("transactions") or []
+        slot = value.get("slot", result.get("context", {}).get("slot"))
+        block_time = block.get("blockTime")
+
+    transactions = []
+    for entry in entries:
+        body = entry.get("transaction") or {}
+        signatures = body.get("signatures")
+        if not signatures:
+            continue
+        transactions.append(
+            (
+                signatures[0],
+                {
+                    "slot": slot,
+                    "blockTime": block_time,
+                    "meta": entry.get("meta"),
+                    "transaction": body,
+                },
+            )
+        )
+    return transactions
+
+
+class _HubConnection:
+    """A single websocket carrying many wallet subscriptions."""
+
+    def __init__(
+        self,
+        index: int,
+        ws_urls: list[str],
+        kind: SubscriptionKind,
+        commitment: str,
+        resubscribe_batch_size: int,
+        dispatch: Callable[[str, dict[str, Any]], Awaitable[None]],
+        on_resubscribed: Callable[[str], None],
+        on_subscribed: Callable[[], None],
+    ) -> None:
+        self.index = index
+        self._ws_urls = ws_urls
+        # Spread connections over the endpoints, then fail over in turn
+        self._url_index = index % len(ws_urls)
+        self._kind = kind
+        self._commitment = commitment
+        self._window = max(1, resubscribe_batch_size)
+        self._dispatch = dispatch
+        self._on_resubscribed = on_resubscribed
+        self._on_subscribed = on_subscribed
+        self._has_connected = False
+
+        self.wallets: set[str] = set()
+        self._websocket: Any = None
+        self._next_request_id = 1
+        # request id -> wallet for subscribe requests waiting for a confirmation
+        self._pending: dict[int, str] = {}
+        # Pending requests counted against the window; timed out ones aren't
+        self._in_flight = 0
+        self._window_open = asyncio.Event()
+        self._window_open.set()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._sub_to_wallet: dict[int, str] = {}
+        self._wallet_to_sub: dict[str, int] = {}
+
+    @property
+    def connected(self) -> bool:
+        return self._websocket is not None
+
+    @property
+    def subscribed(self) -> int:
+        return len(self._wallet_to_sub)
+
+    async def add(self, wallet: str) -> None:
+        self.wallets.add(wallet)
+        if self.connected:
+            await self._send_subscribe(wallet)
+
+    async def remove(self, wallet: str) -> None:
+        self.wallets.discard(wallet)
+        sub_id = self._wallet_to_sub.pop(wallet, None)
+        if sub_id is None:
+            return
+        self._sub_to_wallet.pop(sub_id, None)
+        if self.connected:
+            await self._send_unsubscribe(sub_id)
+
+    async def run(self) -> None:
+        delay = 1.0
+        while True:
+            resubscribe_task: Optional[asyncio.Task[None]] = None
+            try:
+                async with websockets.connect(
+                    self._ws_urls[self._url_index], max_size=None, ping_interval=20
+                ) as websocket:
+                    self._websocket = websocket
+                    delay = 1.0
+                    logger.info(
+                        f"Hub connection #{self.index} connected. "
+                        f"Subscribing {len(self.wallets)} wallets ..."
+                    )
+                    resubscribe_task = asyncio.create_task(self._resubscribe_all())
+                    async for message in websocket:
+                        await self._on_message(codec.decode_ws_message(message))
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                logger.error(
+                    f"Hub connection #{self.index} dropped. {e}", exc_info=True
+                )
+                self._url_index = (self._url_index + 1) % len(self._ws_urls)
+
+            finally:
+                if resubscribe_task is not None:
+                    resubscribe_task.cancel()
+                if self._websocket is not None:
+                    self._has_connected = True
+                self._websocket = None
+                self._reset_subscriptions()
+
+            metrics.inc("ws_reconnects_total", connection=str(self.index))
+            wait = delay + random.uniform(0, delay / 2)
+            logger.warning(f"Reconnecting hub connection #{self.index} in {wait:.1f}s")
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, _MAX_RECONNECT_DELAY)
+
+    def _reset_subscriptions(self) -> None:
+        self._pending.clear()
+        self._release(self._in_flight)
+        self._sub_to_wallet.clear()
+        self._wallet_to_sub.clear()
+
+    def _release(self, requests: int) -> None:
+        self._in_flight = max(0, self._in_flight - requests)
+        if self._in_flight < self._window:
+            self._window_open.set()
+        if not self._in_flight:
+            self._drained.set()
+
+    async def _wait(self, event: asyncio.Event) -> None:
+        try:
+            await asyncio.wait_for(event.wait(), _CONFIRM_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Hub connection #{self.index}: {self._in_flight} subscriptions "
+                f"unconfirmed after {_CONFIRM_TIMEOUT:.0f}s, sending more anyway."
+            )
+            # Their confirmations are still matched if they come
+            self._release(self._in_flight)
+
+    async def _resubscribe_all(self) -> None:
+        # A sliding window of requests rather than lockstep batches, so the
+        # round trips to confirm them overlap
+        for wallet in list(self.wallets):
+            if not self._window_open.is_set():
+                await self._wait(self._window_open)
+            # The wallet may have been removed while waiting for the window
+            if wallet in self.wallets and wallet not in self._wallet_to_sub:
+                await self._send_subscribe(wallet)
+        await self._wait(self._drained)
+        logger.info(
+            f"✅ Hub connection #{self.index} subscribed to "
+            f"{len(self._wallet_to_sub)}/{len(self.wallets)} wallets."
+        )
+
+    def _request_id(self) -> int:
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        return request_id
+
+    async def _send(self, payload: dict[str, Any]) -> None:
+        await self._websocket.send(codec.dumps(payload).decode())
+
+    async def _send_subscribe(self, wallet: str) -> None:
+        request_id = self._request_id()
+        self._pending[request_id] = wallet
+        self._in_flight += 1
+        self._drained.clear()
+        if self._in_flight >= self._window:
+            self._window_open.clear()
+        await self._send(
+            {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": self._kind.subscribe,
+                "params": self._kind.params(wallet, self._commitment),
+            }
+        )
+
+    async def _send_unsubscribe(self, sub_id: int) -> None:
+        await self._send(
+            {
+                "jsonrpc": "2.0",
+                "id": self._request_id(),
+                "method": self._kind.unsubscribe,
+                "params": [sub_id],
+            }
+        )
+
+    async def _on_message(self, data: dict[str, Any]) -> None:
+        if "id" in data:
+            await self._on_response(data)
+            return
+
+        if data.get("method") != self._kind.notification:
+            logger.debug(
+                "Unexpected message on hub connection #%s: %s", self.index, data
+            )
+            return
+
+        metrics.inc("ws_notifications_total")
+        sub_id = data.get("params", {}).get("subscription")
+        wallet = self._sub_to_wallet.get(sub_id)
+        if wallet is None:
+            logger.debug("Notification for unknown subscription: %s", sub_id)
+            return
+
+        try:
+            await self._dispatch(wallet, data)
+
+        except Exception as e:
+            logger.error(
+                f"Error handling the message. Message: {data}, Error: {e}",
+                exc_info=True,
+            )
+
+    async def _on_response(self, data: dict[str, Any]) -> None:
+        wallet = self._pending.pop(data["id"], None)
+        if wallet is None:
+            # Response to an unsubscribe request
+            return
+
+        self._release(1)
+
+        if data.get("error", None):
+            logger.error(
+                f"There was an error subscribing to the wallet: {wallet!r}. "
+                f"{data['error']}"
+            )
+            return
+
+        sub_id = data["result"]
+        if wallet not in self.wallets or wallet in self._wallet_to_sub:
+            # Removed while the subscribe request was in flight, or subscribed
+            # twice around a reconnect; the node would keep notifying otherwise
+            await self._send_unsubscribe(sub_id)
+            return
+
+        self._sub_to_wallet[sub_id] = wallet
+        self._wallet_to_sub[wallet] = sub_id
+        self._on_subscribed()
+        logger.debug("Subscribed to wallet: %r (sub %s).", wallet, sub_id)
+        if self._has_connected:
+            # Notifications were missed while this connection was down
+            self._on_resubscribed(wallet)
+
+
+class SubscriptionHub:
+    """
+    Packs the subscriptions of every monitored wallet onto a small pool of
+    websocket connections and routes notifications back to the handler
+    registered for each wallet. Connections are spread over ``ws_urls``
+    and move to the next endpoint when theirs fails.
+
+    ``kind`` picks one of ``SUBSCRIPTION_KINDS``: ``logs`` notifications
+    only carry a signature, ``transaction`` and ``block`` ones the full
+    transactions (see ``pushed_transactions``).
+    """
+
+    def __init__(
+        self,
+        ws_urls: list[str],
+        connections: int = 4,
+        resubscribe_batch_size: int = 100,
+        kind: str = "logs",
+        commitment: str = "finalized",
+    ) -> None:
+        if not ws_urls:
+            raise ValueError("At least one websocket endpoint is required")
+        if kind not in SUBSCRIPTION_KINDS:
+            raise ValueError(
+                f"Unknown subscription kind {kind!r}, "
+                f"expected one of {list(SUBSCRIPTION_KINDS)}"
+            )
+        subscription_kind = SUBSCRIPTION_KINDS[kind]
+        if commitment not in subscription_kind.commitments:
+            raise ValueError(
+                f"{subscription_kind.subscribe} doesn't support the "
+                f"{commitment!r} commitment"
+            )
+        self.kind = kind
+        # Set once the first subscription is confirmed, to time the startup
+        self.first_subscribed = asyncio.Event()
+        self._connections = [
+            _HubConnection(
+                index=i,
+                ws_urls=ws_urls,
+                kind=subscription_kind,
+                commitment=commitment,
+                resubscribe_batch_size=resubscribe_batch_size,
+                dispatch=self._dispatch,
+                on_resubscribed=self._resubscribed,
+                on_subscribed=self.first_subscribed.set,
+            )
+            for i in range(max(1, connections))
+        ]
+        self._handlers: dict[str, NotificationHandler] = {}
+        self._resubscribe_handlers: dict[str, ResubscribeHandler] = {}
+        self._wallet_conn: dict[str, _HubConnection] = {}
+
+    @property
+    def total_wallets(self) -> int:
+        return len(self._wallet_conn)
+
+    @property
+    def subscribed(self) -> int:
+        """Wallets whose subscription is confirmed."""
+        return sum(conn.subscribed for conn in self._connections)
+
+    async def subscribe(
+        self,
+        wallet: str,
+        handler: NotificationHandler,
+        on_resubscribed: Optional[ResubscribeHandler] = None,
+    ) -> None:
+        """
+        Routes notifications for ``wallet`` to ``handler``. ``on_resubscribed``
+        is called whenever the subscription is restored after a disconnect.
+        """
+        self._handlers[wallet] = handler
+        if on_resubscribed is not None:
+            self._resubscribe_handlers[wallet] = on_resubscribed
+        if wallet in self._wallet_conn:
+            return
+
+        # Keep the pool balanced by always filling the least loaded connection
+        conn = min(self._connections, key=lambda c: len(c.wallets))
+        self._wallet_conn[wallet] = conn
+        await conn.add(wallet)
+
+    async def unsubscribe(self, wallet: str) -> None:
+        self._handlers.pop(wallet, None)
+        self._resubscribe_handlers.pop(wallet, None)
+        conn = self._wallet_conn.pop(wallet, None)
+        if conn is not None:
+            await conn.remove(wallet)
+
+    async def run(self) -> None:
+        logger.info(
+            f"🔔 Starting {self.kind} subscription hub with "
+            f"{len(self._connections)} connections ..."
+        )
+        async with asyncio.TaskGroup() as gp:
+            for conn in self._connections:
+                gp.create_task(conn.run())
+
+    async def _dispatch(self, wallet: str, data: dict[str, Any]) -> None:
+        handler = self._handlers.get(wallet)
+        if handler is not None:
+            await handler(data)
+
+    def _resubscribed(self, wallet: str) -> None:
+        handler = self._resubscribe_handlers.get(wallet)
+        if handler is not None:
+            handler()
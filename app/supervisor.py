@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from .logs_config import get_logger
+
+
+logger = get_logger()
+
+
+ComponentFactory = Callable[[], Awaitable[None]]
+
+
+class ComponentFailed(Exception):
+    """A component crashed more often than its restart policy allows."""
+
+
+@dataclass
+class RestartPolicy:
+    initial_delay: float = 1.0
+    max_delay: float = 60.0
+    # Give up once a component crashes more than max_restarts times per period
+    max_restarts: int = 10
+    period: float = 300.0
+
+    def delay(self, consecutive_failures: int) -> float:
+        return min(self.max_delay, self.initial_delay * 2 ** (consecutive_failures - 1))
+
+
+@dataclass
+class ComponentHealth:
+    name: str
+    state: str = "pending"
+    restarts: int = 0
+    last_error: Optional[str] = None
+    started_at: Optional[float] = None
+    _failures: deque[float] = field(default_factory=deque, repr=False)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "restarts": self.restarts,
+            "last_error": self.last_error,
+            "uptime": time.monotonic() - self.started_at if self.started_at else 0.0,
+        }
+
+
+class Supervisor:
+    """
+    Runs long-lived components, restarting each one independently when it
+    crashes so a single failure doesn't tear down the whole bot.
+
+    Restarts back off exponentially. A component that keeps crashing faster
+    than its policy's max restart rate is marked ``failed`` and the failure
+    is escalated by raising ``ComponentFailed`` from ``run``.
+    """
+
+    def __init__(self, policy: Optional[RestartPolicy] = None) -> None:
+        self._policy = policy or RestartPolicy()
+        self._components: dict[str, tuple[ComponentFactory, RestartPolicy]] = {}
+        self._health: dict[str, ComponentHealth] = {}
+        self._group: Optional[asyncio.TaskGroup] = None
+
+    def add(
+        self,
+        name: str,
+        factory: ComponentFactory,
+        policy: Optional[RestartPolicy] = None,
+    ) -> None:
+        if name in self._components:
+            raise ValueError(f"Component {name!r} is already supervised")
+        self._components[name] = (factory, policy or self._policy)
+        self._health[name] = ComponentHealth(name)
+        if self._group is not None:
+            self._group.create_task(self._supervise(name))
+
+    def health(self) -> dict[str, dict[str, Any]]:
+        return {name: health.as_dict() for name, health in self._health.items()}
+
+    @property
+    def total_restarts(self) -> int:
+        return sum(health.restarts for health in self._health.values())
+
+    async def run(self) -> None:
+        async with asyncio.TaskGroup() as gp:
+            self._group = gp
+            for name in self._components:
+                gp.create_task(self._supervise(name))
+
+    async def _supervise(self, name: str) -> None:
+        factory, policy = self._components[name]
+        health = self._health[name]
+        consecutive_failures = 0
+        while True:
+            health.state = "running"
+            health.started_at = time.monotonic()
+            try:
+                await factory()
+                health.state = "stopped"
+                logger.info(f"Component {name!r} finished.")
+                return
+
+            except asyncio.CancelledError:
+                health.state = "stopped"
+                raise
+
+            except Exception as e:
+                health.last_error = repr(e)
+                logger.error(f"Component {name!r} crashed. {e}", exc_info=True)
+
+            now = time.monotonic()
+            # A component that ran for a whole period is healthy again
+            if now - health.started_at > policy.period:
+                consecutive_failures = 0
+            consecutive_failures += 1
+
+            health._failures.append(now)
+            while health._failures and now - health._failures[0] > policy.period:
+                health._failures.popleft()
+            if len(health._failures) > policy.max_restarts:
+                health.state = "failed"
+                logger.critical(
+                    f"Component {name!r} crashed {len(health._failures)} times in "
+                    f"{policy.period:.0f}s. Giving up."
+                )
+                raise ComponentFailed(name)
+
+            delay = policy.delay(consecutive_failures)
+            health.state = "backoff"
+            health.restarts += 1
+            logger.warning(f"Restarting component {name!r} in {delay:.1f}s ...")
+            await asyncio.sleep(delay)
@@ -0,0 +1,215 @@
+import asyncio
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Union
+
+from . import constants
+from .logs_config import get_logger
+from .pipeline import buyers_of
+
+
+logger = get_logger()
+
+
+# Longest first so ``__BUYER_NAME___`` isn't cut short by a shorter match
+_PLACEHOLDERS = sorted(
+    (
+        constants.COIN_ADDRESS_PLACEHOLDER,
+        constants.COIN_AMOUNT_PLACEHOLDER,
+        constants.COIN_NAME_PLACEHOLDER,
+        constants.COIN_SYMBOL_PLACEHOLDER,
+        constants.TOTLA_USD_PAID_PLACEHOLDER,
+        constants.BUYER_WALLET_ADDRESS_PLACEHOLDER,
+        constants.BUYER_NAME_PLACEHOLDER,
+        constants.WALLET_COUNT_PLACEHOLDER,
+    ),
+    key=len,
+    reverse=True,
+)
+# A placeholder may carry an inline format spec, e.g. ``__COIN_AMOUNT__[,.2f]``
+_PLACEHOLDER_RE = re.compile(
+    "(" + "|".join(re.escape(p) for p in _PLACEHOLDERS) + r")(?:\[([^\]]*)\])?"
+)
+
+# A compiled template: literal text, or (placeholder, format spec)
+Segment = Union[str, tuple[str, str]]
+
+
+def compile_template(
+    text: str, default_specs: Optional[dict[str, str]] = None
+) -> list[Segment]:
+    default_specs = default_specs or {}
+    segments: list[Segment] = []
+    position = 0
+    for match in _PLACEHOLDER_RE.finditer(text):
+        if match.start() > position:
+            segments.append(text[position : match.start()])
+        placeholder, spec = match.group(1), match.group(2)
+        if spec is None:
+            spec = default_specs.get(placeholder, "")
+        segments.append((placeholder, spec))
+        position = match.end()
+    if position < len(text):
+        segments.append(text[position:])
+    return segments
+
+
+def short_address(address: str) -> str:
+    return f"{address[:4]}...{address[-4:]}" if len(address) > 12 else address
+
+
+@dataclass
+class TemplateRule:
+    """Picks ``file`` for buys matching every condition that is set."""
+
+    file: str
+    wallet: Optional[str] = None
+    min_amount: Optional[float] = None
+    min_usd: Optional[float] = None
+    type: Optional[str] = None
+    # Need the ledger
+    new_position: Optional[bool] = None
+    min_position_change_pct: Optional[float] = None
+    min_holders: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, rule: dict[str, Any]) -> "TemplateRule":
+        return cls(**{key.lower(): value for key, value in rule.items()})
+
+    def matches(self, buy: Any) -> bool:
+        if self.wallet is not None and self.wallet not in buyers_of(buy):
+            return False
+        if self.min_amount is not None and buy["amount_received"] < self.min_amount:
+            return False
+        if self.min_usd is not None and (buy.get("usd_paid") or 0) < self.min_usd:
+            return False
+        if self.type is not None and buy["type"] != self.type:
+            return False
+        if self.new_position is not None and (
+            buy.get("new_position") is None
+            or buy["new_position"] != self.new_position
+        ):
+            return False
+        if self.min_position_change_pct is not None and (
+            buy.get("position_change_pct") or 0
+        ) < self.min_position_change_pct:
+            return False
+        if self.min_holders is not None and (
+            buy.get("holders") or 0
+        ) < self.min_holders:
+            return False
+        return True
+
+
+class _CompiledFile:
+    def __init__(self, file: str) -> None:
+        self.file = file
+        self.mtime: Optional[float] = None
+        self.segments: list[Segment] = []
+
+
+class TemplateEngine:
+    """
+    Renders tweets from template files compiled once into segment lists.
+
+    Templates are recompiled only when their file's mtime changes (see
+    ``watch``), so rendering never touches the disk. Buys are matched
+    against ``rules`` in order and fall back to the default template.
+    Values without a format spec render as ``str`` does.
+    """
+
+    def __init__(
+        self,
+        default_file: str,
+        rules: Optional[list[TemplateRule]] = None,
+        wallet_names: Optional[dict[str, str]] = None,
+        amount_spec: str = "",
+        usd_spec: str = "",
+    ) -> None:
+        self._default_file = default_file
+        self._rules = list(rules or [])
+        self._wallet_names = wallet_names if wallet_names is not None else {}
+        self._default_specs = {
+            constants.COIN_AMOUNT_PLACEHOLDER: amount_spec,
+            constants.TOTLA_USD_PAID_PLACEHOLDER: usd_spec,
+        }
+        self._templates = {
+            file: _CompiledFile(file)
+            for file in [default_file, *(rule.file for rule in self._rules)]
+        }
+        self._values: dict[str, Callable[[Any], Any]] = {
+            constants.COIN_ADDRESS_PLACEHOLDER: lambda b: b["mint"],
+            constants.COIN_AMOUNT_PLACEHOLDER: lambda b: b["amount_received"],
+            constants.COIN_NAME_PLACEHOLDER: lambda b: b["token_name"],
+            constants.COIN_SYMBOL_PLACEHOLDER: lambda b: b["token_symbol"],
+            constants.TOTLA_USD_PAID_PLACEHOLDER: lambda b: b.get("usd_paid"),
+            constants.BUYER_WALLET_ADDRESS_PLACEHOLDER: lambda b: ", ".join(
+                buyers_of(b)
+            ),
+            constants.BUYER_NAME_PLACEHOLDER: self._buyer_name,
+            constants.WALLET_COUNT_PLACEHOLDER: lambda b: len(buyers_of(b)),
+        }
+        for compiled in self._templates.values():
+            self._reload(compiled, self._read(compiled.file))
+
+    def has_content(self, file: Optional[str] = None) -> bool:
+        return bool(self._templates[file or self._default_file].segments)
+
+    def render(self, buy: Any) -> str:
+        file = next(
+            (rule.file for rule in self._rules if rule.matches(buy)), self._default_file
+        )
+        return "".join(
+            segment
+            if isinstance(segment, str)
+            else self._format(self._values[segment[0]](buy), segment[1])
+            for segment in self._templates[file].segments
+        ).strip()
+
+    async def watch(self, interval: float = 2.0) -> None:
+        """Recompiles any template whose file changed on disk."""
+        while True:
+            await asyncio.sleep(interval)
+            for compiled in self._templates.values():
+                try:
+                    mtime = os.stat(compiled.file).st_mtime
+                except FileNotFoundError:
+                    continue
+                if mtime != compiled.mtime:
+                    read = await asyncio.to_thread(self._read, compiled.file)
+                    self._reload(compiled, read)
+                    logger.info(f"Reloaded tweet template {compiled.file}")
+
+    def _read(self, file: str) -> Optional[tuple[float, str]]:
+        try:
+            with open(file, encoding="UTF-8") as f:
+                return os.fstat(f.fileno()).st_mtime, f.read()
+        except FileNotFoundError:
+            logger.error(f"Tweet template {file} not found.")
+            return None
+
+    def _reload(
+        self, compiled: _CompiledFile, read: Optional[tuple[float, str]]
+    ) -> None:
+        if read is None:
+            return
+        compiled.mtime, text = read
+        compiled.segments = compile_template(text.strip(), self._default_specs)
+
+    def _buyer_name(self, buy: Any) -> str:
+        return ", ".join(
+            self._wallet_names.get(wallet) or short_address(wallet)
+            for wallet in buyers_of(buy)
+        )
+
+    @staticmethod
+    def _format(value: Any, spec: str) -> str:
+        if value is None:
+            return "N/A"
+        if spec:
+            try:
+                return format(value, spec)
+            except (TypeError, ValueError):
+                pass
+        return str(value)
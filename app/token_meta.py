@@ -0,0 +1,185 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+import httpx
+
+from .logs_config import get_logger
+from .router import Endpoint, RpcRouter
+from .rpc import TransactionFetcher
+
+
+logger = get_logger()
+
+
+HELIUS_URL = "https://mainnet.helius-rpc.com/"
+
+# getAssetBatch accepts at most this many ids per call
+_ASSET_BATCH_LIMIT = 1000
+
+
+class TokenMetaCache:
+    """
+    Process-wide cache of Helius token metadata keyed by mint.
+
+    Entries are evicted LRU once ``max_size`` is reached and expire after
+    ``ttl`` seconds. Concurrent misses on the same mint share one request,
+    and every resolved entry is persisted to SQLite so a restart starts warm.
+    Helius is called through a ``TransactionFetcher`` of its own, so its
+    errors are checked and retried like those of the RPC nodes.
+    """
+
+    def __init__(
+        self,
+        helius_api_key: str,
+        db_file: str,
+        max_size: int = 10_000,
+        ttl: float = 24 * 3600,
+        helius_url: str = HELIUS_URL,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        url = httpx.URL(helius_url, params={"api-key": helius_api_key})
+        self._rpc = TransactionFetcher(
+            RpcRouter([Endpoint(str(url))]),
+            client=client or httpx.AsyncClient(timeout=30),
+        )
+        self._max_size = max(1, max_size)
+        self._ttl = ttl
+
+        # mint -> (fetched_at, metadata), oldest access first
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task[dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(db_file, check_same_thread=False)
+        self._db_lock = asyncio.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS token_meta ("
+            "mint TEXT PRIMARY KEY, fetched_at REAL NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._load()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    async def get(self, mint: str) -> dict[str, Any]:
+        cached = self._lookup(mint)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        logger.debug("Token meta cache miss for %s. %s", mint, self.stats)
+        task = self._inflight.get(mint)
+        if task is None:
+            # A task of its own, so cancelling the first caller leaves it running
+            task = asyncio.create_task(self._resolve(mint))
+            self._inflight[mint] = task
+            task.add_done_callback(lambda done: self._resolved(mint, done))
+        return await asyncio.shield(task)
+
+    async def prefetch(self, mints: Iterable[str]) -> None:
+        """Resolves uncached mints with as few ``getAssetBatch`` calls as possible."""
+        missing = list(
+            {m for m in mints if self._lookup(m) is None and m not in self._inflight}
+        )
+        for start in range(0, len(missing), _ASSET_BATCH_LIMIT):
+            chunk = missing[start : start + _ASSET_BATCH_LIMIT]
+            assets = await self._call("getAssetBatch", {"ids": chunk})
+            resolved = {}
+            for asset in assets or ():
+                metadata = _metadata(asset)
+                if metadata is not None:
+                    resolved[asset["id"]] = metadata
+            await self._store(resolved)
+            logger.debug(
+                "Prefetched metadata of %d/%d mints", len(resolved), len(chunk)
+            )
+
+    async def close(self) -> None:
+        await self._rpc.close()
+        self._db.close()
+
+    async def _resolve(self, mint: str) -> dict[str, Any]:
+        metadata = await self._fetch_asset(mint)
+        await self._store({mint: metadata})
+        return metadata
+
+    def _resolved(self, mint: str, task: asyncio.Task[dict[str, Any]]) -> None:
+        if self._inflight.get(mint) is task:
+            del self._inflight[mint]
+        # Retrieved here too, the callers may all have been cancelled meanwhile
+        if not task.cancelled():
+            task.exception()
+
+    def _lookup(self, mint: str) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(mint)
+        if entry is None:
+            return None
+        fetched_at, metadata = entry
+        if time.time() - fetched_at > self._ttl:
+            del self._entries[mint]
+            return None
+        self._entries.move_to_end(mint)
+        return metadata
+
+    def _remember(self, mint: str, fetched_at: float, metadata: dict[str, Any]) -> None:
+        self._entries[mint] = (fetched_at, metadata)
+        self._entries.move_to_end(mint)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def _load(self) -> None:
+        cutoff = time.time() - self._ttl
+        rows = self._db.execute(
+            "SELECT mint, fetched_at, metadata FROM token_meta "
+            "WHERE fetched_at >= ? ORDER BY fetched_at DESC LIMIT ?",
+            (cutoff, self._max_size),
+        ).fetchall()
+        # Insert oldest first so the LRU order matches the fetch order
+        for mint, fetched_at, metadata in reversed(rows):
+            self._remember(mint, fetched_at, json.loads(metadata))
+        logger.info(f"Loaded {len(rows)} cached token metadata entries.")
+
+    async def _store(self, resolved: dict[str, dict[str, Any]]) -> None:
+        if not resolved:
+            return
+        fetched_at = time.time()
+        for mint, metadata in resolved.items():
+            self._remember(mint, fetched_at, metadata)
+
+        rows = [(m, fetched_at, json.dumps(md)) for m, md in resolved.items()]
+        async with self._db_lock:
+            await asyncio.to_thread(self._write_rows, rows)
+
+    def _write_rows(self, rows: list[tuple[str, float, str]]) -> None:
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO token_meta (mint, fetched_at, metadata) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+
+    async def _fetch_asset(self, mint: str) -> dict[str, Any]:
+        metadata = _metadata(await self._call("getAsset", {"id": mint}))
+        if metadata is None:
+            raise LookupError(f"Helius has no metadata for {mint}")
+        return metadata
+
+    async def _call(self, method: str, params: dict[str, Any]) -> Any:
+        payload = {"jsonrpc": "2.0", "id": "1", "method": method, "params": params}
+        data = await self._rpc.call_with_retries(payload, label=method)
+        return data.get("result")
+
+
+def _metadata(asset: Any) -> Optional[dict[str, Any]]:
+    """The metadata of a DAS asset, None for unknown or incomplete assets."""
+    if not isinstance(asset, dict):
+        return None
+    metadata = (asset.get("content") or {}).get("metadata")
+    return dict(metadata) if isinstance(metadata, dict) else None
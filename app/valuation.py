@@ -0,0 +1,303 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Container, Optional, Protocol
+
+import httpx
+
+from .logs_config import get_logger
+
+
+logger = get_logger()
+
+
+# Native SOL spends are reported under the wrapped SOL mint
+WSOL_MINT = "So11111111111111111111111111111111111111112"
+
+LAMPORTS_PER_SOL = 1_000_000_000
+
+JUPITER_PRICE_URL = "https://lite-api.jup.ag/price/v3"
+
+
+def _account_keys(transaction: dict[str, Any]) -> list[str]:
+    keys = transaction.get("transaction", {}).get("message", {}).get("accountKeys", [])
+    # jsonParsed gives {"pubkey": ...} objects, json gives bare strings
+    return [key["pubkey"] if isinstance(key, dict) else key for key in keys]
+
+
+def quote_spent(
+    transaction: dict[str, Any], owner: str, quote_mints: Container[str] = ()
+) -> dict[str, float]:
+    """
+    Returns how much SOL and ``quote_mints`` tokens ``owner`` spent in a
+    transaction, in UI units keyed by mint.
+
+    Native SOL comes from the ``preBalances``/``postBalances`` lamport delta,
+    excluding the fee and the rent of token accounts opened for the owner in
+    the same transaction. Quote token spends come from the token balances.
+    """
+    meta = transaction.get("meta") or {}
+    spent: dict[str, float] = {}
+
+    keys = _account_keys(transaction)
+    pre_lamports = meta.get("preBalances") or []
+    post_lamports = meta.get("postBalances") or []
+    if owner in keys:
+        index = keys.index(owner)
+        if index < len(pre_lamports) and index < len(post_lamports):
+            lamports = pre_lamports[index] - post_lamports[index]
+            if index == 0:
+                # The fee payer also funds the fee and new account rent
+                lamports -= meta.get("fee", 0)
+                lamports -= sum(
+                    post_lamports[b["accountIndex"]]
+                    for b in meta.get("postTokenBalances") or ()
+                    if b.get("owner") == owner
+                    and b["accountIndex"] < len(pre_lamports)
+                    and pre_lamports[b["accountIndex"]] == 0
+                )
+            if lamports > 0:
+                spent[WSOL_MINT] = lamports / LAMPORTS_PER_SOL
+
+    amounts: dict[str, int] = {}
+    decimals: dict[str, int] = {}
+    for sign, balances in ((1, "preTokenBalances"), (-1, "postTokenBalances")):
+        for balance in meta.get(balances) or ():
+            mint = balance["mint"]
+            if balance.get("owner") != owner or (
+                mint != WSOL_MINT and mint not in quote_mints
+            ):
+                continue
+            token_amount = balance["uiTokenAmount"]
+            amounts[mint] = amounts.get(mint, 0) + sign * int(token_amount["amount"])
+            decimals[mint] = token_amount["decimals"]
+
+    for mint, amount in amounts.items():
+        if amount > 0:
+            spent[mint] = spent.get(mint, 0.0) + amount / 10 ** decimals[mint]
+    return spent
+
+
+def usd_value(
+    quote_paid: dict[str, float],
+    mint: str,
+    amount_received: float,
+    prices: dict[str, Optional[float]],
+) -> Optional[float]:
+    """
+    Values a buy by what was paid for it, or by the tokens received when
+    nothing was paid in a quote token. None when a price is missing.
+    """
+    if quote_paid:
+        total = 0.0
+        for quote_mint, amount in quote_paid.items():
+            price = prices.get(quote_mint)
+            if price is None:
+                return None
+            total += amount * price
+        return total
+
+    price = prices.get(mint)
+    return amount_received * price if price is not None else None
+
+
+class PriceSource(Protocol):
+    """Anything able to price a batch of mints in USD."""
+
+    async def fetch_prices(self, mints: list[str]) -> dict[str, float]: ...
+
+    async def close(self) -> None: ...
+
+
+class JupiterPriceSource:
+    """Jupiter's price API, which prices many mints in one request."""
+
+    def __init__(
+        self,
+        url: str = JUPITER_PRICE_URL,
+        client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        self._url = url
+        self._client = client or httpx.AsyncClient(timeout=10)
+
+    async def fetch_prices(self, mints: list[str]) -> dict[str, float]:
+        response = await self._client.get(self._url, params={"ids": ",".join(mints)})
+        response.raise_for_status()
+        return {
+            mint: float(data["usdPrice"])
+            for mint, data in response.json().items()
+            if data and data.get("usdPrice") is not None
+        }
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class StaticPriceSource:
+    """Fixed prices, e.g. from a local fixture file for tests and replays."""
+
+    def __init__(self, prices: dict[str, float]) -> None:
+        self._prices = dict(prices)
+
+    @classmethod
+    def from_file(cls, file: str) -> "StaticPriceSource":
+        with open(file, encoding="utf-8") as f:
+            return cls({mint: float(price) for mint, price in json.load(f).items()})
+
+    async def fetch_prices(self, mints: list[str]) -> dict[str, float]:
+        return {mint: self._prices[mint] for mint in mints if mint in self._prices}
+
+    async def close(self) -> None:
+        pass
+
+
+class PriceOracle:
+    """
+    USD prices from a pluggable ``PriceSource``.
+
+    Lookups for many mints are coalesced into one source request per batch
+    window, prices are cached for ``ttl`` seconds and mints requested within
+    ``hot_window`` are refreshed in the background before they expire. When
+    the source fails, the last known price is used.
+    """
+
+    def __init__(
+        self,
+        source: PriceSource,
+        ttl: float = 30.0,
+        batch_size: int = 50,
+        batch_window_ms: float = 20,
+        hot_window: float = 300.0,
+        refresh_interval: float = 15.0,
+        max_size: int = 10_000,
+    ) -> None:
+        self._source = source
+        self._ttl = ttl
+        self._batch_size = max(1, batch_size)
+        self._batch_window = batch_window_ms / 1000
+        self._hot_window = hot_window
+        self._refresh_interval = refresh_interval
+        self._max_size = max(1, max_size)
+
+        # mint -> (fetched_at, price), oldest access first
+        self._prices: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._last_requested: dict[str, float] = {}
+        self._inflight: dict[str, asyncio.Future[Optional[float]]] = {}
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self._prices),
+            "hot": len(self._last_requested),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    async def get_prices(self, mints: set[str]) -> dict[str, Optional[float]]:
+        now = time.time()
+        prices: dict[str, Optional[float]] = {}
+        waiting: dict[str, asyncio.Future[Optional[float]]] = {}
+        for mint in mints:
+            self._last_requested[mint] = now
+            entry = self._prices.get(mint)
+            if entry is not None and now - entry[0] <= self._ttl:
+                self.hits += 1
+                self._prices.move_to_end(mint)
+                prices[mint] = entry[1]
+                continue
+
+            self.misses += 1
+            future = self._inflight.get(mint)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[mint] = future
+                await self._queue.put(mint)
+            waiting[mint] = future
+
+        for mint, future in waiting.items():
+            prices[mint] = await asyncio.shield(future)
+        return prices
+
+    async def run(self) -> None:
+        async with asyncio.TaskGroup() as gp:
+            gp.create_task(self._batcher())
+            gp.create_task(self._refresher())
+
+    async def _batcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: list[str] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self._batch_window
+                while len(batch) < self._batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(
+                            await asyncio.wait_for(self._queue.get(), remaining)
+                        )
+                    except asyncio.TimeoutError:
+                        break
+
+                self._resolve(batch, await self._fetch(batch))
+
+        finally:
+            # Cancelled, e.g. by a restart: the shielded callers would wait
+            # forever, so they get the last known prices
+            self._resolve(
+                batch,
+                {mint: entry[1] for mint in batch if (entry := self._prices.get(mint))},
+            )
+
+    def _resolve(self, mints: list[str], prices: dict[str, Optional[float]]) -> None:
+        for mint in mints:
+            future = self._inflight.pop(mint, None)
+            if future is not None and not future.done():
+                future.set_result(prices.get(mint))
+
+    async def _refresher(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            now = time.time()
+            self._last_requested = {
+                mint: at
+                for mint, at in self._last_requested.items()
+                if now - at <= self._hot_window
+            }
+            # Refresh what would expire before the next round
+            stale = [
+                mint
+                for mint in self._last_requested
+                if mint not in self._inflight
+                and now - self._prices.get(mint, (0.0, 0.0))[0]
+                > self._ttl - self._refresh_interval
+            ]
+            for start in range(0, len(stale), self._batch_size):
+                await self._fetch(stale[start : start + self._batch_size])
+
+    async def _fetch(self, mints: list[str]) -> dict[str, Optional[float]]:
+        try:
+            fetched = await self._source.fetch_prices(mints)
+
+        except Exception as e:
+            logger.warning(f"Price lookup of {len(mints)} mints failed. {e}")
+            fetched = {}
+
+        now = time.time()
+        for mint, price in fetched.items():
+            self._prices[mint] = (now, price)
+            self._prices.move_to_end(mint)
+        while len(self._prices) > self._max_size:
+            self._prices.popitem(last=False)
+
+        prices: dict[str, Optional[float]] = {}
+        for mint in mints:
+            entry = self._prices.get(mint)
+            prices[mint] = entry[1] if entry is not None else None
+        return prices
@@ -1,237 +1,149 @@
 import asyncio
-import json
-import os
 from typing import Any
-import websockets
-from solana.rpc.api import Client
-from solders.signature import Signature
-from app.gvs import OUTPUT_DIR
+from .backfill import Backfiller, Checkpoints
 from .logs_config import get_logger
-import httpx
-from solana.exceptions import SolanaRpcException
+from .metrics import metrics
+from .pipeline import Pipeline
+from .prefilter import LogPrefilter
+from .subscriptions import SubscriptionHub, pushed_transactions
 
 
 logger = get_logger()
 
-
-from typing import TypedDict
-
-
-class SplTokenBuy(TypedDict):
-    buyer: str
-    mint: str
-    amount_received: float
-    final_balance: float
-    previous_balance: float
-    decimals: int
-    type: str
-    token_name: str
-    token_symbol: str
+# Seconds before a failed fetch is retried by a backfill, the getSignatures
+# of which only lists finalized signatures
+_RETRY_DELAY = 30.0
 
 
 class WalletsMonitor:
+    """
+    Per-wallet front end of the pipeline: keeps the wallet's subscription
+    on the hub, pre-filters its notifications and backfills the signatures
+    it missed while disconnected. Signatures are queued for fetching,
+    transactions pushed whole by the node go straight to detection.
+    """
+
+    __slots__ = (
+        "_wallet",
+        "_hub",
+        "_pipeline",
+        "_prefilter",
+        "_checkpoints",
+        "_backfiller",
+        "_tasks",
+    )
+
     def __init__(
         self,
         wallet: str,
-        output_queue: asyncio.Queue[SplTokenBuy],
-        helius_api_key: str,
+        hub: SubscriptionHub,
+        pipeline: Pipeline,
+        prefilter: LogPrefilter,
+        checkpoints: Checkpoints,
+        backfiller: Backfiller,
     ) -> None:
         self._wallet = wallet
-        self._client = Client("https://api.mainnet-beta.solana.com")
-        self._new_sig_queue: asyncio.Queue[str] = asyncio.Queue()
-        self._output_queue = output_queue
-        self._helius_url = "https://mainnet.helius-rpc.com/"
-        self._helius_client = httpx.AsyncClient()
-        self._helius_api_key = helius_api_key
+        self._hub = hub
+        self._pipeline = pipeline
+        self._prefilter = prefilter
+        self._checkpoints = checkpoints
+        self._backfiller = backfiller
 
         self._tasks: list[asyncio.Task[Any]] = []
 
     async def start(self) -> None:
-
-        try:
-            logger.info("🔔 Starting transaction monitor...")
-            await self.main()
-
-        except Exception as e:
-            logger.error(f"Error in trx monitor. {e}", exc_info=True)
-            await self.stop()
-            return await self.start()
+        # Once per wallet, thousands of times at startup
+        logger.debug("🔔 Starting transaction monitor of %r ...", self._wallet)
+        await self.monitor_wallet_transactions()
+        self._checkpoints.on_failed(self._wallet, self._schedule_retry)
+        self._schedule_backfill()
 
     async def stop(self) -> None:
+        self._checkpoints.on_failed(self._wallet, None)
+        await self._hub.unsubscribe(self._wallet)
         for task in self._tasks:
             if not task.cancelled() and not task.done():
                 task.cancel()
 
-    async def main(self) -> None:
-        self._tasks.append(asyncio.create_task(self.monitor_wallet_transactions()))
-        while True:
-            logger.debug("Waiting for new transaction signatures ...")
-            trx_sig = await self._new_sig_queue.get()
-            logger.info(f"New trx sig: {trx_sig}")
-            try:
-                trx = await self.fetch_trx(trx_sig)
-                res = await self.detect_token_buy_from_meta(trx["meta"])
-                logger.info(f"Token buy: {res}")
-                if res:
-                    await self._output_queue.put(res)
-
-            except ValueError:
-                continue
+    async def monitor_wallet_transactions(self) -> None:
+        logger.debug("Subscribing the %s of %r ...", self._hub.kind, self._wallet)
+        await self._hub.subscribe(
+            self._wallet, self._handle_message, on_resubscribed=self._schedule_backfill
+        )
 
-            except Exception as e:
-                logger.error(f"Error in sig monitor. {e}", exc_info=True)
+    def _schedule_backfill(self, delay: float = 0) -> None:
+        self._tasks = [task for task in self._tasks if not task.done()]
+        self._tasks.append(asyncio.create_task(self.backfill(delay)))
 
-    async def fetch_trx(self, signature: str) -> dict[str, Any]:
-        logger.info(f"\n🔍 Fetching details for {signature}")
-        try:
-            tx = self._client.get_transaction(
-                Signature.from_string(signature),
-                encoding="jsonParsed",
-                max_supported_transaction_version=0,
-            )
+    def _schedule_retry(self) -> None:
+        self._schedule_backfill(_RETRY_DELAY)
 
-        except SolanaRpcException as e:
-            logger.warning(f"Hitting rate limit resolving the sig. {e}", exc_info=True)
-            return await self.fetch_trx(signature)
+    async def backfill(self, delay: float = 0) -> None:
+        """Queues the signatures missed since the last checkpoint, oldest first."""
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            missed = await self._backfiller.missed_signatures(self._wallet)
 
-        if not tx.value:
-            raise ValueError(
-                f"❌ Transaction {signature} not found or not yet confirmed."
+        except Exception as e:
+            if self._checkpoints.failed(self._wallet):
+                self._schedule_retry()
+            return logger.error(
+                f"Backfill of {self._wallet!r} failed. {e}", exc_info=True
             )
 
-        result = json.loads(tx.value.to_json())
-
-        with open(
-            os.path.join(OUTPUT_DIR, f"{self._wallet}_last_trx.json").__str__(), "w"
-        ) as f:
-            json.dump(result, f)
-
-        return dict(result)
-
-    async def monitor_wallet_transactions(self) -> None:
-        uri = "wss://api.mainnet-beta.solana.com/"
-        async with websockets.connect(uri) as websocket:
-            subscription: dict[str, Any] = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "logsSubscribe",
-                "params": [
-                    {"mentions": [self._wallet]},
-                    {"commitment": "finalized"},
-                ],
-            }
-            await websocket.send(json.dumps(subscription))
-
-            sub_done: bool = False
-            while True:
-                if sub_done:
-                    logger.debug("Waiting for new messages ...")
-                else:
-                    logger.info(f"Subscribing the logs of {self._wallet!r} ...")
-                message = await websocket.recv()
-                data = json.loads(message)
-                logger.debug(f"New message received: {data}")
-
-                if not sub_done:
-                    logger.debug("Subscription not done yet! Checking for sub ...")
-                    if data.get("error", None):
-                        return logger.error(
-                            f"There was an error subscribing to the wallet: {self._wallet!r}",
-                            exc_info=True,
-                        )
-
-                    else:
-                        logger.info(f"✅ Subscribed to wallet: {self._wallet!r}.")
-                        sub_done = True
-
-                    continue
-
-                try:
-                    await self._handle_message(data)
-
-                except Exception as e:
-                    logger.error(
-                        f"Error handling the message. Message: {data}, Error: {e}",
-                        exc_info=True,
-                    )
+        # Failed sigs not listed again are not finalized successful txs
+        self._checkpoints.release_failed(self._wallet, {sig for sig, _ in missed})
+        if missed:
+            logger.info(f"Backfilling {len(missed)} missed sigs of {self._wallet!r}")
+        for sig, slot in missed:
+            await self._pipeline.submit(sig, self._wallet, slot)
 
     async def _handle_message(self, data: dict[str, Any]) -> None:
+        if data.get("method") != "logsNotification":
+            return await self._handle_transactions(data)
 
         result = data.get("params", {}).get("result", {})
-        sig = result.get("value", {}).get("signature")
+        value = result.get("value", {})
+        sig = value.get("signature")
+        slot = result.get("context", {}).get("slot")
+
+        if sig:
+            metrics.mark(sig, "notified")
+
+        if sig and not self._prefilter.accepts(value):
+            # Nothing to backfill up to here, the sig can never be a buy
+            metrics.inc("prefilter_dropped_total")
+            metrics.finish(sig)
+            if slot is not None:
+                self._checkpoints.update(self._wallet, sig, slot)
+            return
 
         if sig:
-            logger.debug(f"New transaction sig found: {sig}")
-            await self._new_sig_queue.put(sig)
+            metrics.mark(sig, "prefilter")
+            logger.debug("New transaction sig found: %s", sig)
+            await self._pipeline.submit(sig, self._wallet, slot)
 
         else:
             logger.debug("New transaction sig not found in message!")
 
-    async def detect_token_buy_from_meta(
-        self, meta: dict[str, Any]
-    ) -> SplTokenBuy | None:
-        """
-        Detects whether a wallet received a new SPL token (likely a buy) based on meta.
-        Returns a dict with details if buy detected, else None.
-        """
-        try:
-            # Token balance snapshots
-            pre_balances = meta.get("preTokenBalances", [])
-            post_balances = meta.get("postTokenBalances", [])
-
-            # Map pre balances by (mint, owner)
-            pre_map = {
-                (pre["mint"], pre["owner"]): float(pre["uiTokenAmount"]["uiAmount"])
-                for pre in pre_balances
+    async def _handle_transactions(self, data: dict[str, Any]) -> None:
+        for sig, trx in pushed_transactions(data):
+            metrics.mark(sig, "notified")
+            meta = trx.get("meta") or {}
+            # The rules read the logs as a logsNotification carries them
+            value = {
+                "signature": sig,
+                "err": meta.get("err"),
+                "logs": meta.get("logMessages"),
             }
+            if not self._prefilter.accepts(value):
+                metrics.inc("prefilter_dropped_total")
+                metrics.finish(sig)
+                if trx["slot"] is not None:
+                    self._checkpoints.update(self._wallet, sig, trx["slot"])
+                continue
 
-            # Check post balances to find tokens gained
-            for post in post_balances:
-                if post["owner"] != self._wallet:
-                    continue  # Skip others
-
-                mint = post["mint"]
-                post_amt = float(post["uiTokenAmount"]["uiAmount"])
-                decimals = post["uiTokenAmount"]["decimals"]
-
-                key = (mint, self._wallet)
-                pre_amt = pre_map.get(key, 0.0)
-
-                if post_amt > pre_amt:
-                    token_meta = await self.get_token_meta(mint)
-                    # token_meta = {"name": "Unknown", "symbol": "unknown"}
-                    return {
-                        "buyer": self._wallet,
-                        "mint": mint,
-                        "amount_received": post_amt - pre_amt,
-                        "final_balance": post_amt,
-                        "previous_balance": pre_amt,
-                        "decimals": decimals,
-                        "type": "spl-token-buy",
-                        "token_name": token_meta["name"],
-                        "token_symbol": token_meta["symbol"],
-                    }
-
-            return None  # No token purchase detected
-
-        except Exception as e:
-            logger.error(f"[Token buy detection failed] {e}", exc_info=True)
-            return None
-
-    async def get_token_meta(self, token_address: str) -> dict[str, Any]:
-
-        querystring = {"api-key": self._helius_api_key}
-
-        payload = {
-            "jsonrpc": "2.0",
-            "id": "1",
-            "method": "getAsset",
-            "params": {"id": token_address},
-        }
-        headers = {"Content-Type": "application/json"}
-
-        response = await self._helius_client.request(
-            "POST", self._helius_url, json=payload, headers=headers, params=querystring
-        )
-
-        return dict(response.json()["result"]["content"]["metadata"])
+            metrics.mark(sig, "prefilter")
+            logger.debug("New transaction pushed: %s", sig)
+            await self._pipeline.submit_transaction(sig, self._wallet, trx)
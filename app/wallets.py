@@ -0,0 +1,302 @@
+import asyncio
+import http
+import json
+import os
+import re
+import sys
+from typing import Any, Callable, Iterable, Optional
+
+from . import io
+from .logs_config import get_logger
+from .metrics import metrics
+from .wallet_mon import WalletsMonitor
+
+
+logger = get_logger()
+
+
+MonitorFactory = Callable[[str], WalletsMonitor]
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_DIGITS = {char: digit for digit, char in enumerate(_BASE58_ALPHABET)}
+# A 32 byte public key takes 32 to 44 base58 characters
+_ADDRESS_RE = re.compile(r"[1-9A-HJ-NP-Za-km-z]{32,44}")
+_PUBKEY_BYTES = 32
+
+
+def _base58(value: int) -> str:
+    digits = []
+    while value:
+        value, digit = divmod(value, 58)
+        digits.append(_BASE58_ALPHABET[digit])
+    return "".join(reversed(digits))
+
+
+# Without a leading zero byte, 32 bytes encode to 43 or 44 characters
+# between these. The alphabet is in ASCII order, so strings of the same
+# length compare like their values.
+_SMALLEST_43 = _base58(2 ** (8 * _PUBKEY_BYTES - 8))
+_LARGEST_44 = _base58(2 ** (8 * _PUBKEY_BYTES) - 1)
+
+
+def is_address(address: str) -> bool:
+    """Whether ``address`` is a base58 encoded 32 byte public key."""
+    if not _ADDRESS_RE.fullmatch(address):
+        return False
+    if address[0] != "1":
+        if len(address) == 44:
+            return address <= _LARGEST_44
+        return len(address) == 43 and address >= _SMALLEST_43
+    value = 0
+    for char in address:
+        value = value * 58 + _BASE58_DIGITS[char]
+    # Every leading "1" stands for a zero byte
+    zeros = len(address) - len(address.lstrip("1"))
+    return zeros + (value.bit_length() + 7) // 8 == _PUBKEY_BYTES
+
+
+def invalid_addresses(addresses: Iterable[str]) -> list[str]:
+    return [address for address in addresses if not is_address(address)]
+
+
+class WalletRegistry:
+    """
+    The set of monitored wallets, kept in sync with the wallets file.
+
+    ``watch`` re-reads the file when it changes and ``apply`` diffs it
+    against the monitored wallets, so only added wallets get subscribed
+    and only removed ones unsubscribed; everyone else keeps their
+    subscription and in-flight buys. ``addresses`` and ``names`` are
+    updated in place, so the pipeline and templates sharing them see every
+    change. ``serve`` exposes the same operations over a local HTTP API,
+    which writes them back to the file.
+
+    Only the wallets ``owns`` accepts are monitored, which is how a shard
+    picks its slice; ``rebalance`` re-applies the file after ``owns``
+    changed. Without a ``monitor_factory`` only the names are kept.
+    """
+
+    def __init__(
+        self,
+        wallets_file: str,
+        monitor_factory: Optional[MonitorFactory] = None,
+        owns: Optional[Callable[[str], bool]] = None,
+        subscribe_concurrency: int = 256,
+    ) -> None:
+        self._wallets_file = wallets_file
+        self._monitor_factory = monitor_factory
+        self._owns = owns or (lambda address: monitor_factory is not None)
+        self._subscribe_concurrency = max(1, subscribe_concurrency)
+        # Every wallet in the file, address -> name
+        self._listed: dict[str, str] = {}
+        self._monitors: dict[str, WalletsMonitor] = {}
+        self._mtime: Optional[float] = None
+        # Serializes diffs from the watcher, the admin API and rebalancing
+        self._lock = asyncio.Lock()
+
+        # Shared with the pipeline and the templates
+        self.addresses: set[str] = set()
+        self.names: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._monitors)
+
+    def __contains__(self, address: object) -> bool:
+        return address in self._monitors
+
+    def read(self) -> dict[str, str]:
+        """
+        Reads the wallets file, interning addresses and names and skipping
+        invalid addresses.
+        """
+        self._mtime = self._file_mtime()
+        wallets = io.read_wallets(self._wallets_file)
+        if invalid := invalid_addresses(wallets):
+            shown = ", ".join(map(repr, invalid[:5]))
+            logger.warning(
+                f"Skipping {len(invalid)} invalid addresses in {self._wallets_file}: "
+                f"{shown}{' ...' if len(invalid) > 5 else ''}"
+            )
+            for address in invalid:
+                del wallets[address]
+        return {
+            sys.intern(address): sys.intern(name) for address, name in wallets.items()
+        }
+
+    async def apply(self, wallets: dict[str, str]) -> tuple[int, int]:
+        """
+        Makes the owned ones of ``wallets`` (address -> name) the monitored
+        set. Returns how many wallets were added and removed.
+        """
+        async with self._lock:
+            for address in self._listed.keys() - wallets.keys():
+                self.names.pop(address, None)
+            for address, name in wallets.items():
+                # Unnamed wallets fall back to their short address, no entry needed
+                if name:
+                    self.names[address] = name
+                else:
+                    self.names.pop(address, None)
+            self._listed = wallets
+
+            owned = [address for address in wallets if self._owns(address)]
+            added = [address for address in owned if address not in self._monitors]
+            removed = list(self._monitors.keys() - set(owned))
+
+            await self._gather(self._remove, removed)
+            for address in added:
+                assert self._monitor_factory is not None
+                self._monitors[address] = self._monitor_factory(address)
+                self.addresses.add(address)
+            await self._gather(self._start, added)
+
+        metrics.set("tracked_wallets", len(self._monitors))
+        if added or removed:
+            logger.info(
+                f"Wallets: {len(added)} added, {len(removed)} removed, "
+                f"{len(self._monitors)} monitored."
+            )
+        return len(added), len(removed)
+
+    async def rebalance(self) -> tuple[int, int]:
+        """Re-applies the listed wallets after ``owns`` changed."""
+        return await self.apply(self._listed)
+
+    async def watch(self, interval: float = 5.0) -> None:
+        """Applies the wallets file whenever it changes on disk."""
+        while True:
+            await asyncio.sleep(interval)
+            if self._file_mtime() == self._mtime:
+                continue
+            try:
+                wallets = await asyncio.to_thread(self.read)
+
+            except OSError as e:
+                logger.error(f"Failed to read {self._wallets_file}. {e}")
+                continue
+
+            if not wallets:
+                # Most likely a half-written file, never drop every wallet
+                logger.warning(
+                    f"No wallets in {self._wallets_file}, keeping the current ones."
+                )
+                continue
+            await self.apply(wallets)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9109) -> None:
+        """
+        Serves the admin API:
+
+        * ``GET /wallets`` lists the wallets,
+        * ``POST /wallets`` with ``{"address": ..., "name": ...}`` adds one,
+        * ``DELETE /wallets/<address>`` removes one.
+        """
+        server = await asyncio.start_server(self._handle_request, host, port)
+        logger.info(f"Serving the wallets admin API on http://{host}:{port}/wallets")
+        async with server:
+            await server.serve_forever()
+
+    async def _start(self, address: str) -> None:
+        monitor = self._monitors.get(address)
+        if monitor is not None:
+            await monitor.start()
+
+    async def _remove(self, address: str) -> None:
+        monitor = self._monitors.pop(address)
+        self.addresses.discard(address)
+        await monitor.stop()
+
+    async def _gather(self, action: Callable[[str], Any], addresses: list[str]) -> None:
+        for start in range(0, len(addresses), self._subscribe_concurrency):
+            batch = addresses[start : start + self._subscribe_concurrency]
+            results = await asyncio.gather(
+                *(action(address) for address in batch), return_exceptions=True
+            )
+            for address, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.error(
+                        f"Failed to update the monitor of {address!r}. {result}",
+                        exc_info=result,
+                    )
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self._wallets_file).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _write(self) -> None:
+        io.write_list_to_txt(
+            self._wallets_file,
+            [f"{address} {name}".rstrip() for address, name in self._listed.items()],
+        )
+        self._mtime = self._file_mtime()
+
+    async def _admin(self, method: str, path: str, body: Any) -> tuple[int, Any]:
+        if path == "/wallets" and method == "GET":
+            return 200, {
+                "count": len(self._listed),
+                "monitored": len(self._monitors),
+                "wallets": self._listed,
+            }
+
+        if path == "/wallets" and method == "POST":
+            if not isinstance(body, dict) or not body.get("address"):
+                return 400, {"error": "address is required"}
+            wallets = dict(self._listed)
+            address = sys.intern(str(body["address"]).strip())
+            if not is_address(address):
+                return 400, {"error": f"{address} is not a valid address"}
+            wallets[address] = sys.intern(str(body.get("name") or "").strip())
+            await self.apply(wallets)
+
+        elif path.startswith("/wallets/") and method == "DELETE":
+            address = path.removeprefix("/wallets/")
+            if address not in self._listed:
+                return 404, {"error": f"{address} is not listed"}
+            wallets = dict(self._listed)
+            del wallets[address]
+            await self.apply(wallets)
+
+        else:
+            return 404, {"error": "not found"}
+
+        await asyncio.to_thread(self._write)
+        return 200, {"count": len(self._listed)}
+
+    async def _handle_request(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request_line = await reader.readline()
+            headers: dict[str, str] = {}
+            while (line := await reader.readline()).strip():
+                name, _, value = line.decode().partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            raw = await reader.readexactly(length) if length else b""
+
+            parts = request_line.decode().split(" ")
+            if len(parts) < 2:
+                status, result = 400, {"error": "bad request"}
+            else:
+                try:
+                    body = json.loads(raw) if raw else None
+                    status, result = await self._admin(parts[0], parts[1], body)
+                except ValueError as e:
+                    status, result = 400, {"error": str(e)}
+
+            payload = json.dumps(result).encode()
+            writer.write(
+                f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n".encode() + payload
+            )
+            await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
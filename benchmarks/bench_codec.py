@@ -0,0 +1,170 @@
+"""
+Throughput of the hot-path JSON decoding, per ``app.codec`` backend,
+against the plain ``json.loads`` the bot used before.
+
+    python -m benchmarks.bench_codec
+    python -m benchmarks.bench_codec --fixtures recorded.jsonl
+
+Fixtures are JSON lines of ``getTransaction`` results (``jsonParsed``),
+batched the way ``RpcClient`` fetches them. Without ``--fixtures``,
+synthetic transactions carrying the usual instructions, inner
+instructions and log messages are generated. The ``logsNotification``
+frames are always synthetic.
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Callable
+
+from app.codec import JsonCodec, available
+from app.detection import TOKEN_PROGRAM_ID
+
+from .bench_detection import _balance, _pubkey
+
+
+def _transaction(rng: random.Random, slot: int) -> dict[str, Any]:
+    wallet, mint = _pubkey(rng), _pubkey(rng)
+    keys = [wallet] + [_pubkey(rng) for _ in range(rng.randint(8, 20))]
+    instruction = {
+        "programId": TOKEN_PROGRAM_ID,
+        "program": "spl-token",
+        "parsed": {
+            "type": "transferChecked",
+            "info": {
+                "authority": wallet,
+                "destination": keys[1],
+                "mint": mint,
+                "source": keys[2],
+                "tokenAmount": {"amount": "1000000", "decimals": 6},
+            },
+        },
+        "stackHeight": None,
+    }
+    logs = [f"Program {key} invoke [1]" for key in keys[:6]]
+    logs += ["Program log: Instruction: Swap"] * 4
+    return {
+        "slot": slot,
+        "blockTime": 1_700_000_000 + slot,
+        "version": 0,
+        "meta": {
+            "err": None,
+            "fee": 5000,
+            "computeUnitsConsumed": rng.randint(20_000, 400_000),
+            "preBalances": [rng.randint(0, 10**12) for _ in keys],
+            "postBalances": [rng.randint(0, 10**12) for _ in keys],
+            "preTokenBalances": [_balance(wallet, mint, 0, 6)],
+            "postTokenBalances": [_balance(wallet, mint, rng.randint(1, 10**12), 6)],
+            "innerInstructions": [
+                {"index": i, "instructions": [instruction] * 3} for i in range(3)
+            ],
+            "logMessages": logs,
+            "loadedAddresses": {"readonly": keys[-3:], "writable": []},
+            "rewards": [],
+            "status": {"Ok": None},
+        },
+        "transaction": {
+            "signatures": [f"sig{slot}"],
+            "message": {
+                "accountKeys": [
+                    {"pubkey": key, "signer": i == 0, "writable": i < 3, "source": "t"}
+                    for i, key in enumerate(keys)
+                ],
+                "instructions": [instruction] * 4,
+                "recentBlockhash": _pubkey(rng),
+                "addressTableLookups": [],
+            },
+        },
+    }
+
+
+def synthetic_transactions(count: int, seed: int = 7) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [_transaction(rng, slot) for slot in range(count)]
+
+
+def recorded_transactions(file: str) -> list[dict[str, Any]]:
+    with open(file, encoding="UTF-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def batch_bodies(transactions: list[dict[str, Any]], batch_size: int) -> list[bytes]:
+    bodies = []
+    for start in range(0, len(transactions), batch_size):
+        batch = transactions[start : start + batch_size]
+        responses = [
+            {"jsonrpc": "2.0", "id": i, "result": trx} for i, trx in enumerate(batch)
+        ]
+        bodies.append(json.dumps(responses).encode())
+    return bodies
+
+
+def notification_frames(count: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    frames = []
+    for slot in range(count):
+        logs = [f"Program {_pubkey(rng)} invoke [1]" for _ in range(rng.randint(4, 30))]
+        notification = {
+            "jsonrpc": "2.0",
+            "method": "logsNotification",
+            "params": {
+                "subscription": rng.randint(1, 10**6),
+                "result": {
+                    "context": {"slot": slot},
+                    "value": {"signature": f"sig{slot}", "err": None, "logs": logs},
+                },
+            },
+        }
+        frames.append(json.dumps(notification))
+    return frames
+
+
+def _timed(
+    label: str, rounds: int, fn: Callable[[Any], Any], messages: list[Any]
+) -> float:
+    size = sum(len(message) for message in messages)
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for message in messages:
+            fn(message)
+        best = min(best, time.perf_counter() - started)
+    print(
+        f"  {label:<10} {best * 1000:9.2f} ms  {size / best / 2**20:9.1f} MB/s  "
+        f"{len(messages) / best:12,.0f} msg/s"
+    )
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--fixtures", help="JSON lines of getTransaction results")
+    parser.add_argument("--count", type=int, default=5_000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        transactions = recorded_transactions(args.fixtures)
+    else:
+        transactions = synthetic_transactions(args.count)
+    bodies = batch_bodies(transactions, args.batch_size)
+    frames = notification_frames(args.count * 4)
+    codecs = {name: JsonCodec(name) for name in available()}
+
+    print(f"{len(frames)} logsNotification frames")
+    baseline = _timed("json.loads", args.rounds, json.loads, frames)
+    for name, codec in codecs.items():
+        best = _timed(name, args.rounds, codec.decode_ws_message, frames)
+        print(f"  {'':<10} speed-up: {baseline / best:.2f}x")
+
+    print(f"{len(bodies)} getTransaction batches of {args.batch_size}")
+    baseline = _timed("json.loads", args.rounds, json.loads, bodies)
+    for name, codec in codecs.items():
+        best = _timed(name, args.rounds, codec.decode_transactions, bodies)
+        print(f"  {'':<10} speed-up: {baseline / best:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Micro-benchmark of ``app.detection.detect_buys`` against the per-wallet
+float-based detection it replaced.
+
+    python -m benchmarks.bench_detection
+    python -m benchmarks.bench_detection --fixtures recorded.jsonl
+
+Fixtures are JSON lines of ``getTransaction`` results (``jsonParsed``),
+read from ``benchmarks/fixtures/transactions.jsonl`` by default, which
+``python -m benchmarks.replay_archive --export`` writes from an archive.
+Without recorded fixtures a synthetic set shaped like real swaps is
+generated. Its zero balances carry ``uiAmount: 0.0`` so the legacy
+function sees every buy too; ``--null-zero-amounts`` sends ``null`` like
+the RPC does, on which the legacy function gives up.
+
+The speed-up is only meaningful when both found the same buys, it is
+flagged as not comparable otherwise.
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import time
+from typing import Any, Callable
+
+from app.detection import TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID, detect_buys
+
+
+Transaction = tuple[str, dict[str, Any]]
+
+DEFAULT_FIXTURES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fixtures", "transactions.jsonl"
+)
+
+
+def legacy_detect(meta: dict[str, Any], wallet: str) -> dict[str, Any] | None:
+    """The previous ``WalletsMonitor.detect_token_buy_from_meta``, minus metadata."""
+    try:
+        pre_map = {
+            (pre["mint"], pre["owner"]): float(pre["uiTokenAmount"]["uiAmount"])
+            for pre in meta.get("preTokenBalances", [])
+        }
+        for post in meta.get("postTokenBalances", []):
+            if post["owner"] != wallet:
+                continue
+            mint = post["mint"]
+            post_amt = float(post["uiTokenAmount"]["uiAmount"])
+            pre_amt = pre_map.get((mint, wallet), 0.0)
+            if post_amt > pre_amt:
+                return {"buyer": wallet, "mint": mint, "amount": post_amt - pre_amt}
+        return None
+
+    except Exception:
+        return None
+
+
+def _pubkey(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=44))
+
+
+def _balance(
+    owner: str, mint: str, amount: int, decimals: int, null_zero: bool
+) -> dict[str, Any]:
+    ui_amount = amount / 10**decimals
+    return {
+        "accountIndex": 0,
+        "mint": mint,
+        "owner": owner,
+        "programId": TOKEN_PROGRAM_ID if amount % 2 else TOKEN_2022_PROGRAM_ID,
+        "uiTokenAmount": {
+            "amount": str(amount),
+            "decimals": decimals,
+            "uiAmount": None if null_zero and not amount else ui_amount,
+            "uiAmountString": str(ui_amount),
+        },
+    }
+
+
+def synthetic_fixtures(
+    count: int, wallets: int, null_zero: bool = False, seed: int = 7
+) -> tuple[list[Transaction], list[str]]:
+    rng = random.Random(seed)
+    tracked = [_pubkey(rng) for _ in range(wallets)]
+    mints = [_pubkey(rng) for _ in range(200)]
+    transactions: list[Transaction] = []
+    for i in range(count):
+        pre: list[dict[str, Any]] = []
+        post: list[dict[str, Any]] = []
+        owners = rng.sample(tracked, k=min(len(tracked), rng.randint(1, 3)))
+        owners += [_pubkey(rng) for _ in range(rng.randint(2, 8))]
+        for owner in owners:
+            mint = rng.choice(mints)
+            decimals = rng.choice((6, 9))
+            before = rng.choice((0, rng.randint(1, 10**12)))
+            after = max(0, before + rng.randint(-(10**11), 10**11))
+            pre.append(_balance(owner, mint, before, decimals, null_zero))
+            post.append(_balance(owner, mint, after, decimals, null_zero))
+        meta = {"err": None, "preTokenBalances": pre, "postTokenBalances": post}
+        transactions.append((f"sig{i}", meta))
+    return transactions, tracked
+
+
+def recorded_fixtures(file: str) -> tuple[list[Transaction], list[str]]:
+    transactions: list[Transaction] = []
+    owners: set[str] = set()
+    with open(file, encoding="UTF-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            trx = json.loads(line)
+            meta = trx["meta"]
+            signature = trx["transaction"]["signatures"][0]
+            transactions.append((signature, meta))
+            owners.update(b["owner"] for b in meta.get("postTokenBalances") or ())
+    return transactions, sorted(owners)
+
+
+def _timed(
+    label: str, rounds: int, fn: Callable[[], int], total: int
+) -> tuple[float, int]:
+    best = float("inf")
+    found = 0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        found = fn()
+        best = min(best, time.perf_counter() - started)
+    print(
+        f"{label:<12} {best * 1000:9.2f} ms  "
+        f"{total / best:12,.0f} tx/s  {found} buys"
+    )
+    return best, found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--fixtures",
+        default=DEFAULT_FIXTURES,
+        help="JSON lines of getTransaction results",
+    )
+    parser.add_argument("--count", type=int, default=20_000, help="synthetic")
+    parser.add_argument("--wallets", type=int, default=2_000, help="synthetic")
+    parser.add_argument("--null-zero-amounts", action="store_true", help="synthetic")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if os.path.exists(args.fixtures):
+        print(f"Recorded fixtures from {args.fixtures}")
+        transactions, tracked = recorded_fixtures(args.fixtures)
+    else:
+        print(f"No fixtures at {args.fixtures}, generating synthetic ones")
+        transactions, tracked = synthetic_fixtures(
+            args.count, args.wallets, args.null_zero_amounts
+        )
+    tracked_set = set(tracked)
+    print(f"{len(transactions)} transactions, {len(tracked)} tracked wallets")
+
+    def legacy() -> int:
+        # Every monitor whose wallet appears in the tx ran its own detection
+        found = 0
+        for _, meta in transactions:
+            owners = {b["owner"] for b in meta.get("postTokenBalances") or ()}
+            for wallet in owners & tracked_set:
+                found += legacy_detect(meta, wallet) is not None
+        return found
+
+    def batched() -> int:
+        return len(detect_buys(transactions, tracked_set))
+
+    legacy_time, legacy_found = _timed(
+        "legacy", args.rounds, legacy, len(transactions)
+    )
+    batched_time, batched_found = _timed(
+        "detect_buys", args.rounds, batched, len(transactions)
+    )
+    speed_up = f"speed-up: {legacy_time / batched_time:.2f}x"
+    if legacy_found != batched_found:
+        print(
+            f"{speed_up}, not comparable: legacy found {legacy_found} buys and "
+            f"detect_buys {batched_found}, so they did different work"
+        )
+    else:
+        print(speed_up)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+End-to-end benchmark of the bot against the local mock services.
+
+    python -m benchmarks.bench_e2e
+    python -m benchmarks.bench_e2e --wallets 10,1000 --rate 500 --duration 20
+    python -m benchmarks.bench_e2e --compare benchmarks/results/<earlier>.json
+    python -m benchmarks.bench_e2e --mode transaction --drop-ratio 0.05
+
+Each wallet count runs in a fresh process, wired like ``main.py`` but
+pointed at ``benchmarks.mocks`` (which runs in its own process so it
+doesn't skew CPU and memory). After every wallet is subscribed, the mock
+websocket emits notifications at ``--rate`` for ``--duration`` seconds.
+``--mode`` is the ``[INGEST] MODE`` subscribed with. With ``--drop-ratio``
+that share of the transactions never finalizes, and the finality tracker
+has to retract their tweets.
+
+Reported per run: notifications handled per second, p50/p99 latency from
+notification to tweet, resident memory per tracked wallet and the bot's
+CPU usage. Results are written as JSON to ``benchmarks/results``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Optional
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+TEMPLATE = "Bought __COIN_AMOUNT__ $__COIN_SYMBOL__ (__COIN_ADDRESS__)"
+
+
+def _env() -> dict[str, str]:
+    path = os.pathsep.join(filter(None, (ROOT, os.environ.get("PYTHONPATH"))))
+    return {**os.environ, "PYTHONPATH": path}
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current, but the best available off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def _wait_for(check: Any, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if await check():
+                return True
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    return False
+
+
+async def run_single(args: argparse.Namespace, wallet_count: int) -> dict[str, Any]:
+    # Imported here so the app's files (logs, databases) land in the temp cwd
+    import httpx
+
+    from app.backfill import Backfiller, Checkpoints
+    from app.finality import FinalityTracker
+    from app.logs_config import configure_logging
+    from app.pipeline import Pipeline, SplTokenBuy
+    from app.prefilter import LogPrefilter
+    from app.publisher import TweetPublisher
+    from app.ratelimit import TokenBucket
+    from app.router import Endpoint, RpcRouter
+    from app.rpc import TransactionFetcher
+    from app.seen import SeenSignatures
+    from app.subscriptions import SubscriptionHub
+    from app.supervisor import Supervisor
+    from app.templates import TemplateEngine
+    from app.token_meta import TokenMetaCache
+    from app.valuation import WSOL_MINT, PriceOracle, StaticPriceSource
+    from app.wallet_mon import WalletsMonitor
+    from benchmarks.mocks import MockCluster
+
+    configure_logging(level="WARNING")
+    urls = MockCluster(port=args.port).urls
+    mocks = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mocks", "--port", str(args.port)],
+        env=_env(),
+        stdout=subprocess.DEVNULL,
+    )
+    client = httpx.AsyncClient(timeout=30)
+
+    async def mock_stats() -> dict[str, Any]:
+        response = await client.get(f"{urls['rpc']}/stats")
+        return dict(response.json())
+
+    try:
+        if not await _wait_for(mock_stats, timeout=15):
+            raise RuntimeError("Mock services didn't start")
+
+        with open("template.txt", "w", encoding="UTF-8") as f:
+            f.write(TEMPLATE)
+        wallets = [f"Wallet{i:06d}" for i in range(wallet_count)]
+
+        router = RpcRouter([Endpoint(urls["rpc"])])
+        fetcher = TransactionFetcher(router)
+        seen = SeenSignatures(snapshot_file="seen.bin")
+        checkpoints = Checkpoints("checkpoints.json")
+        queue: asyncio.Queue[SplTokenBuy] = asyncio.Queue(1000)
+        price_oracle = PriceOracle(StaticPriceSource({WSOL_MINT: 150.0}))
+        pipeline = Pipeline(
+            fetcher=fetcher,
+            token_meta=TokenMetaCache(
+                "key", "token-meta.sqlite3", helius_url=urls["helius"]
+            ),
+            seen=seen,
+            checkpoints=checkpoints,
+            tracked_wallets=set(wallets),
+            output_queue=queue,
+            price_oracle=price_oracle,
+        )
+
+        async def post(text: str) -> Any:
+            response = await client.post(urls["twitter"], json={"text": text})
+            response.raise_for_status()
+            return response.json()
+
+        async def delete(tweet_id: Any) -> Any:
+            response = await client.delete(f"{urls['twitter']}/{tweet_id}")
+            response.raise_for_status()
+
+        finality = FinalityTracker(fetcher.call, delete, timeout=3, poll_interval=0.5)
+
+        def track_finality(buys: list[SplTokenBuy], created: Any) -> None:
+            finality.track(created["data"]["id"], [buy["signature"] for buy in buys])
+
+        publisher = TweetPublisher(
+            queue=queue,
+            post=post,
+            render=TemplateEngine("template.txt").render,
+            seen=seen,
+            outbox_file="outbox.sqlite3",
+            rate_limiter=TokenBucket(1_000_000),
+            on_published=track_finality if args.drop_ratio else None,
+        )
+        hub = SubscriptionHub(
+            [urls["ws"]],
+            connections=4,
+            kind=args.mode,
+            commitment="finalized" if args.mode == "logs" else "confirmed",
+        )
+        backfiller = Backfiller(fetcher, checkpoints, TokenBucket(1_000))
+
+        supervisor = Supervisor()
+        supervisor.add("publisher", publisher.run)
+        supervisor.add("hub", hub.run)
+        supervisor.add("fetcher", fetcher.run)
+        supervisor.add("price_oracle", price_oracle.run)
+        for name, stage in pipeline.stages():
+            supervisor.add(name, stage)
+        if args.drop_ratio:
+            supervisor.add("finality", finality.run)
+
+        rss_before = _rss_bytes()
+        monitors = [
+            WalletsMonitor(w, hub, pipeline, LogPrefilter(), checkpoints, backfiller)
+            for w in wallets
+        ]
+        supervisor_task = asyncio.create_task(supervisor.run())
+        started = time.monotonic()
+        await asyncio.gather(*(monitor.start() for monitor in monitors))
+
+        async def subscribed() -> bool:
+            return (await mock_stats())["subscriptions"] >= wallet_count
+
+        if not await _wait_for(subscribed, timeout=120):
+            raise RuntimeError("Not every wallet got subscribed")
+        subscribe_seconds = time.monotonic() - started
+        rss_after = _rss_bytes()
+
+        cpu_started, wall_started = time.process_time(), time.monotonic()
+        await client.post(
+            f"{urls['rpc']}/emit",
+            json={
+                "rate": args.rate,
+                "duration": args.duration,
+                "buy_ratio": args.buy_ratio,
+                "drop_ratio": args.drop_ratio,
+            },
+        )
+        await asyncio.sleep(args.duration)
+
+        def handled(stats: dict[str, Any]) -> int:
+            # Pushed transactions are never fetched
+            return int(stats["fetched" if args.mode == "logs" else "notifications"])
+
+        async def drained() -> bool:
+            stats = await mock_stats()
+            return (
+                not stats["emitting"]
+                and handled(stats) >= stats["notifications"]
+                and not finality.stats["pending"]
+            )
+
+        await _wait_for(drained, timeout=30)
+        await asyncio.sleep(1)
+        cpu = time.process_time() - cpu_started
+        wall = time.monotonic() - wall_started
+        stats = await mock_stats()
+
+        supervisor_task.cancel()
+        await asyncio.gather(supervisor_task, return_exceptions=True)
+        await fetcher.close()
+        publisher.close()
+
+        return {
+            "wallets": wallet_count,
+            "subscribe_seconds": round(subscribe_seconds, 3),
+            "notifications": stats["notifications"],
+            "fetched": stats["fetched"],
+            "tweets": stats["tweets"],
+            "retracted": stats["retracted"],
+            "notifications_per_second": round(handled(stats) / wall, 1),
+            "p50_latency_ms": stats["p50_latency_ms"],
+            "p99_latency_ms": stats["p99_latency_ms"],
+            "memory_per_wallet_bytes": round(
+                max(0, rss_after - rss_before) / wallet_count, 1
+            ),
+            "cpu_percent": round(cpu / wall * 100, 1),
+        }
+
+    finally:
+        await client.aclose()
+        mocks.terminate()
+        mocks.wait()
+
+
+def _run_in_subprocess(args: argparse.Namespace, wallet_count: int) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as workdir:
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.bench_e2e",
+            "--single",
+            str(wallet_count),
+            "--rate",
+            str(args.rate),
+            "--duration",
+            str(args.duration),
+            "--buy-ratio",
+            str(args.buy_ratio),
+            "--drop-ratio",
+            str(args.drop_ratio),
+            "--mode",
+            args.mode,
+            "--port",
+            str(args.port),
+        ]
+        completed = subprocess.run(
+            command,
+            cwd=workdir,
+            env=_env(),
+            capture_output=True,
+            text=True,
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(
+            f"Run with {wallet_count} wallets failed:\n{completed.stderr}"
+        )
+    return dict(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+
+_COLUMNS = (
+    ("wallets", "wallets"),
+    ("notifications_per_second", "notif/s"),
+    ("p50_latency_ms", "p50 ms"),
+    ("p99_latency_ms", "p99 ms"),
+    ("memory_per_wallet_bytes", "B/wallet"),
+    ("cpu_percent", "cpu %"),
+)
+
+
+def _print_runs(runs: list[dict[str, Any]], previous: Optional[dict[int, Any]]) -> None:
+    print("  ".join(f"{title:>10}" for _, title in _COLUMNS))
+    for run in runs:
+        cells = []
+        for key, _ in _COLUMNS:
+            value = run.get(key)
+            cell = "-" if value is None else f"{value:,.1f}".removesuffix(".0")
+            before = (previous or {}).get(run["wallets"], {}).get(key)
+            if key != "wallets" and value is not None and before:
+                cell += f" ({(value - before) / before:+.0%})"
+            cells.append(f"{cell:>10}")
+        print("  ".join(cells))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--wallets", default="10,1000,10000")
+    parser.add_argument("--rate", type=float, default=200, help="notifications/s")
+    parser.add_argument("--duration", type=float, default=15, help="seconds")
+    parser.add_argument("--buy-ratio", type=float, default=0.1)
+    parser.add_argument("--drop-ratio", type=float, default=0.0)
+    parser.add_argument(
+        "--mode", choices=("logs", "transaction", "block"), default="logs"
+    )
+    parser.add_argument("--port", type=int, default=18900)
+    parser.add_argument("--out", help="results file, default benchmarks/results/")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(asyncio.run(run_single(args, args.single))))
+        return
+
+    runs = []
+    for wallet_count in (int(n) for n in args.wallets.split(",")):
+        print(f"Running with {wallet_count} wallets ...", flush=True)
+        runs.append(_run_in_subprocess(args, wallet_count))
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="UTF-8") as f:
+            previous = {run["wallets"]: run for run in json.load(f)["runs"]}
+    _print_runs(runs, previous)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"e2e-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    with open(out, "w", encoding="UTF-8") as f:
+        json.dump(
+            {
+                "created_at": time.time(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "settings": {
+                    "rate": args.rate,
+                    "duration": args.duration,
+                    "buy_ratio": args.buy_ratio,
+                    "drop_ratio": args.drop_ratio,
+                    "mode": args.mode,
+                },
+                "runs": runs,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Delivery of buys through ``app.sinks`` to every sink at once, against the
+local mock Twitter, Telegram and Discord endpoints.
+
+    python -m benchmarks.bench_sinks
+    python -m benchmarks.bench_sinks --rate 500 --telegram-latency 1.0
+
+Buys are fed to the fan-out at ``--rate`` for ``--duration`` seconds and
+delivered to Twitter (through the publisher and its outbox), Telegram,
+Discord, a JSON-lines file and a Unix socket with one listening client.
+One slow sink should leave the others' latencies untouched. Reported per
+sink, ``--drain`` seconds after the last buy: buys delivered, still
+queued and dropped, and p50/max delivery latency; for the socket client
+also the latency to receiving the line.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Optional
+
+
+async def run(args: argparse.Namespace, workdir: str) -> None:
+    # Imported here so the app's files (logs, databases) land in the temp dir
+    import httpx
+
+    from app.codec import codec
+    from app.logs_config import configure_logging
+    from app.pipeline import SplTokenBuy
+    from app.publisher import TweetPublisher
+    from app.ratelimit import TokenBucket
+    from app.seen import SeenSignatures
+    from app.sinks import (
+        DiscordWebhookSink,
+        JsonLinesSink,
+        SinkFanout,
+        TelegramSink,
+        TweetSink,
+        UnixSocketSink,
+    )
+    from benchmarks.mocks import MockSinks, serve_http
+
+    configure_logging(level="ERROR")
+    mocks = MockSinks(
+        port=args.port,
+        telegram_latency=args.telegram_latency,
+        discord_latency=args.discord_latency,
+    )
+    mock_server = await mocks.start()
+
+    async def twitter(method: str, path: str, body: Any) -> tuple[int, Any]:
+        await asyncio.sleep(args.twitter_latency)
+        return 201, {"data": {"id": "1", "text": body["text"]}}
+
+    twitter_server = await serve_http(twitter, "127.0.0.1", args.port + 1)
+    client = httpx.AsyncClient(timeout=30)
+
+    async def post(text: str) -> Any:
+        response = await client.post(
+            f"http://127.0.0.1:{args.port + 1}/2/tweets", json={"text": text}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def render(buy: SplTokenBuy) -> str:
+        return f"Bought {buy['amount_received']:,.2f} {buy['mint']}"
+
+    publisher = TweetPublisher(
+        queue=None,
+        post=post,
+        render=render,
+        seen=SeenSignatures(snapshot_file=os.path.join(workdir, "seen.bin")),
+        outbox_file=os.path.join(workdir, "outbox.sqlite3"),
+        rate_limiter=TokenBucket(1_000_000),
+    )
+    socket_path = os.path.join(workdir, "buys.sock")
+    queue: asyncio.Queue[SplTokenBuy] = asyncio.Queue(1000)
+    fanout = SinkFanout(queue)
+    fanout.add(TweetSink(publisher), concurrency=args.concurrency)
+    fanout.add(
+        TelegramSink(
+            "token", "chat", render, args.concurrency, url=mocks.urls["telegram"]
+        ),
+        concurrency=args.concurrency,
+    )
+    fanout.add(
+        DiscordWebhookSink(mocks.urls["discord"], render, args.concurrency),
+        concurrency=args.concurrency,
+    )
+    fanout.add(JsonLinesSink(os.path.join(workdir, "buys.jsonl")))
+    fanout.add(UnixSocketSink(socket_path))
+
+    sent: dict[str, float] = {}
+    received: list[float] = []
+
+    async def listen() -> None:
+        reader, writer = await asyncio.open_unix_connection(socket_path, limit=2**20)
+        try:
+            while line := await reader.readline():
+                signature = codec.loads(line)["signature"]
+                received.append(time.perf_counter() - sent[signature])
+        finally:
+            writer.close()
+
+    tasks = [
+        asyncio.create_task(fanout.run()),
+        asyncio.create_task(publisher.run()),
+    ]
+    await asyncio.sleep(0.2)
+    tasks.append(asyncio.create_task(listen()))
+    await asyncio.sleep(0.2)
+
+    count = int(args.rate * args.duration)
+    started = time.perf_counter()
+    for i in range(count):
+        signature = f"sig{i}"
+        sent[signature] = time.perf_counter()
+        await queue.put(
+            SplTokenBuy(
+                signature=signature,
+                buyer="Wallet000001",
+                buyers=["Wallet000001"],
+                mint=f"Mint{i % 50}",
+                amount_received=1_000.0 + i,
+                type="spl-token-buy",
+                block_time=int(time.time()),
+            )
+        )
+        next_at = started + (i + 1) / args.rate
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+    def settled() -> bool:
+        return all(
+            stats["delivered"] + stats["dropped"] + stats["failed"] >= count
+            for stats in fanout.stats.values()
+        )
+
+    deadline = time.monotonic() + args.drain
+    while not settled() and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.2)
+
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:,.1f}"
+
+    print(f"{count} buys at {args.rate:,.0f}/s")
+    columns = ("sink", "delivered", "queued", "dropped", "p50 ms", "max ms")
+    print("  ".join(f"{column:>10}" for column in columns))
+    rows = [
+        (
+            name,
+            stats["delivered"],
+            stats["queued"],
+            stats["dropped"],
+            ms(stats["p50_latency"]),
+            ms(stats["max_latency"]),
+        )
+        for name, stats in fanout.stats.items()
+    ]
+    ordered = sorted(received)
+    if ordered:
+        p50, slowest = ordered[len(ordered) // 2], ordered[-1]
+        rows.append(("client", len(ordered), "", "", ms(p50), ms(slowest)))
+    for row in rows:
+        print("  ".join(f"{cell:>10}" for cell in row))
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await fanout.close()
+    await client.aclose()
+    # Lets the mocks answer the requests still in flight
+    await asyncio.sleep(max(args.telegram_latency, args.discord_latency) + 0.1)
+    mock_server.close()
+    twitter_server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=200, help="buys/s")
+    parser.add_argument("--duration", type=float, default=5, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=4, help="per HTTP sink")
+    parser.add_argument("--twitter-latency", type=float, default=0.05)
+    parser.add_argument("--telegram-latency", type=float, default=0.5)
+    parser.add_argument("--discord-latency", type=float, default=0.01)
+    parser.add_argument("--drain", type=float, default=5, help="seconds")
+    parser.add_argument("--port", type=int, default=18910)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        asyncio.run(run(args, workdir))
+
+
+if __name__ == "__main__":
+    main()
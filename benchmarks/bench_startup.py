@@ -0,0 +1,156 @@
+"""
+Startup of the bot: imports, config validation and the bring-up of every
+wallet's subscription, against the local mock websocket.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --wallets 1000 --windows 1,100
+
+Reported:
+
+* the time to import ``main`` in a fresh interpreter, and to import it
+  along with ``tweepy.asynchronous``, which ``main`` leaves to a thread,
+* the time to validate the config and read ``--wallets`` addresses from
+  the wallets file,
+* per ``RESUBSCRIBE_BATCH_SIZE`` in ``--windows``, the time from starting
+  the subscription hub to the first and to every confirmed subscription,
+  with the mock websocket, run in the same process, confirming each after
+  ``--ws-latency``.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def _env() -> dict[str, str]:
+    path = os.pathsep.join(filter(None, (ROOT, os.environ.get("PYTHONPATH"))))
+    return {**os.environ, "PYTHONPATH": path}
+
+
+def _address(rng: random.Random) -> str:
+    """A random 32 byte public key in base58."""
+    key = rng.randbytes(32)
+    raw = int.from_bytes(key)
+    encoded = ""
+    while raw:
+        raw, digit = divmod(raw, 58)
+        encoded = _ALPHABET[digit] + encoded
+    # Every leading zero byte is a leading "1"
+    return "1" * (len(key) - len(key.lstrip(b"\0"))) + encoded
+
+
+def import_seconds(statement: str, workdir: str, runs: int) -> float:
+    """Best of ``runs`` fresh interpreters timing ``statement``."""
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"{statement}; print(time.perf_counter() - started)"
+    )
+    return min(
+        float(
+            subprocess.run(
+                [sys.executable, "-c", code],
+                cwd=workdir,
+                env=_env(),
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout.split()[-1]
+        )
+        for _ in range(runs)
+    )
+
+
+async def bring_up(
+    args: argparse.Namespace, wallets: list[str], window: int
+) -> tuple[float, float]:
+    from app.subscriptions import SubscriptionHub
+    from benchmarks.mocks import MockCluster
+
+    cluster = MockCluster(port=args.port, ws_latency=args.ws_latency)
+    hub = SubscriptionHub(
+        ws_urls=[cluster.urls["ws"]],
+        connections=args.connections,
+        resubscribe_batch_size=window,
+    )
+
+    async def handler(data: dict[str, Any]) -> None:
+        pass
+
+    # Subscribed before the hub connects, as the wallets file is read first
+    for wallet in wallets:
+        await hub.subscribe(wallet, handler)
+
+    server = asyncio.create_task(cluster.run())
+    await asyncio.sleep(0.2)
+    started = time.perf_counter()
+    task = asyncio.create_task(hub.run())
+    await hub.first_subscribed.wait()
+    first = time.perf_counter() - started
+    while hub.subscribed < len(wallets):
+        await asyncio.sleep(0.01)
+    every = time.perf_counter() - started
+    for pending in (task, server):
+        pending.cancel()
+        await asyncio.gather(pending, return_exceptions=True)
+    return first, every
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--wallets", type=int, default=10_000)
+    parser.add_argument("--windows", default="10,100,1000")
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--ws-latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--runs", type=int, default=3, help="per import timing")
+    parser.add_argument("--port", type=int, default=18920)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    wallets = [_address(rng) for _ in range(args.wallets)]
+    with tempfile.TemporaryDirectory() as workdir:
+        shutil.copy(os.path.join(ROOT, "sample-config.toml"), workdir)
+        os.rename(
+            os.path.join(workdir, "sample-config.toml"),
+            os.path.join(workdir, "config.toml"),
+        )
+        lazy = import_seconds("import main", workdir, args.runs)
+        eager = import_seconds("import main, tweepy.asynchronous", workdir, args.runs)
+        print(f"import main                {lazy * 1000:8.1f} ms")
+        print(f"  with tweepy.asynchronous {eager * 1000:8.1f} ms")
+
+        # Imported here so the app's files (logs, databases) land in the temp dir
+        os.chdir(workdir)
+        from app.config_reader import Config
+        from app.logs_config import configure_logging
+        from app.startup import validate_config
+        from app.wallets import WalletRegistry
+
+        configure_logging(level="ERROR")
+        with open("wallets.txt", "w", encoding="UTF-8") as f:
+            f.write("\n".join(wallets))
+        started = time.perf_counter()
+        validate_config(Config)
+        read = WalletRegistry("wallets.txt").read()
+        elapsed = time.perf_counter() - started
+        print(f"validate {len(read)} wallets   {elapsed * 1000:8.1f} ms")
+
+        print(f"bring-up of {len(wallets)} wallets, confirmed after {args.ws_latency}s")
+        print(f"{'window':>8}  {'first s':>8}  {'all s':>8}")
+        for window in (int(value) for value in args.windows.split(",")):
+            first, every = asyncio.run(bring_up(args, wallets, window))
+            print(f"{window:>8}  {first:>8.2f}  {every:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+"""
+Local stand-ins for the services the bot talks to, for offline runs.
+
+    python -m benchmarks.mocks --port 18900
+
+One ``MockCluster`` serves, on consecutive ports from ``--port``:
+
+* a Solana websocket answering ``logsSubscribe``, ``transactionSubscribe``
+  and ``blockSubscribe``, and emitting synthetic notification streams for
+  the subscribed wallets on demand, with full transactions for the last two,
+  confirming subscriptions after ``--ws-latency``,
+* a JSON-RPC server answering ``getTransaction`` (single and batched),
+  ``getSignaturesForAddress`` and ``getSignatureStatuses`` with
+  transactions matching those streams, and ``getTokenAccountsByOwner``
+  with empty wallets,
+* a Helius DAS server answering ``getAsset`` and ``getAssetBatch``,
+* a Twitter ``POST /2/tweets`` endpoint that times every tweet against the
+  notification it came from, and ``DELETE /2/tweets/<id>`` counting
+  retracted ones.
+
+``MockSinks`` stands in for the Telegram bot API and a Discord webhook,
+answering after a set latency.
+
+The control API lives on the JSON-RPC port: ``POST /emit`` with
+``{"rate": <notifications/s>, "duration": <s>, "buy_ratio": <0..1>,
+"drop_ratio": <0..1>}`` starts a stream, of which ``drop_ratio`` never
+finalizes, and ``GET /stats`` returns the counters and latencies.
+"""
+
+import argparse
+import asyncio
+import http
+import json
+import random
+import re
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import websockets
+
+from app.detection import TOKEN_PROGRAM_ID
+
+
+HttpHandler = Callable[[str, str, Any], Awaitable[tuple[int, Any]]]
+
+_MINT_PREFIX = "Mint"
+_MINT_RE = re.compile(rf"{_MINT_PREFIX}\w+")
+_LOGS = [
+    f"Program {TOKEN_PROGRAM_ID} invoke [1]",
+    "Program log: Instruction: Transfer",
+    f"Program {TOKEN_PROGRAM_ID} success",
+]
+
+# subscribe method -> (notification method, wallet of the subscribe params)
+_SUBSCRIBE_METHODS: dict[str, tuple[str, Callable[[Any], str]]] = {
+    "logsSubscribe": ("logsNotification", lambda params: params[0]["mentions"][0]),
+    "transactionSubscribe": (
+        "transactionNotification",
+        lambda params: params[0]["accountInclude"][0],
+    ),
+    "blockSubscribe": (
+        "blockNotification",
+        lambda params: params[0]["mentionsAccountOrProgram"],
+    ),
+}
+
+
+async def serve_http(handler: HttpHandler, host: str, port: int) -> asyncio.Server:
+    """A minimal keep-alive HTTP/1.1 JSON server, enough for httpx clients."""
+
+    async def connection(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers: dict[str, str] = {}
+                while (line := await reader.readline()).strip():
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = json.loads(await reader.readexactly(length)) if length else None
+
+                status, result = await handler(method, path, body)
+                payload = json.dumps(result).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(connection, host, port)
+
+
+def _percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class MockCluster:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 18900,
+        rpc_latency: float = 0.0,
+        seed: int = 7,
+        ws_latency: float = 0.0,
+    ) -> None:
+        self.host = host
+        self.ws_port = port
+        self.rpc_port = port + 1
+        self.helius_port = port + 2
+        self.twitter_port = port + 3
+        self._rpc_latency = rpc_latency
+        # Delay of every websocket response, e.g. subscribe confirmations
+        self._ws_latency = ws_latency
+        self._replies: set[asyncio.Task[None]] = set()
+        self._rng = random.Random(seed)
+
+        # subscription id -> (websocket, wallet, notification method)
+        self._subscriptions: dict[int, tuple[Any, str, str]] = {}
+        self._sub_ids: Optional[list[int]] = None
+        self._next_sub_id = 1
+        # signature -> (wallet, emitted_at, is_buy, dropped)
+        self._emitted: dict[str, tuple[str, float, bool, bool]] = {}
+        self._slot = 1
+        self._emit_task: Optional[asyncio.Task[None]] = None
+
+        self.notifications = 0
+        self.fetched = 0
+        self.tweets = 0
+        self.retracted = 0
+        self.latencies: list[float] = []
+
+    @property
+    def urls(self) -> dict[str, str]:
+        return {
+            "ws": f"ws://{self.host}:{self.ws_port}",
+            "rpc": f"http://{self.host}:{self.rpc_port}",
+            "helius": f"http://{self.host}:{self.helius_port}",
+            "twitter": f"http://{self.host}:{self.twitter_port}/2/tweets",
+        }
+
+    def stats(self) -> dict[str, Any]:
+        p50 = _percentile(self.latencies, 0.5)
+        p99 = _percentile(self.latencies, 0.99)
+        return {
+            "subscriptions": len(self._subscriptions),
+            "notifications": self.notifications,
+            "fetched": self.fetched,
+            "tweets": self.tweets,
+            "retracted": self.retracted,
+            "emitting": self._emit_task is not None and not self._emit_task.done(),
+            "p50_latency_ms": p50 * 1000 if p50 is not None else None,
+            "p99_latency_ms": p99 * 1000 if p99 is not None else None,
+        }
+
+    async def run(self) -> None:
+        async with websockets.serve(self._ws_connection, self.host, self.ws_port):
+            rpc = await serve_http(self._rpc, self.host, self.rpc_port)
+            helius = await serve_http(self._helius, self.host, self.helius_port)
+            twitter = await serve_http(self._twitter, self.host, self.twitter_port)
+            async with rpc, helius, twitter:
+                await asyncio.gather(
+                    rpc.serve_forever(),
+                    helius.serve_forever(),
+                    twitter.serve_forever(),
+                )
+
+    # websocket
+
+    async def _ws_connection(self, websocket: Any) -> None:
+        owned: list[int] = []
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                method = request.get("method")
+                if method in _SUBSCRIBE_METHODS:
+                    notification, wallet_of = _SUBSCRIBE_METHODS[method]
+                    wallet = wallet_of(request["params"])
+                    sub_id = self._next_sub_id
+                    self._next_sub_id += 1
+                    self._subscriptions[sub_id] = (websocket, wallet, notification)
+                    self._sub_ids = None
+                    owned.append(sub_id)
+                    result: Any = sub_id
+                elif method.endswith("Unsubscribe"):
+                    removed = self._subscriptions.pop(request["params"][0], None)
+                    self._sub_ids = None
+                    result = removed is not None
+                else:
+                    result = None
+                response = {"jsonrpc": "2.0", "id": request["id"], "result": result}
+                if self._ws_latency:
+                    task = asyncio.create_task(self._reply_later(websocket, response))
+                    self._replies.add(task)
+                    task.add_done_callback(self._replies.discard)
+                else:
+                    await websocket.send(json.dumps(response))
+
+        except websockets.ConnectionClosed:
+            # However the bot hung up, e.g. cancelled mid-read
+            pass
+
+        finally:
+            for sub_id in owned:
+                self._subscriptions.pop(sub_id, None)
+            self._sub_ids = None
+
+    async def _reply_later(self, websocket: Any, response: dict[str, Any]) -> None:
+        await asyncio.sleep(self._ws_latency)
+        try:
+            await websocket.send(json.dumps(response))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _emit(
+        self, rate: float, duration: float, buy_ratio: float, drop_ratio: float
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        sent = 0
+        while (elapsed := loop.time() - started) < duration:
+            due = int(elapsed * rate) - sent
+            for _ in range(due):
+                if self._sub_ids is None:
+                    self._sub_ids = list(self._subscriptions)
+                if not self._sub_ids:
+                    break
+                sub_id = self._rng.choice(self._sub_ids)
+                websocket, wallet, method = self._subscriptions[sub_id]
+                await self._notify(
+                    websocket, sub_id, wallet, method, buy_ratio, drop_ratio
+                )
+            sent += due
+            await asyncio.sleep(0.005)
+
+    async def _notify(
+        self,
+        websocket: Any,
+        sub_id: int,
+        wallet: str,
+        method: str,
+        buy_ratio: float,
+        drop_ratio: float,
+    ) -> None:
+        self._slot += 1
+        signature = f"sig{self._slot}x{self._rng.getrandbits(64):016x}"
+        is_buy = self._rng.random() < buy_ratio
+        dropped = self._rng.random() < drop_ratio
+        self._emitted[signature] = (wallet, time.time(), is_buy, dropped)
+        result: dict[str, Any]
+        if method == "logsNotification":
+            result = {
+                "context": {"slot": self._slot},
+                "value": {"signature": signature, "err": None, "logs": _LOGS},
+            }
+        else:
+            transaction = self._transaction(signature)
+            assert transaction is not None
+            pushed = {
+                "transaction": transaction["transaction"],
+                "meta": {**transaction["meta"], "logMessages": _LOGS},
+            }
+            if method == "transactionNotification":
+                result = {
+                    "transaction": pushed,
+                    "signature": signature,
+                    "slot": self._slot,
+                }
+            else:
+                block = {
+                    "blockTime": transaction["blockTime"],
+                    "transactions": [pushed],
+                }
+                result = {
+                    "context": {"slot": self._slot},
+                    "value": {"slot": self._slot, "err": None, "block": block},
+                }
+        notification = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": {"subscription": sub_id, "result": result},
+        }
+        self.notifications += 1
+        try:
+            await websocket.send(json.dumps(notification))
+        except websockets.ConnectionClosed:
+            pass
+
+    # JSON-RPC
+
+    async def _rpc(self, method: str, path: str, body: Any) -> tuple[int, Any]:
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method == "POST" and path == "/emit":
+            if self._emit_task is not None:
+                self._emit_task.cancel()
+            self._emit_task = asyncio.create_task(
+                self._emit(
+                    body["rate"],
+                    body["duration"],
+                    body.get("buy_ratio", 0.1),
+                    body.get("drop_ratio", 0.0),
+                )
+            )
+            return 200, {"ok": True}
+
+        if self._rpc_latency:
+            await asyncio.sleep(self._rpc_latency)
+        if isinstance(body, list):
+            return 200, [self._rpc_call(request) for request in body]
+        return 200, self._rpc_call(body)
+
+    def _rpc_call(self, request: dict[str, Any]) -> dict[str, Any]:
+        method, params = request["method"], request.get("params", [])
+        result: Any = None
+        if method == "getTransaction":
+            self.fetched += 1
+            result = self._transaction(params[0])
+        elif method == "getSignaturesForAddress":
+            result = []
+        elif method == "getTokenAccountsByOwner":
+            result = {"context": {"slot": self._slot}, "value": []}
+        elif method == "getSignatureStatuses":
+            result = {
+                "context": {"slot": self._slot},
+                "value": [self._status(signature) for signature in params[0]],
+            }
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def _status(self, signature: str) -> Optional[dict[str, Any]]:
+        emitted = self._emitted.get(signature)
+        if emitted is None or emitted[3]:
+            return None
+        return {
+            "slot": int(signature[3:].split("x")[0]),
+            "confirmations": None,
+            "err": None,
+            "confirmationStatus": "finalized",
+        }
+
+    def _transaction(self, signature: str) -> Optional[dict[str, Any]]:
+        emitted = self._emitted.get(signature)
+        if emitted is None:
+            return None
+        wallet, _, is_buy, _ = emitted
+        mint = f"{_MINT_PREFIX}{signature}"
+        amount = 1_000_000 if is_buy else 0
+
+        def balance(amount: int) -> dict[str, Any]:
+            return {
+                "accountIndex": 1,
+                "mint": mint,
+                "owner": wallet,
+                "programId": TOKEN_PROGRAM_ID,
+                "uiTokenAmount": {
+                    "amount": str(amount),
+                    "decimals": 6,
+                    "uiAmount": amount / 10**6 or None,
+                    "uiAmountString": str(amount / 10**6),
+                },
+            }
+
+        return {
+            "slot": int(signature[3:].split("x")[0]),
+            "blockTime": int(time.time()),
+            "meta": {
+                "err": None,
+                "fee": 5000,
+                "preBalances": [2_000_000_000, 2_039_280],
+                "postBalances": [1_499_995_000, 2_039_280],
+                "preTokenBalances": [balance(0)],
+                "postTokenBalances": [balance(amount)],
+            },
+            "transaction": {
+                "signatures": [signature],
+                "message": {
+                    "accountKeys": [
+                        {"pubkey": wallet, "signer": True, "writable": True},
+                        {
+                            "pubkey": f"ata{signature}",
+                            "signer": False,
+                            "writable": True,
+                        },
+                    ]
+                },
+            },
+        }
+
+    # Helius
+
+    async def _helius(self, method: str, path: str, body: Any) -> tuple[int, Any]:
+        def asset(mint: str) -> dict[str, Any]:
+            metadata = {"name": f"Token {mint[-6:]}", "symbol": mint[-4:].upper()}
+            return {"id": mint, "content": {"metadata": metadata}}
+
+        params = body.get("params", {})
+        if body.get("method") == "getAssetBatch":
+            result: Any = [asset(mint) for mint in params["ids"]]
+        else:
+            result = asset(params["id"])
+        return 200, {"jsonrpc": "2.0", "id": body.get("id"), "result": result}
+
+    # Twitter
+
+    async def _twitter(self, method: str, path: str, body: Any) -> tuple[int, Any]:
+        if method == "DELETE":
+            self.retracted += 1
+            return 200, {"data": {"deleted": True}}
+
+        self.tweets += 1
+        now = time.time()
+        for mint in _MINT_RE.findall(body.get("text", "")):
+            emitted = self._emitted.get(mint[len(_MINT_PREFIX) :])
+            if emitted is not None:
+                self.latencies.append(now - emitted[1])
+        return 201, {"data": {"id": str(self.tweets), "text": body.get("text")}}
+
+
+class MockSinks:
+    """
+    Telegram's ``POST /bot<token>/sendMessage`` and a Discord webhook at
+    ``POST /webhook``, each answering after its own latency.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 18910,
+        telegram_latency: float = 0.0,
+        discord_latency: float = 0.0,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self._latencies = {"telegram": telegram_latency, "discord": discord_latency}
+        self.received = {"telegram": 0, "discord": 0}
+
+    @property
+    def urls(self) -> dict[str, str]:
+        return {
+            "telegram": f"http://{self.host}:{self.port}",
+            "discord": f"http://{self.host}:{self.port}/webhook",
+        }
+
+    async def start(self) -> asyncio.Server:
+        return await serve_http(self._handle, self.host, self.port)
+
+    async def _handle(self, method: str, path: str, body: Any) -> tuple[int, Any]:
+        sink = "discord" if path.startswith("/webhook") else "telegram"
+        if self._latencies[sink]:
+            await asyncio.sleep(self._latencies[sink])
+        self.received[sink] += 1
+        if sink == "discord":
+            return 200, {"id": str(self.received[sink])}
+        return 200, {"ok": True, "result": {"message_id": self.received[sink]}}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18900)
+    parser.add_argument("--rpc-latency", type=float, default=0.0)
+    parser.add_argument("--ws-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    cluster = MockCluster(
+        args.host, args.port, args.rpc_latency, ws_latency=args.ws_latency
+    )
+    print(json.dumps(cluster.urls, indent=2))
+    asyncio.run(cluster.run())
+
+
+if __name__ == "__main__":
+    main()
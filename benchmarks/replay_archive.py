@@ -0,0 +1,73 @@
+"""
+Replays archived transactions through buy detection.
+
+    python -m benchmarks.replay_archive
+    python -m benchmarks.replay_archive --wallet <address> --show
+    python -m benchmarks.replay_archive --export benchmarks/fixtures/transactions.jsonl
+
+Reads the transaction archive written with ``[ARCHIVE] ENABLED = true``.
+The wallets the transactions were archived for are the tracked set.
+``--export`` writes them as fixtures for ``benchmarks.bench_detection``.
+"""
+
+import argparse
+import json
+import os
+import time
+
+from app.archive import iter_archived
+from app.detection import detect_buys
+from app.gvs import ARCHIVE_DIR
+from app.valuation import quote_spent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="archive directory")
+    parser.add_argument("--wallet", help="only replay this wallet's transactions")
+    parser.add_argument("--export", help="write the transactions as JSON lines")
+    parser.add_argument("--show", action="store_true", help="print every buy")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    archived = list(iter_archived(args.dir, args.wallet))
+    loaded = time.perf_counter() - started
+    if not archived:
+        return print(f"No archived transactions in {args.dir}")
+
+    transactions = {signature: trx for signature, _, trx in archived}
+    tracked = {wallet for _, wallet, _ in archived}
+    print(
+        f"{len(transactions)} transactions of {len(tracked)} wallets "
+        f"loaded in {loaded * 1000:.0f} ms"
+    )
+
+    if args.export:
+        os.makedirs(os.path.dirname(os.path.abspath(args.export)), exist_ok=True)
+        with open(args.export, "w", encoding="UTF-8") as f:
+            for trx in transactions.values():
+                f.write(json.dumps(trx) + "\n")
+        print(f"Exported to {args.export}")
+
+    started = time.perf_counter()
+    buys = detect_buys(
+        [(signature, trx.get("meta")) for signature, trx in transactions.items()],
+        tracked,
+    )
+    detected = time.perf_counter() - started
+    print(
+        f"detect_buys: {detected * 1000:.2f} ms, "
+        f"{len(transactions) / max(detected, 1e-9):,.0f} tx/s, {len(buys)} buys"
+    )
+
+    if args.show:
+        for buy in buys:
+            paid = quote_spent(transactions[buy.signature], buy.owner)
+            print(
+                f"{buy.signature} {buy.owner} +{buy.ui(buy.amount_received)} "
+                f"{buy.mint} paid {paid or '-'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
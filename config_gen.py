@@ -33,7 +33,12 @@ def generate_section_class(name: str, values: dict) -> str:
     class_code = f"@dataclass\nclass {name}:\n"
     for key, value in values.items():
         attr_type = detect_type(value)
-        class_code += f"    {key}: {attr_type} = {repr(value)}\n"
+        if attr_type in ("list", "dict"):
+            # Mutable defaults must go through a factory in dataclasses
+            default = f"field(default_factory=lambda: {repr(value)})"
+        else:
+            default = repr(value)
+        class_code += f"    {key}: {attr_type} = {default}\n"
     class_code += "\n"
     return class_code
 
@@ -48,18 +53,36 @@ def generate_config_class(toml_data: dict) -> str:
     # Auto-load function
     class_code += "    @classmethod\n"
     class_code += "    def load(cls) -> None:\n"
-    for section, values in toml_data.items():
-        class_code += f"        cls.{section} = {section}(\n"
-        for key in values.keys():
-            class_code += f"            {key}=_CONFIG_DATA['{section}']['{key}'],\n"
-        class_code = class_code.rstrip(",\n") + "\n        )\n"
+    for section in toml_data.keys():
+        class_code += f"        cls.{section} = _load_section({section}, '{section}')\n"
     class_code += "\nConfig.load()\n"
 
     return class_code
 
 
+# Keys missing from an older config.toml keep the sample's value as default
+LOAD_HELPERS = '''
+def _load_section(section, name):
+    values = _CONFIG_DATA.get(name, {})
+    fields = section.__dataclass_fields__
+    return section(**{key: values[key] for key in fields if key in values})
+
+
+def missing_keys():
+    """Settings config.toml lacks, as "[SECTION] KEY", which use the default."""
+    missing = []
+    for name in Config.__annotations__:
+        values = _CONFIG_DATA.get(name, {})
+        fields = globals()[name].__dataclass_fields__
+        missing.extend(f"[{name}] {key}" for key in fields if key not in values)
+    return missing
+
+
+'''
+
+
 # Generate section classes
-generated_code = "from dataclasses import dataclass\n\n"
+generated_code = "from dataclasses import dataclass, field\n\n"
 
 # 🔥 Add `_CONFIG_DATA` definition inside the generated file
 generated_code += "import toml\n\n"
@@ -71,6 +94,7 @@ for section, values in _CONFIG_DATA.items():
     generated_code += generate_section_class(section, values)
 
 # Generate the main Config class
+generated_code += LOAD_HELPERS
 generated_code += generate_config_class(_CONFIG_DATA)
 
 output_filename = "config_reader.py"
@@ -1,89 +1,614 @@
-from app.logs_config import get_logger
-from app.wallet_mon import WalletsMonitor, SplTokenBuy
-from app import io, gvs
+import time
+
+# Taken before the imports, which are part of the startup
+STARTED_AT = time.monotonic()
+
+from app.logs_config import configure_logging, get_logger
+from app.wallet_mon import WalletsMonitor
+from app.pipeline import Pipeline, SplTokenBuy
+from app.supervisor import RestartPolicy, Supervisor
+from app.subscriptions import SubscriptionHub
+from app.rpc import TransactionFetcher
+from app.router import Endpoint, RpcRouter
+from app.token_meta import TokenMetaCache
+from app.prefilter import LogPrefilter
+from app.seen import SeenSignatures
+from app.backfill import Backfiller, Checkpoints
+from app.ratelimit import TokenBucket
+from app.metrics import metrics
+from app.archive import TransactionArchive
+from app.codec import codec
+from app.convergence import CLUSTER_BUY_TYPE, ConvergenceDetector
+from app.finality import FinalityTracker
+from app.ledger import TokenLedger
+from app.publisher import TweetPublisher
+from app.startup import report_startup, validate_config
+from app.sinks import (
+    DiscordWebhookSink,
+    JsonLinesSink,
+    SinkFanout,
+    TelegramSink,
+    TweetSink,
+    UnixSocketSink,
+)
+from app.templates import TemplateEngine, TemplateRule
+from app.wallets import WalletRegistry
+from app.sharding import (
+    ShardRing,
+    ShardWorkers,
+    follow_membership,
+    forward_events,
+    shard_path,
+)
+from app.valuation import (
+    JupiterPriceSource,
+    PriceOracle,
+    PriceSource,
+    StaticPriceSource,
+)
+from app import gvs
 import asyncio
-from tweepy.asynchronous import AsyncClient  # type: ignore
-from app.config_reader import Config
-from app import constants
+import importlib
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+from app.config_reader import Config, missing_keys
 
 
 logger = get_logger()
 
 
-def prepare_tweet_content(buy_info: SplTokenBuy) -> str:
-    text = open(gvs.TWEET_CONTENT_FILE).read().strip()
-    text = text.replace(constants.COIN_ADDRESS_PLACEHOLDER, buy_info["mint"])
-    text = text.replace(
-        constants.COIN_AMOUNT_PLACEHOLDER, str(buy_info["amount_received"])
-    )
+class TwitterLoginError(Exception):
+    pass
 
-    text = text.replace(constants.COIN_NAME_PLACEHOLDER, buy_info["token_name"])
-    text = text.replace(constants.COIN_SYMBOL_PLACEHOLDER, buy_info["token_symbol"])
-    text = text.replace(constants.BUYER_WALLET_ADDRESS_PLACEHOLDER, buy_info["buyer"])
 
-    return text
+class Monitoring(NamedTuple):
+    registry: WalletRegistry
+    hub: SubscriptionHub
+    fetcher: TransactionFetcher
+    # Status line of the pipeline for the status reporter
+    status: Callable[[], str]
+    # Closes the clients once the supervisor has stopped
+    close: Callable[[], Awaitable[None]]
 
 
-async def main() -> None:
+def new_supervisor() -> Supervisor:
+    return Supervisor(
+        RestartPolicy(
+            initial_delay=Config.SUPERVISOR.RESTART_INITIAL_DELAY,
+            max_delay=Config.SUPERVISOR.RESTART_MAX_DELAY,
+            max_restarts=Config.SUPERVISOR.MAX_RESTARTS,
+            period=Config.SUPERVISOR.MAX_RESTARTS_PERIOD,
+        )
+    )
 
-    if not all(
-        [
-            Config.TWITTER.API_KEY,
-            Config.TWITTER.API_KEY_SECRET,
-            Config.TWITTER.API_ACCESS_TOKEN,
-            Config.TWITTER.API_ACCESS_TOKEN_SECRET,
-        ]
-    ):
-        return logger.error("Incomplete or missing Twitter API Keys in config.toml")
 
-    tweet_content_template = (
-        open(gvs.TWEET_CONTENT_FILE, mode="r", encoding="UTF-8").read().strip()
+def new_seen(snapshot_file: str) -> SeenSignatures:
+    return SeenSignatures(
+        window=Config.DEDUP.WINDOW_SECONDS,
+        max_entries=Config.DEDUP.MAX_ENTRIES,
+        snapshot_file=snapshot_file,
     )
-    if not tweet_content_template:
-        return logger.error(f"No tweet content available in {gvs.TWEET_CONTENT_FILE}")
 
-    if not (wallets := io.read_txt_lines(gvs.WALLETS_FILE)):
-        return logger.error(f"No wallets in {gvs.WALLETS_FILE}")
 
-    twitter_client = AsyncClient(
-        consumer_key=Config.TWITTER.API_KEY,
-        consumer_secret=Config.TWITTER.API_KEY_SECRET,
-        access_token=Config.TWITTER.API_ACCESS_TOKEN,
-        access_token_secret=Config.TWITTER.API_ACCESS_TOKEN_SECRET,
+def new_fetcher() -> tuple[RpcRouter, TransactionFetcher]:
+    router = RpcRouter(
+        [Endpoint.from_config(endpoint) for endpoint in Config.RPC.ENDPOINTS],
+        hedge_quantile=Config.RPC.HEDGE_QUANTILE,
+        cooldown=Config.RPC.ENDPOINT_COOLDOWN_SECONDS,
+    )
+    fetcher = TransactionFetcher(
+        router=router,
+        workers=Config.RPC.FETCH_WORKERS,
+        max_in_flight=Config.RPC.MAX_IN_FLIGHT,
+        max_retries=Config.RPC.MAX_RETRIES,
+        batch_size=Config.RPC.BATCH_SIZE,
+        batch_window_ms=Config.RPC.BATCH_WINDOW_MS,
     )
+    return router, fetcher
 
-    try:
 
-        me = await twitter_client.get_me()  # type: ignore
-        logger.info(f"User logged-in as {me}")
+async def twitter_login() -> Any:
+    """
+    Logs in to Twitter and returns the client. tweepy is by far the
+    slowest import, so it is imported on a thread while wallets subscribe.
+    """
+    try:
+        tweepy = await asyncio.to_thread(
+            importlib.import_module, "tweepy.asynchronous"
+        )
+        client = tweepy.AsyncClient(
+            consumer_key=Config.TWITTER.API_KEY,
+            consumer_secret=Config.TWITTER.API_KEY_SECRET,
+            access_token=Config.TWITTER.API_ACCESS_TOKEN,
+            access_token_secret=Config.TWITTER.API_ACCESS_TOKEN_SECRET,
+        )
+        me = await client.get_me()
 
     except Exception as e:
-        return logger.error(f"User failed to login to twitter. {e}", exc_info=True)
+        logger.error(f"User failed to login to twitter. {e}", exc_info=True)
+        raise TwitterLoginError(str(e)) from e
 
-    queue: asyncio.Queue[SplTokenBuy] = asyncio.Queue()
+    logger.info(f"User logged-in as {me}")
+    return client
 
-    async def queue_handler() -> None:
+
+def add_status_reporter(
+    supervisor: Supervisor, *reports: Callable[[], str]
+) -> None:
+    async def status_reporter() -> None:
         while True:
-            new_buy = await queue.get()
-            logger.info(f"New buy detected from a target wallet: {new_buy}")
-            try:
-                text = prepare_tweet_content(new_buy)
-                logger.info("Posting bought token address in tweet ...")
-                created = await twitter_client.create_tweet(text=text)  # type: ignore
-                logger.info(f"Tweet posted successfully. {created}")
-
-            except Exception as e:
-                logger.error(f"Error posting tweet to twitter. {e}", exc_info=True)
-
-    async with asyncio.TaskGroup() as gp:
-        gp.create_task(queue_handler())
-        for w in wallets:
-            wallets_mon = WalletsMonitor(
-                wallet=w,
-                output_queue=queue,
-                helius_api_key=Config.HELIUS.API_KEY,
+            await asyncio.sleep(Config.SUPERVISOR.STATUS_INTERVAL_SECONDS)
+            logger.info(
+                ", ".join(report() for report in reports)
+                + f", restarts: {supervisor.total_restarts}"
+                + f", components: {supervisor.health()}"
             )
-            gp.create_task(wallets_mon.start())
+            if metrics.enabled:
+                logger.info(f"Metrics: {metrics.summary()}")
+
+    supervisor.add("status_reporter", status_reporter)
+
+
+def add_metrics_server(supervisor: Supervisor, port: int) -> None:
+    metrics.enable()
+    supervisor.add("metrics_server", lambda: metrics.serve(Config.METRICS.HOST, port))
+
+
+def add_monitoring(
+    supervisor: Supervisor,
+    output_queue: asyncio.Queue[SplTokenBuy],
+    seen: SeenSignatures,
+    shard: Optional[int] = None,
+    owns: Optional[Callable[[str], bool]] = None,
+) -> Monitoring:
+    """
+    Builds the wallet monitoring side of the bot, from the subscriptions
+    to detected and valued buys on ``output_queue``, and adds its
+    components to ``supervisor``. A ``shard`` keeps its own files and only
+    monitors the wallets it ``owns``.
+    """
+
+    def own_file(path: str) -> str:
+        return path if shard is None else shard_path(path, shard)
+
+    codec.use(Config.RPC.JSON_CODEC)
+    logger.info(f"Decoding JSON with {codec.name}")
+    hub = SubscriptionHub(
+        ws_urls=Config.RPC.WS_URLS,
+        connections=Config.RPC.WS_CONNECTIONS,
+        resubscribe_batch_size=Config.RPC.RESUBSCRIBE_BATCH_SIZE,
+        kind=Config.INGEST.MODE,
+        # Fetched signatures have to be finalized, getTransaction asks for it
+        commitment=(
+            "finalized" if Config.INGEST.MODE == "logs" else Config.INGEST.COMMITMENT
+        ),
+    )
+    router, fetcher = new_fetcher()
+    token_meta = TokenMetaCache(
+        helius_api_key=Config.HELIUS.API_KEY,
+        db_file=own_file(gvs.TOKEN_META_DB_FILE),
+        max_size=Config.HELIUS.META_CACHE_SIZE,
+        ttl=Config.HELIUS.META_CACHE_TTL_SECONDS,
+    )
+    price_source: PriceSource
+    if Config.PRICES.FIXTURE_FILE:
+        price_source = StaticPriceSource.from_file(Config.PRICES.FIXTURE_FILE)
+    else:
+        price_source = JupiterPriceSource(Config.PRICES.URL)
+    price_oracle = PriceOracle(
+        source=price_source,
+        ttl=Config.PRICES.TTL_SECONDS,
+        batch_size=Config.PRICES.BATCH_SIZE,
+        batch_window_ms=Config.PRICES.BATCH_WINDOW_MS,
+        hot_window=Config.PRICES.HOT_WINDOW_SECONDS,
+        refresh_interval=Config.PRICES.REFRESH_INTERVAL_SECONDS,
+    )
+    if Config.PREFILTER.ENABLED:
+        prefilter = LogPrefilter.from_config(
+            require_programs=Config.PREFILTER.REQUIRE_PROGRAMS,
+            dex_programs=Config.PREFILTER.DEX_PROGRAMS,
+            drop_instructions=Config.PREFILTER.DROP_INSTRUCTIONS,
+        )
+    else:
+        prefilter = LogPrefilter()
+    # Wallets move between shards, so resume from whichever file saw them last
+    checkpoint_files = [gvs.CHECKPOINTS_FILE] + [
+        shard_path(gvs.CHECKPOINTS_FILE, other)
+        for other in range(Config.SHARDING.WORKERS)
+    ]
+    checkpoints_file = own_file(gvs.CHECKPOINTS_FILE)
+    checkpoints = Checkpoints(
+        checkpoints_file,
+        seed_files=[file for file in checkpoint_files if file != checkpoints_file],
+    )
+    backfiller = Backfiller(
+        fetcher=fetcher,
+        checkpoints=checkpoints,
+        rate_limiter=TokenBucket(Config.BACKFILL.REQUESTS_PER_SECOND),
+        max_concurrent=Config.BACKFILL.MAX_CONCURRENT,
+        max_signatures=Config.BACKFILL.MAX_SIGNATURES,
+    )
+
+    archive = (
+        TransactionArchive(
+            own_file(gvs.ARCHIVE_DIR),
+            max_file_bytes=Config.ARCHIVE.MAX_FILE_MB * 1024 * 1024,
+            max_files=Config.ARCHIVE.MAX_FILES,
+            buffer_size=Config.ARCHIVE.BUFFER_SIZE,
+        )
+        if Config.ARCHIVE.ENABLED
+        else None
+    )
+
+    def new_monitor(wallet: str) -> WalletsMonitor:
+        return WalletsMonitor(
+            wallet=wallet,
+            hub=hub,
+            pipeline=pipeline,
+            prefilter=prefilter,
+            checkpoints=checkpoints,
+            backfiller=backfiller,
+        )
+
+    registry = WalletRegistry(
+        gvs.WALLETS_FILE,
+        monitor_factory=new_monitor,
+        owns=owns,
+        subscribe_concurrency=Config.WALLETS.SUBSCRIBE_CONCURRENCY,
+    )
+    ledger = (
+        TokenLedger(
+            fetcher=fetcher,
+            tracked_wallets=registry.addresses,
+            snapshot_file=own_file(gvs.LEDGER_SNAPSHOT_FILE),
+            seed_batch_size=Config.LEDGER.SEED_BATCH_SIZE,
+            reseed_interval=Config.LEDGER.RESEED_INTERVAL_SECONDS,
+        )
+        if Config.LEDGER.ENABLED
+        else None
+    )
+    pipeline = Pipeline(
+        fetcher=fetcher,
+        token_meta=token_meta,
+        seen=seen,
+        checkpoints=checkpoints,
+        tracked_wallets=registry.addresses,
+        output_queue=output_queue,
+        price_oracle=price_oracle,
+        quote_mints=set(Config.PRICES.QUOTE_MINTS),
+        archive=archive,
+        ledger=ledger,
+        min_position_change_pct=Config.LEDGER.MIN_POSITION_CHANGE_PCT,
+        ignore_unpaid=Config.PIPELINE.IGNORE_UNPAID_BUYS,
+        notify_queue_size=Config.PIPELINE.NOTIFY_QUEUE_SIZE,
+        detect_queue_size=Config.PIPELINE.DETECT_QUEUE_SIZE,
+        value_queue_size=Config.PIPELINE.VALUE_QUEUE_SIZE,
+        fetch_concurrency=Config.PIPELINE.FETCH_CONCURRENCY,
+        detect_workers=Config.PIPELINE.DETECT_WORKERS,
+    )
+
+    def status() -> str:
+        return (
+            f"Wallets: {len(registry)}, "
+            f"queue depths: {pipeline.queue_depths()}, "
+            f"prefilter: {prefilter.stats}, "
+            f"prices: {price_oracle.stats}, "
+            f"rpc: {router.stats()}"
+            + (f", ledger: {ledger.stats}" if ledger is not None else "")
+        )
+
+    def collect_queue_depths() -> None:
+        for name, depth in pipeline.queue_depths().items():
+            metrics.set("queue_depth", depth, queue=name)
+
+    supervisor.add("hub", hub.run)
+    supervisor.add("fetcher", fetcher.run)
+    supervisor.add("price_oracle", price_oracle.run)
+    for name, stage in pipeline.stages():
+        supervisor.add(name, stage)
+    supervisor.add("checkpoints", checkpoints.run)
+    supervisor.add(
+        "wallet_watcher",
+        lambda: registry.watch(Config.WALLETS.WATCH_INTERVAL_SECONDS),
+    )
+    if archive is not None:
+        supervisor.add("archive", archive.run)
+    if ledger is not None:
+        supervisor.add(
+            "ledger", lambda: ledger.run(Config.LEDGER.SNAPSHOT_INTERVAL_SECONDS)
+        )
+    metrics.add_collector(collect_queue_depths)
+
+    async def close() -> None:
+        await fetcher.close()
+        await token_meta.close()
+        await price_source.close()
+
+    return Monitoring(registry, hub, fetcher, status, close)
+
+
+def run_worker(shard: int, live: tuple[int, ...], events: Any, control: Any) -> None:
+    """Entry point of a shard worker process."""
+    try:
+        asyncio.run(worker_main(shard, live, events, control))
+
+    except KeyboardInterrupt:
+        pass
+
+    except Exception as e:
+        logger.error(f"Shard worker #{shard} crashed. {e}", exc_info=True)
+        raise
+
+
+async def worker_main(
+    shard: int, live: tuple[int, ...], events: Any, control: Any
+) -> None:
+    configure_logging(
+        level=Config.LOGGING.LEVEL,
+        json_lines=Config.LOGGING.JSON_LINES,
+        debug_sample_every=Config.LOGGING.DEBUG_SAMPLE_EVERY,
+        log_file=shard_path(gvs.LOGS_FILENAME, shard),
+    )
+    ring = ShardRing(live)
+    supervisor = new_supervisor()
+    output_queue: asyncio.Queue[SplTokenBuy] = asyncio.Queue(
+        Config.PIPELINE.OUTPUT_QUEUE_SIZE
+    )
+    seen = new_seen(shard_path(gvs.SEEN_SIGNATURES_FILE, shard))
+    monitoring = add_monitoring(
+        supervisor,
+        output_queue,
+        seen,
+        shard=shard,
+        owns=lambda wallet: ring.owner(wallet) == shard,
+    )
+    registry = monitoring.registry
+    supervisor.add(
+        "seen_snapshots", lambda: seen.run(Config.DEDUP.SNAPSHOT_INTERVAL_SECONDS)
+    )
+    supervisor.add("shard_events", lambda: forward_events(output_queue, events))
+    supervisor.add(
+        "shard_membership",
+        lambda: follow_membership(control, ring, registry.rebalance),
+    )
+    add_status_reporter(supervisor, monitoring.status)
+    if Config.METRICS.ENABLED:
+        add_metrics_server(supervisor, Config.METRICS.PORT + 1 + shard)
+
+    logger.info(f"Shard worker #{shard} of live shards {list(live)} starting ...")
+    try:
+        async with asyncio.TaskGroup() as gp:
+            gp.create_task(supervisor.run())
+            gp.create_task(registry.apply(registry.read()))
+            gp.create_task(report_startup(monitoring.hub, STARTED_AT))
+
+    finally:
+        await monitoring.close()
+
+
+async def main() -> None:
+
+    configure_logging(
+        level=Config.LOGGING.LEVEL,
+        json_lines=Config.LOGGING.JSON_LINES,
+        debug_sample_every=Config.LOGGING.DEBUG_SAMPLE_EVERY,
+    )
+
+    # Created even when the config is rejected, for a first run to fill in
+    gvs.ensure_files()
+    if missing := missing_keys():
+        logger.warning(
+            f"config.toml lacks {', '.join(missing)}. Using the defaults of "
+            "sample-config.toml, copy them over to change them."
+        )
+    if errors := validate_config(Config):
+        for error in errors:
+            logger.error(error)
+        return
+
+    sharded = Config.SHARDING.WORKERS > 1
+    supervisor = new_supervisor()
+    queue: asyncio.Queue[SplTokenBuy] = asyncio.Queue(Config.PIPELINE.OUTPUT_QUEUE_SIZE)
+    seen = new_seen(gvs.SEEN_SIGNATURES_FILE)
+    monitoring: Optional[Monitoring] = None
+    workers: Optional[ShardWorkers] = None
+    if sharded:
+        # The workers monitor the wallets, here only their names are needed
+        registry = WalletRegistry(gvs.WALLETS_FILE)
+        workers = ShardWorkers(
+            shards=Config.SHARDING.WORKERS,
+            target=run_worker,
+            output_queue=queue,
+            restart_delay=Config.SHARDING.RESTART_DELAY_SECONDS,
+        )
+        supervisor.add(
+            "wallet_watcher",
+            lambda: registry.watch(Config.WALLETS.WATCH_INTERVAL_SECONDS),
+        )
+    else:
+        monitoring = add_monitoring(supervisor, queue, seen)
+        registry = monitoring.registry
+
+    if not (wallets := registry.read()):
+        return logger.error(f"No wallets in {gvs.WALLETS_FILE}")
+
+    rules = [TemplateRule.from_config(rule) for rule in Config.TEMPLATES.RULES]
+    if Config.CONVERGENCE.ENABLED:
+        rules.insert(
+            0, TemplateRule(file=gvs.CLUSTER_TWEET_CONTENT_FILE, type=CLUSTER_BUY_TYPE)
+        )
+    templates = TemplateEngine(
+        default_file=gvs.TWEET_CONTENT_FILE,
+        rules=rules,
+        wallet_names=registry.names,
+        amount_spec=Config.TEMPLATES.AMOUNT_FORMAT,
+        usd_spec=Config.TEMPLATES.USD_FORMAT,
+    )
+    if not templates.has_content():
+        return logger.error(f"No tweet content available in {gvs.TWEET_CONTENT_FILE}")
+    if Config.CONVERGENCE.ENABLED and not templates.has_content(
+        gvs.CLUSTER_TWEET_CONTENT_FILE
+    ):
+        return logger.error(
+            f"No cluster tweet content available in {gvs.CLUSTER_TWEET_CONTENT_FILE}"
+        )
+
+    # The login runs alongside the wallets' subscriptions; tweets wait for it
+    login: Optional[asyncio.Task[Any]] = None
+
+    async def post_tweet(text: str) -> Any:
+        assert login is not None
+        return await (await login).create_tweet(text=text)
+
+    async def delete_tweet(tweet_id: Any) -> Any:
+        assert login is not None
+        return await (await login).delete_tweet(tweet_id)
+
+    finality: Optional[FinalityTracker] = None
+    finality_fetcher: Optional[TransactionFetcher] = None
+    if Config.INGEST.RETRACT_UNFINALIZED:
+        if monitoring is not None:
+            fetcher = monitoring.fetcher
+        else:
+            # The shards' RPC clients live in their own processes
+            _, finality_fetcher = new_fetcher()
+            fetcher = finality_fetcher
+        finality = FinalityTracker(
+            call=fetcher.call,
+            retract=delete_tweet,
+            timeout=Config.INGEST.FINALITY_TIMEOUT_SECONDS,
+            poll_interval=Config.INGEST.FINALITY_POLL_SECONDS,
+        )
+
+    def track_finality(buys: list[SplTokenBuy], created: Any) -> None:
+        if finality is not None:
+            finality.track(created.data["id"], [buy["signature"] for buy in buys])
+
+    # Buys reach the sinks through the convergence detector if enabled
+    publish_queue: asyncio.Queue[SplTokenBuy] = (
+        asyncio.Queue(Config.PIPELINE.OUTPUT_QUEUE_SIZE)
+        if Config.CONVERGENCE.ENABLED
+        else queue
+    )
+    publisher = TweetPublisher(
+        queue=None,
+        post=post_tweet,
+        render=templates.render,
+        seen=seen,
+        outbox_file=gvs.OUTBOX_DB_FILE,
+        rate_limiter=TokenBucket(
+            rate=Config.PUBLISHER.TWEETS_PER_WINDOW / Config.PUBLISHER.WINDOW_SECONDS,
+            burst=Config.PUBLISHER.TWEETS_PER_WINDOW,
+        ),
+        max_retries=Config.PUBLISHER.MAX_RETRIES,
+        coalesce_window=Config.PUBLISHER.COALESCE_WINDOW_SECONDS,
+        on_published=track_finality,
+    )
+    fanout = SinkFanout(publish_queue, max_retries=Config.SINKS.MAX_RETRIES)
+    fanout.add(
+        TweetSink(publisher),
+        concurrency=Config.SINKS.TWITTER_CONCURRENCY,
+        queue_size=Config.SINKS.QUEUE_SIZE,
+    )
+    if Config.SINKS.TELEGRAM_BOT_TOKEN and Config.SINKS.TELEGRAM_CHAT_ID:
+        fanout.add(
+            TelegramSink(
+                bot_token=Config.SINKS.TELEGRAM_BOT_TOKEN,
+                chat_id=Config.SINKS.TELEGRAM_CHAT_ID,
+                render=templates.render,
+                connections=Config.SINKS.TELEGRAM_CONCURRENCY,
+            ),
+            concurrency=Config.SINKS.TELEGRAM_CONCURRENCY,
+            queue_size=Config.SINKS.QUEUE_SIZE,
+        )
+    if Config.SINKS.DISCORD_WEBHOOK_URL:
+        fanout.add(
+            DiscordWebhookSink(
+                webhook_url=Config.SINKS.DISCORD_WEBHOOK_URL,
+                render=templates.render,
+                connections=Config.SINKS.DISCORD_CONCURRENCY,
+            ),
+            concurrency=Config.SINKS.DISCORD_CONCURRENCY,
+            queue_size=Config.SINKS.QUEUE_SIZE,
+        )
+    if Config.SINKS.JSONL_FILE:
+        fanout.add(
+            JsonLinesSink(Config.SINKS.JSONL_FILE), queue_size=Config.SINKS.QUEUE_SIZE
+        )
+    if Config.SINKS.SOCKET_PATH:
+        fanout.add(
+            UnixSocketSink(Config.SINKS.SOCKET_PATH),
+            queue_size=Config.SINKS.QUEUE_SIZE,
+        )
+
+    supervisor.add("publisher", publisher.run)
+    supervisor.add("sinks", fanout.run)
+    supervisor.add(
+        "seen_snapshots", lambda: seen.run(Config.DEDUP.SNAPSHOT_INTERVAL_SECONDS)
+    )
+    supervisor.add(
+        "template_watcher",
+        lambda: templates.watch(Config.TEMPLATES.WATCH_INTERVAL_SECONDS),
+    )
+    reports = [
+        lambda: f"publisher: {publisher.stats}",
+        lambda: f"sinks: {fanout.stats}",
+    ]
+    if Config.CONVERGENCE.ENABLED:
+
+        async def publish_cluster(cluster: SplTokenBuy) -> None:
+            # Bigger clusters jump the tweet queue
+            fanout.publish(cluster, priority=len(cluster["buyers"]))
+
+        convergence = ConvergenceDetector(
+            input_queue=queue,
+            output_queue=publish_queue,
+            publish=publish_cluster,
+            window=Config.CONVERGENCE.WINDOW_SECONDS,
+            buckets=Config.CONVERGENCE.BUCKETS,
+            min_wallets=Config.CONVERGENCE.MIN_WALLETS,
+            min_amount=Config.CONVERGENCE.MIN_AMOUNT,
+            min_usd=Config.CONVERGENCE.MIN_USD,
+            clusters_only=Config.CONVERGENCE.CLUSTERS_ONLY,
+        )
+        supervisor.add("convergence", convergence.run)
+        reports.append(lambda: f"convergence: {convergence.stats}")
+    if finality is not None:
+        supervisor.add("finality", finality.run)
+        reports.append(lambda: f"finality: {finality.stats}")
+    if workers is not None:
+        supervisor.add("shards", workers.run)
+        add_status_reporter(supervisor, lambda: f"Shards: {workers.stats}", *reports)
+    else:
+        add_status_reporter(supervisor, monitoring.status, *reports)
+    if Config.WALLETS.ADMIN_API_ENABLED:
+        supervisor.add(
+            "wallets_admin",
+            lambda: registry.serve(
+                Config.WALLETS.ADMIN_API_HOST, Config.WALLETS.ADMIN_API_PORT
+            ),
+        )
+    if Config.METRICS.ENABLED:
+        add_metrics_server(supervisor, Config.METRICS.PORT)
+
+    try:
+        async with asyncio.TaskGroup() as gp:
+            login = gp.create_task(twitter_login())
+            gp.create_task(supervisor.run())
+            gp.create_task(registry.apply(wallets))
+            if monitoring is not None:
+                gp.create_task(report_startup(monitoring.hub, STARTED_AT))
+
+    except* TwitterLoginError:
+        # Already logged, everything else was cancelled with it
+        pass
+
+    finally:
+        if monitoring is not None:
+            await monitoring.close()
+        if finality_fetcher is not None:
+            await finality_fetcher.close()
+        # Closes the publisher too
+        await fanout.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+import asyncio
+from typing import Any, Optional
+
+from app.backfill import Backfiller, Checkpoints
+from app.pipeline import Pipeline
+from app.ratelimit import TokenBucket
+from app.seen import SeenSignatures
+from app.wallet_mon import WalletsMonitor
+
+
+WALLET = "Wallet1111111111111111111111111111111111111"
+
+
+class FakeNode:
+    """Serves ``chain``, (signature, slot) oldest first, failing the fetches
+    of ``flaky`` signatures once."""
+
+    def __init__(self, chain: list[tuple[str, int]], flaky: set[str]) -> None:
+        self.chain = chain
+        self.flaky = set(flaky)
+        self.fetched: list[str] = []
+
+    async def fetch(self, signature: str) -> Optional[dict[str, Any]]:
+        self.fetched.append(signature)
+        if signature in self.flaky:
+            self.flaky.discard(signature)
+            return None
+        slot = dict(self.chain)[signature]
+        return {"slot": slot, "meta": {}, "transaction": {}}
+
+    async def call(self, method: str, params: list[Any]) -> list[dict[str, Any]]:
+        assert method == "getSignaturesForAddress"
+        options = params[1]
+        newest_first = [
+            {"signature": sig, "slot": slot, "err": None}
+            for sig, slot in reversed(self.chain)
+        ]
+        signatures = [s["signature"] for s in newest_first]
+        end = signatures.index(options["until"])
+        start = signatures.index(options["before"]) + 1 if "before" in options else 0
+        return newest_first[start:end][: options["limit"]]
+
+
+async def _until(condition: Any) -> None:
+    async with asyncio.timeout(5):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def test_checkpoint_stays_before_in_flight_signatures(tmp_path):
+    checkpoints = Checkpoints(str(tmp_path / "checkpoints.json"))
+    checkpoints.begin(WALLET, "a", 10)
+    checkpoints.begin(WALLET, "b", 11)
+    checkpoints.update(WALLET, "dropped", 12)
+    checkpoints.finish(WALLET, "b", 11)
+    assert checkpoints.get(WALLET) is None
+
+    checkpoints.finish(WALLET, "a", 10)
+    assert checkpoints.get(WALLET) == ("dropped", 12)
+
+
+def test_skipped_redelivery_keeps_the_first_one_pending(tmp_path):
+    checkpoints = Checkpoints(str(tmp_path / "checkpoints.json"))
+    checkpoints.update(WALLET, "a", 10)
+    checkpoints.begin(WALLET, "b", 11)
+    checkpoints.begin(WALLET, "b", 11)
+    checkpoints.finish(WALLET, "b", 11)
+    checkpoints.update(WALLET, "c", 12)
+    assert checkpoints.get(WALLET) == ("a", 10)
+
+    checkpoints.fail(WALLET, "b")
+    assert checkpoints.get(WALLET) == ("a", 10)
+    assert checkpoints.failed(WALLET)
+
+
+def test_failed_fetch_is_recovered_by_the_backfill(tmp_path):
+    async def scenario() -> None:
+        chain = [("s0", 10), ("s1", 11), ("s2", 12), ("s3", 13)]
+        node = FakeNode(chain, flaky={"s2"})
+        checkpoints = Checkpoints(str(tmp_path / "checkpoints.json"))
+        checkpoints.update(WALLET, "s0", 10)
+        pipeline = Pipeline(
+            fetcher=node,  # type: ignore[arg-type]
+            token_meta=None,  # type: ignore[arg-type]
+            seen=SeenSignatures(),
+            checkpoints=checkpoints,
+            tracked_wallets={WALLET},
+            output_queue=asyncio.Queue(),
+            price_oracle=None,  # type: ignore[arg-type]
+            fetch_concurrency=2,
+        )
+        backfiller = Backfiller(node, checkpoints, TokenBucket(1000))  # type: ignore
+        monitor = WalletsMonitor(
+            WALLET, None, pipeline, None, checkpoints, backfiller  # type: ignore
+        )
+        retries: list[str] = []
+        checkpoints.on_failed(WALLET, lambda: retries.append(WALLET))
+        detected = pipeline._detect_queue
+
+        stage = asyncio.create_task(pipeline.run_fetch_stage())
+        try:
+            for sig, slot in chain[1:]:
+                await pipeline.submit(sig, WALLET, slot)
+            await _until(lambda: detected.qsize() == 2 and checkpoints.failed(WALLET))
+            # s3 is done, but the checkpoint must not pass the failed s2
+            assert checkpoints.get(WALLET) == ("s1", 11)
+            assert retries == [WALLET]
+
+            await monitor.backfill()
+            await _until(lambda: detected.qsize() == 3)
+            await _until(lambda: checkpoints.get(WALLET) == ("s3", 13))
+            assert not checkpoints.failed(WALLET)
+            assert node.fetched.count("s2") == 2
+            assert node.fetched.count("s3") == 1
+
+        finally:
+            stage.cancel()
+            await asyncio.gather(stage, return_exceptions=True)
+
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+from app import constants
+from app.templates import TemplateEngine
+
+
+TEMPLATE = f"""
+🚨 {constants.BUYER_WALLET_ADDRESS_PLACEHOLDER} bought
+{constants.COIN_AMOUNT_PLACEHOLDER} ${constants.COIN_SYMBOL_PLACEHOLDER}
+({constants.COIN_NAME_PLACEHOLDER})
+
+{constants.COIN_ADDRESS_PLACEHOLDER}
+"""
+
+BUY = {
+    "signature": "sig",
+    "buyer": "7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU",
+    "buyers": ["7xKXtg2CW87d97TXJSDpbD5jBkheTqA83TZRuJosgAsU"],
+    "mint": "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",
+    "amount_received": 1234567.891011,
+    "token_name": "USD Coin",
+    "token_symbol": "USDC",
+    "type": "spl-token-buy",
+}
+
+
+def baseline_render(text: str, buy: dict) -> str:
+    """How tweets were rendered before templates were compiled."""
+    text = text.strip()
+    text = text.replace(constants.COIN_ADDRESS_PLACEHOLDER, buy["mint"])
+    text = text.replace(constants.COIN_AMOUNT_PLACEHOLDER, str(buy["amount_received"]))
+    text = text.replace(constants.COIN_NAME_PLACEHOLDER, buy["token_name"])
+    text = text.replace(constants.COIN_SYMBOL_PLACEHOLDER, buy["token_symbol"])
+    text = text.replace(constants.BUYER_WALLET_ADDRESS_PLACEHOLDER, buy["buyer"])
+    return text
+
+
+def test_template_without_specs_renders_like_before(tmp_path):
+    template = tmp_path / "tweet.txt"
+    template.write_text(TEMPLATE, encoding="UTF-8")
+
+    rendered = TemplateEngine(str(template)).render(BUY)
+    assert rendered == baseline_render(TEMPLATE, BUY)
+    assert "1234567.891011" in rendered
+
+
+def test_specs_format_only_when_asked(tmp_path):
+    template = tmp_path / "tweet.txt"
+    template.write_text(f"{constants.COIN_AMOUNT_PLACEHOLDER}[,.0f]", encoding="UTF-8")
+    assert TemplateEngine(str(template)).render(BUY) == "1,234,568"
+
+    template.write_text(constants.COIN_AMOUNT_PLACEHOLDER, encoding="UTF-8")
+    engine = TemplateEngine(str(template), amount_spec=",.2f")
+    assert engine.render(BUY) == "1,234,567.89"